@@ -0,0 +1,99 @@
+# adequacy.py
+
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def haversine_matrix(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Great-circle distances in km between every point of set 1 (rows) and set 2 (columns)."""
+    phi1, phi2 = np.radians(lat1)[:, None], np.radians(lat2)[None, :]
+    dphi = phi2 - phi1
+    dlambda = np.radians(lon2)[None, :] - np.radians(lon1)[:, None]
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class AdequacyMatrix:
+    """
+    Distance from every member location to the nearest provider of every specialty.
+
+    Distances are computed with a vectorized haversine over blocks of locations, so memory
+    stays bounded at `chunk_size` x providers per specialty. Specialties without any
+    located provider get an infinite distance.
+    """
+
+    def __init__(self, location_ids: Sequence[Hashable], latitudes: Sequence[float], longitudes: Sequence[float],
+                 providers: Dict[str, List[Tuple[Hashable, float, float]]], chunk_size: int = 2048):
+        self.location_ids = list(location_ids)
+        self.specialties = sorted(providers)
+        lat = np.asarray(latitudes, dtype=np.float64)
+        lon = np.asarray(longitudes, dtype=np.float64)
+        self.distances = np.full((len(self.location_ids), len(self.specialties)), np.inf)
+        self.nearest = np.full((len(self.location_ids), len(self.specialties)), -1, dtype=np.int64)
+        self._provider_ids: List[List[Hashable]] = []
+
+        for s, specialty in enumerate(self.specialties):
+            ids = [provider_id for provider_id, _, _ in providers[specialty]]
+            self._provider_ids.append(ids)
+            if not ids:
+                continue
+            p_lat = np.array([p[1] for p in providers[specialty]], dtype=np.float64)
+            p_lon = np.array([p[2] for p in providers[specialty]], dtype=np.float64)
+            for start in range(0, len(self.location_ids), chunk_size):
+                block = haversine_matrix(lat[start:start + chunk_size], lon[start:start + chunk_size], p_lat, p_lon)
+                self.nearest[start:start + chunk_size, s] = block.argmin(axis=1)
+                self.distances[start:start + chunk_size, s] = block.min(axis=1)
+
+    def _specialty_columns(self, specialty: Optional[str]) -> List[int]:
+        if specialty is None:
+            return list(range(len(self.specialties)))
+        wanted = specialty.strip().casefold()
+        return [s for s, name in enumerate(self.specialties) if name.casefold() == wanted]
+
+    def has_specialty(self, specialty: str) -> bool:
+        return bool(self._specialty_columns(specialty))
+
+    def _nearest_provider(self, row: int, column: int) -> Optional[Hashable]:
+        index = int(self.nearest[row, column])
+        return self._provider_ids[column][index] if index >= 0 else None
+
+    def gaps(self, threshold_km: float, specialty: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Location/specialty pairs whose nearest provider is farther than `threshold_km`, worst first."""
+        columns = self._specialty_columns(specialty)
+        if not columns or not self.location_ids:
+            return []
+        sub = self.distances[:, columns]
+        rows, cols = np.nonzero(sub > threshold_km)
+        order = np.argsort(-sub[rows, cols], kind="stable")
+        gaps = []
+        for i in order:
+            row, column = int(rows[i]), columns[int(cols[i])]
+            distance = float(self.distances[row, column])
+            gaps.append({
+                "location_id": self.location_ids[row],
+                "specialty": self.specialties[column],
+                "distance_km": round(distance, 2) if np.isfinite(distance) else None,
+                "nearest_hospital_id": self._nearest_provider(row, column),
+            })
+        return gaps
+
+    def summary(self, threshold_km: float, specialty: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Per specialty: how many locations are within `threshold_km` of a provider, and the worst distance."""
+        rows = []
+        total = len(self.location_ids)
+        for column in self._specialty_columns(specialty):
+            distances = self.distances[:, column]
+            within = int(np.count_nonzero(distances <= threshold_km))
+            finite = distances[np.isfinite(distances)]
+            rows.append({
+                "specialty": self.specialties[column],
+                "provider_count": len(self._provider_ids[column]),
+                "locations": total,
+                "locations_within_threshold": within,
+                "adequacy_pct": round(100 * within / total, 1) if total else 0.0,
+                "max_distance_km": round(float(finite.max()), 2) if finite.size else None,
+            })
+        return rows
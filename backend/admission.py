@@ -0,0 +1,173 @@
+# admission.py
+
+import asyncio
+import itertools
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Cost class of the request being served, for code that dispatches its work by class
+CURRENT_COST_CLASS: ContextVar[Optional[str]] = ContextVar("current_cost_class", default=None)
+
+
+class CostClass:
+    """A group of routes sharing a concurrency limit and a bounded wait queue."""
+
+    __slots__ = ("name", "priority", "max_concurrent", "max_queue", "queue_timeout", "retry_after")
+
+    def __init__(self, name: str, priority: int, max_concurrent: int, max_queue: int,
+                 queue_timeout: float = 5.0, retry_after: int = 2):
+        self.name = name
+        self.priority = priority  # Lower is admitted first
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, cost_class: CostClass, reason: str):
+        super().__init__(f"{cost_class.name}: {reason}")
+        self.cost_class = cost_class
+        self.reason = reason
+
+
+class AdmissionController:
+    """
+    Admits requests by cost class on the event loop.
+
+    A request runs at once if its class is under its own limit and total capacity is free;
+    otherwise it waits in one priority queue (class priority, then arrival). When a slot frees,
+    the highest-priority waiter whose class has room is admitted, so queued interactive requests
+    overtake queued reports. A full class queue or a wait longer than the class timeout is
+    rejected straight away instead of piling up.
+    """
+
+    def __init__(self, classes: List[CostClass], capacity: int):
+        self.classes = {cost_class.name: cost_class for cost_class in classes}
+        self.capacity = capacity
+        self._active = {name: 0 for name in self.classes}
+        self._queued = {name: 0 for name in self.classes}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []  # Kept sorted
+        self._sequence = itertools.count()
+        self._stats = {
+            name: {"admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+                   "max_queue_depth": 0, "total_wait_ms": 0.0}
+            for name in self.classes
+        }
+
+    def _has_room(self, name: str) -> bool:
+        return (sum(self._active.values()) < self.capacity
+                and self._active[name] < self.classes[name].max_concurrent)
+
+    async def acquire(self, name: str):
+        cost_class = self.classes[name]
+        stats = self._stats[name]
+        if self._has_room(name) and not any(waiter[2] == name for waiter in self._waiters):
+            self._active[name] += 1
+            stats["admitted"] += 1
+            return
+        if self._queued[name] >= cost_class.max_queue:
+            stats["rejected_queue_full"] += 1
+            raise AdmissionRejected(cost_class, "queue full")
+
+        future = asyncio.get_running_loop().create_future()
+        waiter = (cost_class.priority, next(self._sequence), name, future)
+        self._waiters.append(waiter)
+        self._waiters.sort(key=lambda w: w[:2])
+        self._queued[name] += 1
+        stats["queued"] += 1
+        stats["max_queue_depth"] = max(stats["max_queue_depth"], self._queued[name])
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), cost_class.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                self.release(name)  # Admitted just as the wait ended; hand the slot on
+            else:
+                future.cancel()
+                self._waiters.remove(waiter)
+                self._queued[name] -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            stats["rejected_timeout"] += 1
+            raise AdmissionRejected(cost_class, "timed out waiting for capacity")
+        finally:
+            stats["total_wait_ms"] += (time.perf_counter() - started) * 1000
+
+    def release(self, name: str):
+        self._active[name] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        for waiter in list(self._waiters):
+            if sum(self._active.values()) >= self.capacity:
+                break
+            _, _, name, future = waiter
+            if self._active[name] < self.classes[name].max_concurrent:
+                self._waiters.remove(waiter)
+                self._queued[name] -= 1
+                self._active[name] += 1
+                self._stats[name]["admitted"] += 1
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "active": sum(self._active.values()),
+            "queue_depth": len(self._waiters),
+            "classes": {
+                name: {
+                    "priority": cost_class.priority,
+                    "max_concurrent": cost_class.max_concurrent,
+                    "max_queue": cost_class.max_queue,
+                    "active": self._active[name],
+                    "queue_depth": self._queued[name],
+                    **{key: round(value, 2) if isinstance(value, float) else value
+                       for key, value in self._stats[name].items()},
+                }
+                for name, cost_class in self.classes.items()
+            },
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware holding a slot of the request's cost class for the whole response,
+    including streamed bodies, and exposing the class as CURRENT_COST_CLASS meanwhile.
+    Rejected requests get 503 with Retry-After.
+    """
+
+    def __init__(self, app, controller: AdmissionController, classify: Callable[[str, str], Optional[str]]):
+        self.app = app
+        self.controller = controller
+        self.classify = classify
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        name = self.classify(scope["method"], scope["path"])
+        if name is None:
+            return await self.app(scope, receive, send)
+        try:
+            await self.controller.acquire(name)
+        except AdmissionRejected as e:
+            body = json.dumps({"detail": f"Server busy ({e.reason}); retry later"}).encode("utf-8")
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.cost_class.retry_after).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        token = CURRENT_COST_CLASS.set(name)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            CURRENT_COST_CLASS.reset(token)
+            self.controller.release(name)
@@ -0,0 +1,187 @@
+# availability.py
+
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Set
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+WEEKDAY_BITS = {day[:3]: 1 << i for i, day in enumerate(WEEKDAYS)}
+ALL_DAYS = (1 << len(WEEKDAYS)) - 1
+
+# availability_days phrases that are not a day list or range
+AVAILABILITY_PHRASES = {
+    "all days": ALL_DAYS,
+    "daily": ALL_DAYS,
+    "weekdays": WEEKDAY_BITS["mon"] | WEEKDAY_BITS["tue"] | WEEKDAY_BITS["wed"] | WEEKDAY_BITS["thu"] | WEEKDAY_BITS["fri"],
+    "weekends": WEEKDAY_BITS["sat"] | WEEKDAY_BITS["sun"],
+}
+
+# availability_days values naming a rota rather than weekdays. The data does not say which days
+# they fall on, so such doctors never match a day query; they are counted apart from unreadable values.
+NO_FIXED_DAYS_PHRASES = {"alternate days"}
+
+# consultation_type -> bits; "Both" satisfies an OPD or an IPD query
+CONSULTATION_OPD = 1
+CONSULTATION_IPD = 2
+CONSULTATION_BITS = {"opd": CONSULTATION_OPD, "ipd": CONSULTATION_IPD, "both": CONSULTATION_OPD | CONSULTATION_IPD}
+
+
+def parse_weekday(value: str) -> int:
+    """Returns the bit of a weekday given as "Tue", "Tues", "tuesday" or "TUE"; raises ValueError otherwise."""
+    text = value.strip().lower()
+    for day in WEEKDAYS:
+        if len(text) >= 3 and day.startswith(text):
+            return WEEKDAY_BITS[day[:3]]
+    raise ValueError(f"Unknown weekday: {value!r}")
+
+
+def parse_availability_days(value: Optional[str]) -> Optional[int]:
+    """
+    Parses availability_days ("Mon-Sat", "Mon, Wed, Fri", "All Days", ...) into a weekday
+    bitmask. Ranges may wrap (e.g. "Fri-Mon"). Returns None for values it cannot read.
+    """
+    if not value:
+        return None
+    text = value.strip().lower()
+    if text in AVAILABILITY_PHRASES:
+        return AVAILABILITY_PHRASES[text]
+    mask = 0
+    try:
+        for part in text.replace("/", ",").replace("&", ",").split(","):
+            part = part.strip()
+            if not part:
+                continue
+            if "-" in part:
+                first, last = (parse_weekday(day).bit_length() - 1 for day in part.split("-", 1))
+                for offset in range((last - first) % len(WEEKDAYS) + 1):
+                    mask |= 1 << ((first + offset) % len(WEEKDAYS))
+            else:
+                mask |= parse_weekday(part)
+    except ValueError:
+        return None
+    return mask or None
+
+
+class DoctorAvailabilityIndex:
+    """
+    Doctors filterable by weekday, consultation type, specialty and city.
+
+    Weekday availability and consultation type are parsed once into small bitmasks, so a
+    candidate is checked with two ANDs and a comparison. Candidates come from per-specialty
+    or per-city posting lists (whichever is shorter), each kept in descending experience_years
+    order, so results need no sort. After build(), insert() and remove() keep every list in
+    order; they replace lists rather than edit them, so a running query is not disturbed.
+    """
+
+    def __init__(self):
+        self._pending: List[tuple] = []
+        # (sort key, day mask, consultation bits, specialty key, city key, doctor)
+        self._rows: List[tuple] = []
+        self._by_specialty: Dict[str, List[tuple]] = {}
+        self._by_city: Dict[str, List[tuple]] = {}
+        self._by_id: Dict[Any, tuple] = {}
+        self._no_fixed_days: Set[Any] = set()  # IDs of doctors on a rota with unknown weekdays
+        self.unparsed = 0
+
+    @staticmethod
+    def _key(value: Optional[str]) -> Optional[str]:
+        return value.strip().casefold() if value else None
+
+    def _row(self, doctor: Dict[str, Any], availability_days: Optional[str], consultation_type: Optional[str],
+             specialty: Optional[str], city: Optional[str]) -> tuple:
+        day_mask = parse_availability_days(availability_days)
+        if day_mask is None:
+            if self._key(availability_days) in NO_FIXED_DAYS_PHRASES:
+                self._no_fixed_days.add(doctor.get("id"))
+            else:
+                self.unparsed += 1
+            day_mask = 0
+        consultation = CONSULTATION_BITS.get(self._key(consultation_type) or "", 0)
+        sort_key = (-(doctor.get("experience_years") or 0), doctor.get("id"))
+        return (sort_key, day_mask, consultation, self._key(specialty), self._key(city), doctor)
+
+    def add(self, doctor: Dict[str, Any], availability_days: Optional[str], consultation_type: Optional[str],
+            specialty: Optional[str], city: Optional[str]):
+        """Adds one doctor; `doctor` is the dict returned for it. Unreadable availability never matches a day query."""
+        self._pending.append(self._row(doctor, availability_days, consultation_type, specialty, city))
+
+    def build(self) -> "DoctorAvailabilityIndex":
+        self._rows = sorted(self._pending)
+        self._pending = []
+        self._by_specialty, self._by_city = {}, {}
+        for row in self._rows:
+            self._by_specialty.setdefault(row[3], []).append(row)
+            self._by_city.setdefault(row[4], []).append(row)
+        self._by_id = {row[5].get("id"): row for row in self._rows}
+        return self
+
+    @staticmethod
+    def _with(postings: Dict[Optional[str], List[tuple]], key: Optional[str], row: tuple, present: bool):
+        rows = list(postings.get(key, ()))
+        if present:
+            insort(rows, row)
+        else:
+            del rows[bisect_left(rows, row)]
+        if rows:
+            postings[key] = rows
+        else:
+            postings.pop(key, None)
+
+    def insert(self, doctor: Dict[str, Any], availability_days: Optional[str], consultation_type: Optional[str],
+               specialty: Optional[str], city: Optional[str]):
+        """Adds one doctor to a built index, replacing any entry with the same ID."""
+        self.remove(doctor.get("id"))
+        row = self._row(doctor, availability_days, consultation_type, specialty, city)
+        rows = list(self._rows)
+        insort(rows, row)
+        self._rows = rows
+        self._with(self._by_specialty, row[3], row, True)
+        self._with(self._by_city, row[4], row, True)
+        self._by_id[doctor.get("id")] = row
+
+    def remove(self, doctor_id: Any) -> bool:
+        """Drops one doctor from a built index."""
+        row = self._by_id.pop(doctor_id, None)
+        if row is None:
+            return False
+        rows = list(self._rows)
+        del rows[bisect_left(rows, row)]
+        self._rows = rows
+        self._with(self._by_specialty, row[3], row, False)
+        self._with(self._by_city, row[4], row, False)
+        if row[1] == 0:
+            if doctor_id in self._no_fixed_days:
+                self._no_fixed_days.discard(doctor_id)
+            else:
+                self.unparsed -= 1
+        return True
+
+    def query(self, day_bit: Optional[int] = None, specialty: Optional[str] = None, city: Optional[str] = None,
+              consultation: Optional[int] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Doctors matching every given filter (day and consultation as bits), most experienced first."""
+        specialty, city = self._key(specialty), self._key(city)
+        candidates = self._rows
+        if specialty is not None:
+            candidates = self._by_specialty.get(specialty, [])
+        if city is not None:
+            city_rows = self._by_city.get(city, [])
+            if len(city_rows) < len(candidates):
+                candidates = city_rows
+        results = []
+        for _, row_days, row_consultation, row_specialty, row_city, doctor in candidates:
+            if ((day_bit is None or row_days & day_bit)
+                    and (consultation is None or row_consultation & consultation)
+                    and (specialty is None or row_specialty == specialty)
+                    and (city is None or row_city == city)):
+                results.append(doctor)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "doctors": len(self._rows),
+            "specialties": len(self._by_specialty),
+            "cities": len(self._by_city),
+            "no_fixed_days": len(self._no_fixed_days),
+            "unparsed_availability": self.unparsed,
+        }
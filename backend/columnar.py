@@ -0,0 +1,587 @@
+# columnar.py
+
+import json
+import mmap
+import os
+import tempfile
+import threading
+from array import array
+from bisect import insort
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+MAGIC = b"HSNAP001"
+HEADER_SIZE_BYTES = 8
+
+# Column kinds stored in the snapshot
+KIND_INT = "int"        # int64 values plus a validity byte per row
+KIND_FLOAT = "float"    # float64 values plus a validity byte per row
+KIND_BOOL = "bool"      # int8 values: 1 / 0, -1 for null
+KIND_STR = "str"        # int32 dictionary codes, -1 for null
+KIND_JSON = "json"      # dictionary-encoded JSON text for mixed or nested values
+KIND_NULL = "null"      # column that is null on every row
+
+INT64_MIN = -(2 ** 63)
+INT64_MAX = 2 ** 63 - 1
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return (offset + alignment - 1) // alignment * alignment
+
+
+def _infer_kind(values: List[Any]) -> str:
+    """Picks the most compact column kind that can represent every value."""
+    types = {type(v) for v in values if v is not None}
+    if not types:
+        return KIND_NULL
+    if types == {bool}:
+        return KIND_BOOL
+    if types == {int}:
+        if all(INT64_MIN <= v <= INT64_MAX for v in values if v is not None):
+            return KIND_INT
+        return KIND_JSON
+    if types <= {int, float}:
+        return KIND_FLOAT
+    if types == {str}:
+        return KIND_STR
+    return KIND_JSON
+
+
+class _Writer:
+    """Accumulates aligned binary segments for the data region of a snapshot."""
+
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, payload: bytes) -> Dict[str, int]:
+        padding = _align(self.size) - self.size
+        if padding:
+            self.chunks.append(b"\0" * padding)
+            self.size += padding
+        segment = {"offset": self.size, "nbytes": len(payload)}
+        self.chunks.append(payload)
+        self.size += len(payload)
+        return segment
+
+
+def _encode_dictionary(writer: _Writer, strings: List[str]) -> Dict[str, Any]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("q", [0])
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    return {
+        "dict_count": len(strings),
+        "dict_offsets": writer.add(offsets.tobytes()),
+        "dict_blob": writer.add(b"".join(encoded)),
+    }
+
+
+def _encode_column(writer: _Writer, name: str, values: List[Any]) -> Dict[str, Any]:
+    kind = _infer_kind(values)
+    meta: Dict[str, Any] = {"name": name, "kind": kind}
+
+    if kind in (KIND_INT, KIND_FLOAT):
+        typecode = "q" if kind == KIND_INT else "d"
+        filler = 0 if kind == KIND_INT else 0.0
+        data = array(typecode, (filler if v is None else v for v in values))
+        meta["values"] = writer.add(data.tobytes())
+        if any(v is None for v in values):
+            validity = array("B", (0 if v is None else 1 for v in values))
+            meta["validity"] = writer.add(validity.tobytes())
+    elif kind == KIND_BOOL:
+        data = array("b", (-1 if v is None else int(v) for v in values))
+        meta["values"] = writer.add(data.tobytes())
+    elif kind in (KIND_STR, KIND_JSON):
+        if kind == KIND_JSON:
+            values = [None if v is None else json.dumps(v) for v in values]
+        dictionary: Dict[str, int] = {}
+        codes = array("i")
+        for v in values:
+            if v is None:
+                codes.append(-1)
+            else:
+                codes.append(dictionary.setdefault(v, len(dictionary)))
+        meta["values"] = writer.add(codes.tobytes())
+        meta.update(_encode_dictionary(writer, list(dictionary)))
+    return meta
+
+
+def write_snapshot(path: Path, tables: Dict[str, List[Dict[str, Any]]], signature: Dict[str, Any]) -> None:
+    """
+    Writes the given tables to a columnar snapshot file.
+    The file is written to a temporary name and atomically renamed into place, so
+    workers that already mapped an older snapshot keep reading a consistent file.
+    """
+    writer = _Writer()
+    header: Dict[str, Any] = {"signature": signature, "tables": {}}
+
+    for table_name, rows in tables.items():
+        column_names: List[str] = []
+        for row in rows:
+            for key in row:
+                if key not in column_names:
+                    column_names.append(key)
+        header["tables"][table_name] = {
+            "rows": len(rows),
+            "columns": [
+                _encode_column(writer, name, [row.get(name) for row in rows])
+                for name in column_names
+            ],
+        }
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _align(len(MAGIC) + HEADER_SIZE_BYTES + len(header_bytes))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header_bytes).to_bytes(HEADER_SIZE_BYTES, "little"))
+            f.write(header_bytes)
+            f.write(b"\0" * (data_start - f.tell()))
+            for chunk in writer.chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+
+
+class StringDictionary(Sequence):
+    """Read-only view over a dictionary of UTF-8 strings stored in the snapshot."""
+
+    __slots__ = ("_offsets", "_blob")
+
+    def __init__(self, offsets: memoryview, blob: memoryview):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        return bytes(self._blob[self._offsets[code]:self._offsets[code + 1]]).decode("utf-8")
+
+
+class Column(Sequence):
+    """A single read-only column backed by the memory-mapped snapshot."""
+
+    __slots__ = ("name", "kind", "_values", "_validity", "_dictionary", "_length")
+
+    def __init__(self, name: str, kind: str, length: int, values: Optional[memoryview] = None,
+                 validity: Optional[memoryview] = None, dictionary: Optional[StringDictionary] = None):
+        self.name = name
+        self.kind = kind
+        self._values = values
+        self._validity = validity
+        self._dictionary = dictionary
+        self._length = length
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+
+        kind = self.kind
+        if kind == KIND_NULL:
+            return None
+        if kind in (KIND_INT, KIND_FLOAT):
+            if self._validity is not None and not self._validity[index]:
+                return None
+            return self._values[index]
+        if kind == KIND_BOOL:
+            value = self._values[index]
+            return None if value < 0 else bool(value)
+        code = self._values[index]
+        if code < 0:
+            return None
+        value = self._dictionary[code]
+        return json.loads(value) if kind == KIND_JSON else value
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    @property
+    def data(self) -> Optional[memoryview]:
+        """Raw int64, float64 or int8 values of numeric and bool columns; see `validity` for nulls."""
+        return self._values if self.kind in (KIND_INT, KIND_FLOAT, KIND_BOOL) else None
+
+    @property
+    def validity(self) -> Optional[memoryview]:
+        """One byte per row of a numeric column with nulls: 0 where the value is null."""
+        return self._validity
+
+    @property
+    def codes(self) -> Optional[memoryview]:
+        """Raw dictionary codes for string columns, useful for cheap equality filters."""
+        return self._values if self.kind in (KIND_STR, KIND_JSON) else None
+
+    @property
+    def dictionary(self) -> Optional[StringDictionary]:
+        return self._dictionary
+
+
+class Row(Mapping):
+    """
+    A lightweight mapping view over one row of a table.
+    It supports the same read access as the original JSON dicts (row["id"], row.get("name")).
+    """
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "Table", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key: str) -> Any:
+        column = self._table._columns_by_name.get(key)
+        if column is None:
+            raise KeyError(key)
+        return column[self._index]
+
+    def __iter__(self):
+        return iter(self._table.column_names)
+
+    def __len__(self) -> int:
+        return len(self._table.column_names)
+
+    def __repr__(self) -> str:
+        return f"Row({dict(self)!r})"
+
+
+class Table(Sequence):
+    """A read-only table of rows stored column by column in the snapshot."""
+
+    def __init__(self, name: str, length: int, columns: List[Column]):
+        self.name = name
+        self._length = length
+        self.column_names = [c.name for c in columns]
+        self._columns_by_name = {c.name: c for c in columns}
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: int):
+        if isinstance(index, slice):
+            return [Row(self, i) for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return Row(self, index)
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield Row(self, index)
+
+    def column(self, name: str) -> Column:
+        """Returns a column by name; missing columns read as all-null."""
+        column = self._columns_by_name.get(name)
+        if column is None:
+            return Column(name, KIND_NULL, self._length)
+        return column
+
+
+class OverlayTable(Sequence):
+    """
+    A snapshot table with in-memory inserts, updates and deletes layered on top, keyed by a unique column.
+
+    It reads like a Table. Until the first change, rows and columns come straight from the
+    snapshot; afterwards the live rows (surviving snapshot rows in order, then inserts) and any
+    requested columns are materialized once and then patched per change. An update or insert
+    patches one element of each list in place, so it costs the same however large the table is;
+    a delete moves every later row, so it swaps in shortened copies and a reader holding the
+    previous lists keeps a consistent view.
+    """
+
+    def __init__(self, base: Table, key: str = "id"):
+        self.name = base.name
+        self.key = key
+        self._base = base
+        self._lock = threading.RLock()
+        self._base_positions = {value: i for i, value in enumerate(base.column(key))}
+        self._replaced: Dict[int, Dict[str, Any]] = {}
+        self._deleted = set()
+        self._inserted: Dict[Any, Dict[str, Any]] = {}
+        self._max_key = max((k for k in self._base_positions if isinstance(k, int)), default=0)
+        self._live: Optional[List[Mapping]] = None
+        self._dicts: Optional[List[Dict[str, Any]]] = None
+        self._columns: Dict[str, List[Any]] = {}
+        self._groups: Dict[str, Dict[Any, List[int]]] = {}
+        self._positions: Optional[Dict[Any, int]] = None
+        self.version = 0
+
+    @property
+    def dirty(self) -> bool:
+        return self.version > 0
+
+    @property
+    def column_names(self) -> List[str]:
+        names = list(self._base.column_names)
+        with self._lock:
+            for row in [*self._replaced.values(), *self._inserted.values()]:
+                names.extend(name for name in row if name not in names)
+        return names
+
+    def _rows(self) -> List[Mapping]:
+        with self._lock:
+            if self._live is None:
+                rows = [
+                    self._replaced[i] if i in self._replaced else Row(self._base, i)
+                    for i in range(len(self._base)) if i not in self._deleted
+                ]
+                rows.extend(self._inserted.values())
+                self._live = rows
+            return self._live
+
+    def __len__(self) -> int:
+        return len(self._rows()) if self.dirty else len(self._base)
+
+    def __getitem__(self, index):
+        return self._rows()[index] if self.dirty else self._base[index]
+
+    def __iter__(self):
+        return iter(self._rows()) if self.dirty else iter(self._base)
+
+    def column(self, name: str):
+        if not self.dirty:
+            return self._base.column(name)
+        with self._lock:
+            values = self._columns.get(name)
+            if values is None:
+                values = self._columns[name] = [row.get(name) for row in self._rows()]
+            return values
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """The live rows as plain dicts, cached until the next change."""
+        with self._lock:
+            if self._dicts is None:
+                self._dicts = [dict(row) for row in self._rows()]
+            return self._dicts
+
+    def select(self, column: str, values: Iterable[Any]) -> List[Dict[str, Any]]:
+        """
+        Rows whose `column` is one of `values`, in table order, as plain dicts. The positions
+        are looked up and the rows read under one lock, so both come from the same version.
+        """
+        with self._lock:
+            index = self._groups.get(column)
+            if index is None:
+                index = self._groups[column] = {}
+                for position, value in enumerate(self.column(column)):
+                    index.setdefault(value, []).append(position)
+            rows = self._rows() if self.dirty else self._base
+            positions = sorted(p for value in set(values) for p in index.get(value, ()))
+            return [dict(rows[p]) for p in positions]
+
+    # ----- Changes ----- #
+    def get(self, key: Any) -> Optional[Mapping]:
+        with self._lock:
+            position = self._base_positions.get(key)
+            if position is not None and position not in self._deleted:
+                return self._replaced.get(position) or Row(self._base, position)
+            return self._inserted.get(key)
+
+    def position(self, key: Any) -> Optional[int]:
+        """Position of the row with `key` among the live rows, or None."""
+        with self._lock:
+            if not self.dirty:
+                return self._base_positions.get(key)
+            self._rows()
+            return self._live_position(key)
+
+    def next_key(self) -> int:
+        with self._lock:
+            return self._max_key + 1
+
+    def _changed(self):
+        """Drops everything materialized, for changes that move rows around."""
+        self._live = None
+        self._dicts = None
+        self._columns = {}
+        self._groups = {}
+        self._positions = None
+        self.version += 1
+
+    def _live_position(self, key: Any) -> Optional[int]:
+        if self._positions is None:
+            self._positions = {row.get(self.key): i for i, row in enumerate(self._live)}
+        return self._positions.get(key)
+
+    def _patched(self, position: Optional[int], row: Optional[Dict[str, Any]]):
+        """
+        Carries the materialized rows, columns and groups over to the next version: the live row
+        at `position` is replaced by `row`, or removed when `row` is None; a `position` of None
+        appends `row`.
+        """
+        if self._live is None:
+            self._changed()
+            return
+
+        def patch(values: List[Any], value: Any) -> List[Any]:
+            if position is None:
+                values.append(value)
+            elif row is None:
+                values = values[:position] + values[position + 1:]
+            else:
+                values[position] = value
+            return values
+
+        old = self._live[position] if position is not None else None
+        self._live = patch(self._live, row)
+        if self._dicts is not None:
+            self._dicts = patch(self._dicts, dict(row) if row is not None else None)
+        self._columns = {
+            name: patch(values, row.get(name) if row is not None else None) for name, values in self._columns.items()
+        }
+        if row is None:
+            # Every later position shifts down by one
+            self._groups = {}
+            self._positions = None
+        elif position is None:
+            position = len(self._live) - 1
+            for name, index in self._groups.items():
+                index.setdefault(row.get(name), []).append(position)
+            if self._positions is not None:
+                self._positions[row.get(self.key)] = position
+        else:
+            for name, index in self._groups.items():
+                before, after = old.get(name), row.get(name)
+                if before != after:
+                    index[before].remove(position)
+                    if not index[before]:
+                        del index[before]
+                    insort(index.setdefault(after, []), position)
+        self.version += 1
+
+    def upsert(self, row: Dict[str, Any]):
+        """Inserts a row or replaces the row with the same key."""
+        key = row[self.key]
+        row = dict(row)
+        with self._lock:
+            position = self._base_positions.get(key)
+            if position is not None and position in self._deleted:
+                # A deleted snapshot row comes back at its old place, between other rows
+                self._deleted.discard(position)
+                self._replaced[position] = row
+                self._changed()
+            elif position is not None or key in self._inserted:
+                live = self._live_position(key) if self._live is not None else None
+                if position is not None:
+                    self._replaced[position] = row
+                else:
+                    self._inserted[key] = row
+                self._patched(live, row)
+            else:
+                self._inserted[key] = row
+                if isinstance(key, int):
+                    self._max_key = max(self._max_key, key)
+                self._patched(None, row)
+
+    def delete(self, key: Any) -> bool:
+        with self._lock:
+            live = self._live_position(key) if self._live is not None else None
+            position = self._base_positions.get(key)
+            if position is not None and position not in self._deleted:
+                self._deleted.add(position)
+                self._replaced.pop(position, None)
+            elif self._inserted.pop(key, None) is None:
+                return False
+            self._patched(live, None)
+            return True
+
+
+class ColumnarSnapshot:
+    """
+    A memory-mapped, read-only columnar snapshot of the JSON datasets.
+    Every worker process maps the same file, so the column data lives once in the
+    OS page cache instead of once per worker as Python dicts.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"Not a columnar snapshot: {self.path}")
+        header_size = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + HEADER_SIZE_BYTES], "little")
+        header_start = len(MAGIC) + HEADER_SIZE_BYTES
+        header = json.loads(bytes(buffer[header_start:header_start + header_size]).decode("utf-8"))
+        data = buffer[_align(header_start + header_size):]
+
+        self.signature = header["signature"]
+        self.tables: Dict[str, Table] = {}
+        for table_name, table_meta in header["tables"].items():
+            length = table_meta["rows"]
+            columns = [self._open_column(data, meta, length) for meta in table_meta["columns"]]
+            self.tables[table_name] = Table(table_name, length, columns)
+
+    @staticmethod
+    def _open_column(data: memoryview, meta: Dict[str, Any], length: int) -> Column:
+        def segment(key: str, fmt: str) -> memoryview:
+            start = meta[key]["offset"]
+            return data[start:start + meta[key]["nbytes"]].cast(fmt)
+
+        kind = meta["kind"]
+        if kind == KIND_NULL:
+            return Column(meta["name"], kind, length)
+        if kind in (KIND_INT, KIND_FLOAT):
+            validity = segment("validity", "B") if "validity" in meta else None
+            return Column(meta["name"], kind, length, segment("values", "q" if kind == KIND_INT else "d"), validity)
+        if kind == KIND_BOOL:
+            return Column(meta["name"], kind, length, segment("values", "b"))
+        blob_start = meta["dict_blob"]["offset"]
+        dictionary = StringDictionary(
+            segment("dict_offsets", "q"),
+            data[blob_start:blob_start + meta["dict_blob"]["nbytes"]],
+        )
+        return Column(meta["name"], kind, length, segment("values", "i"), dictionary=dictionary)
+
+    def table(self, name: str) -> Table:
+        return self.tables[name]
+
+
+def source_signature(base_path: Path, filenames: Iterable[str]) -> Dict[str, Any]:
+    """Fingerprints the source JSON files so a stale snapshot can be detected."""
+    signature = {}
+    for filename in filenames:
+        stat = (base_path / filename).stat()
+        signature[filename] = [stat.st_mtime_ns, stat.st_size]
+    return signature
+
+
+def load_snapshot(base_path: Path, datasets: Dict[str, str], snapshot_path: Path,
+                  reader: Callable[[str], List[Dict[str, Any]]]) -> ColumnarSnapshot:
+    """
+    Maps the snapshot for the given datasets, rebuilding it first when it is missing
+    or older than the JSON source files.
+
+    `datasets` maps table names to JSON file names; `reader` loads one JSON file.
+    """
+    signature = source_signature(base_path, datasets.values())
+    if snapshot_path.exists():
+        try:
+            snapshot = ColumnarSnapshot(snapshot_path)
+            if snapshot.signature == signature:
+                return snapshot
+        except (ValueError, KeyError, json.JSONDecodeError):
+            pass  # Corrupt or incompatible snapshot, rebuild it below
+
+    tables = {name: reader(filename) for name, filename in datasets.items()}
+    write_snapshot(snapshot_path, tables, signature)
+    return ColumnarSnapshot(snapshot_path)
@@ -0,0 +1,121 @@
+# coverage.py
+
+import base64
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Response formats supported by CoverageMatrix.render()
+FORMAT_DENSE = "dense"
+FORMAT_SPARSE = "sparse"
+FORMAT_BITSET = "bitset"
+COVERAGE_FORMATS = (FORMAT_DENSE, FORMAT_SPARSE, FORMAT_BITSET)
+
+
+class CoverageMatrix:
+    """
+    A boolean coverage matrix stored as one bitset per row.
+
+    Each row is a Python int whose bit i is set when column i is covered, so a cell
+    costs one bit instead of a dict entry, and responses can list only the covered
+    cells (sparse) or ship the packed bits (bitset).
+    """
+
+    def __init__(self, row_labels: List[str], column_labels: List[str], row_bits: List[int]):
+        self.row_labels = row_labels
+        self.column_labels = column_labels
+        self.row_bits = row_bits
+        self._row_index = {label: i for i, label in enumerate(row_labels)}
+        self._column_index = {label: i for i, label in enumerate(column_labels)}
+
+    @classmethod
+    def from_pairs(cls, rows: Iterable[str], columns: Iterable[str],
+                   covered_pairs: Iterable[Tuple[str, str]]) -> "CoverageMatrix":
+        """Builds a matrix from the full row and column label sets and the covered (row, column) pairs."""
+        row_labels = sorted(set(rows))
+        column_labels = sorted(set(columns))
+        row_index = {label: i for i, label in enumerate(row_labels)}
+        column_index = {label: i for i, label in enumerate(column_labels)}
+        row_bits = [0] * len(row_labels)
+        for row, column in covered_pairs:
+            r, c = row_index.get(row), column_index.get(column)
+            if r is not None and c is not None:
+                row_bits[r] |= 1 << c
+        return cls(row_labels, column_labels, row_bits)
+
+    def is_covered(self, row: str, column: str) -> bool:
+        r, c = self._row_index.get(row), self._column_index.get(column)
+        return r is not None and c is not None and bool(self.row_bits[r] >> c & 1)
+
+    def select(self, rows: Optional[Iterable[str]] = None, columns: Optional[Iterable[str]] = None) -> "CoverageMatrix":
+        """Returns the sub-matrix for the given row and column labels (unknown labels are ignored)."""
+        if rows is None:
+            row_positions = list(range(len(self.row_labels)))
+        else:
+            wanted = set(rows)
+            row_positions = [i for i, label in enumerate(self.row_labels) if label in wanted]
+
+        if columns is None:
+            return CoverageMatrix(
+                [self.row_labels[i] for i in row_positions],
+                self.column_labels,
+                [self.row_bits[i] for i in row_positions],
+            )
+
+        wanted = set(columns)
+        column_positions = [i for i, label in enumerate(self.column_labels) if label in wanted]
+        row_bits = []
+        for i in row_positions:
+            bits, packed = self.row_bits[i], 0
+            for new_index, old_index in enumerate(column_positions):
+                if bits >> old_index & 1:
+                    packed |= 1 << new_index
+            row_bits.append(packed)
+        return CoverageMatrix(
+            [self.row_labels[i] for i in row_positions],
+            [self.column_labels[i] for i in column_positions],
+            row_bits,
+        )
+
+    @staticmethod
+    def _set_bits(bits: int) -> List[int]:
+        positions = []
+        while bits:
+            low = bits & -bits
+            positions.append(low.bit_length() - 1)
+            bits ^= low
+        return positions
+
+    def column_counts(self) -> List[int]:
+        """Number of covered rows per column."""
+        counts = [0] * len(self.column_labels)
+        for bits in self.row_bits:
+            for c in self._set_bits(bits):
+                counts[c] += 1
+        return counts
+
+    def render(self, fmt: str = FORMAT_SPARSE) -> Any:
+        """
+        Serializes the matrix body.
+
+        dense  - one {label: bool} dict per row
+        sparse - the covered column indices of each row
+        bitset - base64 of each row bitset, little-endian, ceil(columns / 8) bytes
+        """
+        if fmt == FORMAT_DENSE:
+            return [
+                {label: bool(bits >> c & 1) for c, label in enumerate(self.column_labels)}
+                for bits in self.row_bits
+            ]
+        if fmt == FORMAT_SPARSE:
+            return [self._set_bits(bits) for bits in self.row_bits]
+        if fmt == FORMAT_BITSET:
+            width = (len(self.column_labels) + 7) // 8
+            return [base64.b64encode(bits.to_bytes(width, "little")).decode("ascii") for bits in self.row_bits]
+        raise ValueError(f"Unknown coverage format: {fmt}")
+
+    def stats(self) -> Dict[str, int]:
+        covered = sum(bin(bits).count("1") for bits in self.row_bits)
+        return {
+            "row_count": len(self.row_labels),
+            "column_count": len(self.column_labels),
+            "covered_cells": covered,
+        }
@@ -0,0 +1,137 @@
+# cube.py
+
+from itertools import combinations
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class RollupCube:
+    """
+    Pre-aggregated sums of additive measures over every combination of a fixed set of dimensions.
+
+    Facts are added at the finest grain, then build() materializes one table of cells per
+    grouping (all 2^d subsets of the dimensions). A query picks the grouping that covers its
+    group-by and filter dimensions, so its cost is the number of cells in that grouping,
+    not the number of facts. Measures must be additive (sums and counts), which also lets
+    replace() swap a fact in a built cube by adjusting one cell per grouping.
+    """
+
+    def __init__(self, dimensions: Sequence[str], measures: Sequence[str]):
+        self.dimensions = tuple(dimensions)
+        self.measures = tuple(measures)
+        self._base: Dict[Tuple, List[float]] = {}
+        self._groupings: Dict[Tuple[str, ...], Dict[Tuple, List[float]]] = {}
+
+    def add(self, dimension_values: Dict[str, Any], measure_values: Dict[str, Any]):
+        """Adds one fact; missing measures count as 0."""
+        key = tuple(dimension_values.get(dim) for dim in self.dimensions)
+        cell = self._base.get(key)
+        if cell is None:
+            # The measures, then the number of facts in the cell
+            cell = self._base[key] = [0] * (len(self.measures) + 1)
+        for i, measure in enumerate(self.measures):
+            cell[i] += measure_values.get(measure) or 0
+        cell[-1] += 1
+
+    def replace(self, old: Optional[Tuple[Dict[str, Any], Dict[str, Any]]],
+                new: Optional[Tuple[Dict[str, Any], Dict[str, Any]]]):
+        """
+        Swaps one (dimension values, measure values) fact for another in a built cube; either may
+        be None to only add or only remove. Cells are replaced rather than edited, so a running
+        query sees each cell whole, and a cell left without facts is dropped.
+        """
+        changes = [
+            (tuple(fact[0].get(dim) for dim in self.dimensions),
+             [sign * (fact[1].get(measure) or 0) for measure in self.measures] + [sign])
+            for fact, sign in ((old, -1), (new, 1)) if fact is not None
+        ]
+        positions = {dim: i for i, dim in enumerate(self.dimensions)}
+        self._base = self._adjusted(self._base, changes)
+        for grouping, cells in list(self._groupings.items()):
+            indexes = [positions[dim] for dim in grouping]
+            self._groupings[grouping] = self._adjusted(
+                cells, [(tuple(key[i] for i in indexes), delta) for key, delta in changes])
+
+    @staticmethod
+    def _adjusted(cells: Dict[Tuple, List[float]], changes: List[Tuple[Tuple, List[float]]]) -> Dict[Tuple, List[float]]:
+        merged: Dict[Tuple, List[float]] = {}
+        for key, delta in changes:
+            total = merged.get(key)
+            merged[key] = delta if total is None else [a + b for a, b in zip(total, delta)]
+        if any(key not in cells or cells[key][-1] + delta[-1] <= 0 for key, delta in merged.items()):
+            cells = dict(cells)  # Keys come or go: leave the dict a running query iterates alone
+        for key, delta in merged.items():
+            cell = [a + b for a, b in zip(cells.get(key, [0] * len(delta)), delta)]
+            if cell[-1] > 0:
+                cells[key] = cell
+            else:
+                cells.pop(key, None)
+        return cells
+
+    def build(self) -> "RollupCube":
+        """Materializes the cells of every grouping from the base cells, keeping first-seen order."""
+        positions = {dim: i for i, dim in enumerate(self.dimensions)}
+        self._groupings = {}
+        for size in range(len(self.dimensions) + 1):
+            for grouping in combinations(self.dimensions, size):
+                indexes = [positions[dim] for dim in grouping]
+                cells = {}
+                for base_key, base_cell in self._base.items():
+                    key = tuple(base_key[i] for i in indexes)
+                    cell = cells.get(key)
+                    if cell is None:
+                        cells[key] = list(base_cell)
+                    else:
+                        for i, value in enumerate(base_cell):
+                            cell[i] += value
+                self._groupings[grouping] = cells
+        return self
+
+    def _validate(self, group_by: Iterable[str], measures: Iterable[str], filters: Dict[str, Any]):
+        unknown = [dim for dim in [*group_by, *filters] if dim not in self.dimensions]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {', '.join(dict.fromkeys(unknown))}")
+        unknown = [measure for measure in measures if measure not in self.measures]
+        if unknown:
+            raise ValueError(f"Unknown measure(s): {', '.join(unknown)}")
+
+    @staticmethod
+    def _normalize(value: Any) -> Any:
+        return value.casefold() if isinstance(value, str) else value
+
+    def query(self, group_by: Sequence[str], measures: Optional[Sequence[str]] = None,
+              filters: Optional[Dict[str, Iterable[Any]]] = None) -> List[Dict[str, Any]]:
+        """
+        Returns one row per distinct group-by value tuple with the requested measures summed.
+
+        `filters` maps a dimension to the values it may take; string values match
+        case-insensitively. Rows come back in the order their groups were first seen.
+        """
+        measures = list(measures) if measures else list(self.measures)
+        filters = {dim: {self._normalize(v) for v in values} for dim, values in (filters or {}).items()}
+        self._validate(group_by, measures, filters)
+
+        needed = set(group_by) | set(filters)
+        grouping = tuple(dim for dim in self.dimensions if dim in needed)
+        measure_indexes = [self.measures.index(measure) for measure in measures]
+        merged: Dict[Tuple, Dict[str, Any]] = {}
+        for key, cell in self._groupings[grouping].items():
+            values = dict(zip(grouping, key))
+            if any(self._normalize(values[dim]) not in allowed for dim, allowed in filters.items()):
+                continue
+            out_key = tuple(values[dim] for dim in group_by)
+            row = merged.get(out_key)
+            if row is None:
+                row = merged[out_key] = {
+                    **{dim: values[dim] for dim in group_by},
+                    **{measure: 0 for measure in measures},
+                }
+            for measure, i in zip(measures, measure_indexes):
+                row[measure] += cell[i]
+        return list(merged.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "base_cells": len(self._base),
+            "groupings": len(self._groupings),
+            "cells": sum(len(cells) for cells in self._groupings.values()),
+        }
@@ -0,0 +1,167 @@
+# documents.py
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class DocumentTooLargeError(ValueError):
+    """An upload exceeded the store's size limit."""
+
+
+class DocumentStore:
+    """
+    Content-addressed file store: every blob lives at objects/<sha256[:2]>/<sha256>.
+
+    Uploads stream into a temporary file while being hashed, so memory use does not depend on
+    the file size, and identical content is kept once however often it is uploaded. Blobs are
+    reference counted by the document rows pointing at them and removed with the last one.
+
+    Several worker processes may share the root, but only the `writer` (the journal writer)
+    uploads, counts references and deletes blobs; the others only read. Each process stages
+    uploads in its own tmp/<pid> directory.
+    """
+
+    def __init__(self, root: Path, max_bytes: Optional[int] = None, writer: bool = True):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp" / str(os.getpid())
+        self.max_bytes = max_bytes
+        self.writer = writer
+        self._lock = threading.Lock()
+        self._refs: Counter = Counter()
+        self.uploads = 0
+        self.deduplicated_uploads = 0
+        self.bytes_received = 0
+        self.bytes_deduplicated = 0
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        # Partial uploads of an earlier process with this PID can never be committed
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        if writer:
+            self._remove_orphaned_uploads()
+
+    def _remove_orphaned_uploads(self):
+        """Deletes the staging directories of processes that have exited (and files of the older flat layout)."""
+        for path in self.tmp_dir.parent.iterdir():
+            if path == self.tmp_dir:
+                continue
+            if not path.is_dir():
+                path.unlink(missing_ok=True)
+                continue
+            try:
+                os.kill(int(path.name), 0)
+            except (ValueError, ProcessLookupError):
+                shutil.rmtree(path, ignore_errors=True)
+            except PermissionError:
+                pass  # Alive, run by another user
+
+    def _require_writer(self):
+        if not self.writer:
+            raise RuntimeError("Only the journal writer process may change the document store")
+
+    def path_for(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest).is_file()
+
+    def load_references(self, digests: Iterable[Optional[str]]):
+        """Sets reference counts from the documents that exist at startup."""
+        if not self.writer:
+            return
+        with self._lock:
+            self._refs = Counter(digest for digest in digests if digest)
+
+    def acquire(self, digest: str):
+        self._require_writer()
+        with self._lock:
+            self._refs[digest] += 1
+
+    def release(self, digest: str):
+        """Drops one reference; the blob is deleted once nothing refers to it."""
+        self._require_writer()
+        with self._lock:
+            self._refs[digest] -= 1
+            if self._refs[digest] > 0:
+                return
+            del self._refs[digest]
+            try:
+                self.path_for(digest).unlink()
+            except FileNotFoundError:
+                pass
+
+    def begin_upload(self) -> "BlobUpload":
+        self._require_writer()
+        return BlobUpload(self)
+
+    def _commit(self, tmp_path: Path, digest: str, size: int) -> bool:
+        """Moves a finished upload into place and takes a reference on it; returns True if it was a duplicate."""
+        target = self.path_for(digest)
+        with self._lock:
+            self.uploads += 1
+            self.bytes_received += size
+            self._refs[digest] += 1
+            if target.is_file():
+                os.unlink(tmp_path)
+                self.deduplicated_uploads += 1
+                self.bytes_deduplicated += size
+                return True
+            target.parent.mkdir(exist_ok=True)
+            os.replace(tmp_path, target)
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "writer": self.writer,
+                "blobs_referenced": len(self._refs),
+                "references": sum(self._refs.values()),
+                "uploads": self.uploads,
+                "deduplicated_uploads": self.deduplicated_uploads,
+                "bytes_received": self.bytes_received,
+                "bytes_deduplicated": self.bytes_deduplicated,
+            }
+
+
+class BlobUpload:
+    """One streaming upload: write() chunks as they arrive, then commit() or abort()."""
+
+    def __init__(self, store: DocumentStore):
+        self._store = store
+        fd, path = tempfile.mkstemp(dir=store.tmp_dir, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+        self._path = Path(path)
+        self._hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, chunk: bytes):
+        self.size += len(chunk)
+        if self._store.max_bytes is not None and self.size > self._store.max_bytes:
+            raise DocumentTooLargeError(f"Upload exceeds the {self._store.max_bytes} byte limit")
+        self._hash.update(chunk)
+        self._file.write(chunk)
+
+    def commit(self) -> Tuple[str, int, bool]:
+        """
+        Makes the upload durable and returns (sha256, size, deduplicated). The caller owns one
+        reference to the blob and must release() it if no document ends up pointing at it.
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        digest = self._hash.hexdigest()
+        return digest, self.size, self._store._commit(self._path, digest, self.size)
+
+    def abort(self):
+        self._file.close()
+        try:
+            self._path.unlink()
+        except FileNotFoundError:
+            pass
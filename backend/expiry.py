@@ -0,0 +1,197 @@
+# expiry.py
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Results of ExpiryIndex.status()
+STATUS_VALID = "valid"
+STATUS_EXPIRED = "expired"
+STATUS_MALFORMED = "malformed"
+STATUS_MISSING = "missing"
+
+
+def parse_expiry_date(value: Optional[str]) -> Tuple[Optional[date], str]:
+    """Parses a YYYY-MM-DD date once, reporting whether it was missing or malformed."""
+    if not value:
+        return None, STATUS_MISSING
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date(), STATUS_VALID
+    except (TypeError, ValueError):
+        return None, STATUS_MALFORMED
+
+
+class _SortedExpiries:
+    """Parallel sorted arrays of expiry ordinals and the entries they belong to."""
+
+    __slots__ = ("ordinals", "entries")
+
+    def __init__(self):
+        self.ordinals: List[Tuple[int, int]] = []
+        self.entries: List[Dict[str, Any]] = []
+
+    def add(self, entry: Dict[str, Any], keep_sorted: bool = True):
+        key = (entry["_ordinal"], entry["_seq"])
+        if keep_sorted:
+            index = bisect_left(self.ordinals, key)
+            self.ordinals.insert(index, key)
+            self.entries.insert(index, entry)
+        else:
+            self.ordinals.append(key)
+            self.entries.append(entry)
+
+    def sort(self):
+        order = sorted(range(len(self.ordinals)), key=self.ordinals.__getitem__)
+        self.ordinals = [self.ordinals[i] for i in order]
+        self.entries = [self.entries[i] for i in order]
+
+    def between(self, start: date, end: date) -> List[Dict[str, Any]]:
+        lo = bisect_left(self.ordinals, (start.toordinal(), -1))
+        hi = bisect_right(self.ordinals, (end.toordinal(), float("inf")))
+        return self.entries[lo:hi]
+
+    def before(self, day: date) -> List[Dict[str, Any]]:
+        return self.entries[:bisect_left(self.ordinals, (day.toordinal(), -1))]
+
+    def first_on_or_after(self, day: date) -> Optional[Dict[str, Any]]:
+        index = bisect_left(self.ordinals, (day.toordinal(), -1))
+        return self.entries[index] if index < len(self.entries) else None
+
+
+class ExpiryIndex:
+    """
+    Expiry dates of certifications and licenses, parsed once and kept in sorted arrays.
+
+    Arrays exist for every record kind, every (kind, type) pair and every hospital, so
+    window ("expiring between X and Y"), cut-off ("expired as of D") and next-expiry
+    queries are answered with bisect instead of scanning and re-parsing every record.
+    """
+
+    def __init__(self):
+        self._records: Dict[Tuple[str, Any], Dict[str, Any]] = {}
+        self._all = _SortedExpiries()
+        self._by_kind: Dict[str, _SortedExpiries] = defaultdict(_SortedExpiries)
+        self._by_type: Dict[Tuple[str, str], _SortedExpiries] = defaultdict(_SortedExpiries)
+        self._by_hospital: Dict[Any, _SortedExpiries] = defaultdict(_SortedExpiries)
+        self._seq = 0
+
+    def add(self, kind: str, record_id: Any, hospital_id: Any, record_type: Optional[str],
+            expiry_value: Optional[str], _keep_sorted: bool = True, **details: Any):
+        """Indexes one record; records without a parseable date are kept for status lookups only."""
+        expiry, status = parse_expiry_date(expiry_value)
+        entry = {
+            "kind": kind,
+            "record_id": record_id,
+            "hospital_id": hospital_id,
+            "type": record_type,
+            "expiry_date": expiry.isoformat() if expiry else expiry_value,
+            **details,
+            "_expiry": expiry,
+            "_parse_status": status,
+            "_seq": self._seq,
+        }
+        self._seq += 1
+        self._records[(kind, record_id)] = entry
+        if expiry is None:
+            return
+        entry["_ordinal"] = expiry.toordinal()
+        for sorted_expiries in (self._all, self._by_kind[kind], self._by_type[(kind, record_type)],
+                                self._by_hospital[hospital_id]):
+            sorted_expiries.add(entry, keep_sorted=_keep_sorted)
+
+    def _sorted_arrays(self) -> List[_SortedExpiries]:
+        return [self._all, *self._by_kind.values(), *self._by_type.values(), *self._by_hospital.values()]
+
+    def add_many(self, kind: str, rows: Iterable[Dict[str, Any]], type_field: str, date_field: str,
+                 detail_fields: Iterable[str] = ()):
+        """Bulk-indexes rows, sorting each array once at the end instead of per insert."""
+        detail_fields = list(detail_fields)
+        for row in rows:
+            self.add(kind, row.get("id"), row.get("hospital_id"), row.get(type_field), row.get(date_field),
+                     _keep_sorted=False, **{field: row.get(field) for field in detail_fields})
+        for sorted_expiries in self._sorted_arrays():
+            sorted_expiries.sort()
+
+    # ----- Lookups ----- #
+    def expiry_of(self, kind: str, record_id: Any) -> Optional[date]:
+        entry = self._records.get((kind, record_id))
+        return entry["_expiry"] if entry else None
+
+    def status(self, kind: str, record_id: Any, as_of: date, expiry_value: Optional[str] = None) -> str:
+        """
+        Returns valid / expired / malformed / missing for a record as of a date.
+        Records that are not indexed fall back to parsing `expiry_value`.
+        """
+        entry = self._records.get((kind, record_id))
+        if entry is not None:
+            expiry, parse_status = entry["_expiry"], entry["_parse_status"]
+        else:
+            expiry, parse_status = parse_expiry_date(expiry_value)
+        if expiry is None:
+            return parse_status
+        return STATUS_VALID if expiry >= as_of else STATUS_EXPIRED
+
+    def _scope(self, kind: Optional[str], record_type: Optional[str], hospital_id: Any = None) -> _SortedExpiries:
+        if hospital_id is not None:
+            return self._by_hospital.get(hospital_id, _SortedExpiries())
+        if kind and record_type:
+            return self._by_type.get((kind, record_type), _SortedExpiries())
+        if kind:
+            return self._by_kind.get(kind, _SortedExpiries())
+        return self._all
+
+    @staticmethod
+    def _filter(entries: List[Dict[str, Any]], kind: Optional[str], record_type: Optional[str]) -> List[Dict[str, Any]]:
+        return [
+            e for e in entries
+            if (kind is None or e["kind"] == kind) and (record_type is None or e["type"] == record_type)
+        ]
+
+    def expiring_between(self, start: date, end: date, kind: Optional[str] = None,
+                         record_type: Optional[str] = None, hospital_id: Any = None) -> List[Dict[str, Any]]:
+        """Records expiring on or after `start` and on or before `end`, soonest first."""
+        entries = self._scope(kind, record_type, hospital_id).between(start, end)
+        if hospital_id is not None or (record_type and not kind):
+            entries = self._filter(entries, kind, record_type)
+        return entries
+
+    def expired_as_of(self, day: date, kind: Optional[str] = None, record_type: Optional[str] = None,
+                      hospital_id: Any = None) -> List[Dict[str, Any]]:
+        """Records whose expiry date is before `day`, oldest first."""
+        entries = self._scope(kind, record_type, hospital_id).before(day)
+        if hospital_id is not None or (record_type and not kind):
+            entries = self._filter(entries, kind, record_type)
+        return entries
+
+    def next_expiry(self, hospital_id: Any, as_of: date, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """The first record of a hospital expiring on or after `as_of`."""
+        scope = self._by_hospital.get(hospital_id)
+        if scope is None:
+            return None
+        if kind is None:
+            return scope.first_on_or_after(as_of)
+        index = bisect_left(scope.ordinals, (as_of.toordinal(), -1))
+        return next((e for e in scope.entries[index:] if e["kind"] == kind), None)
+
+    def earliest_expiry_after(self, as_of: date) -> Optional[date]:
+        """The first expiry date strictly after `as_of` across all records."""
+        index = bisect_right(self._all.ordinals, (as_of.toordinal(), float("inf")))
+        return self._all.entries[index]["_expiry"] if index < len(self._all.entries) else None
+
+    def next_status_change(self, as_of: date, kind: Optional[str] = None, record_type: Optional[str] = None,
+                           hospital_id: Any = None) -> Optional[date]:
+        """
+        The first date after `as_of` on which status() of a record in scope differs from its
+        status on `as_of`: the day after the first expiry on or after `as_of`.
+        """
+        scope = self._scope(kind, record_type, hospital_id)
+        index = bisect_left(scope.ordinals, (as_of.toordinal(), -1))
+        for entry in scope.entries[index:]:
+            if (kind is None or entry["kind"] == kind) and (record_type is None or entry["type"] == record_type):
+                return entry["_expiry"] + timedelta(days=1)
+        return None
+
+    @staticmethod
+    def public(entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value for key, value in entry.items() if not key.startswith("_")}
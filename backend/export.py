@@ -0,0 +1,96 @@
+# export.py
+
+import csv
+import io
+import json
+from typing import Any, Dict, Iterator, List, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pa_parquet
+except ImportError:  # CSV exports work without pyarrow; Parquet and Arrow IPC need it
+    pa = None
+
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+FORMAT_ARROW = "arrow"
+
+# Export format -> (media type, file extension)
+EXPORT_FORMATS = {
+    FORMAT_CSV: ("text/csv; charset=utf-8", "csv"),
+    FORMAT_PARQUET: ("application/vnd.apache.parquet", "parquet"),
+    FORMAT_ARROW: ("application/vnd.apache.arrow.stream", "arrows"),
+}
+
+# Columns are {name: values}, every values sequence the same length, so reports never
+# need to be materialized as one dict per row.
+Columns = Dict[str, Sequence[Any]]
+
+
+class ExportUnavailableError(RuntimeError):
+    """The requested export format needs an optional dependency that is not installed."""
+
+
+def columns_from_rows(rows: List[Dict[str, Any]]) -> Columns:
+    """Transposes a list of row dicts (for reports only available that way) into columns."""
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    return {name: [row.get(name) for row in rows] for name in names}
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def iter_csv(columns: Columns, chunk_rows: int = 5000) -> Iterator[bytes]:
+    """Yields the columns as UTF-8 CSV, a block of `chunk_rows` rows at a time, header first."""
+    names = list(columns)
+    values = [columns[name] for name in names]
+    length = len(values[0]) if values else 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    for start in range(0, length, chunk_rows):
+        block = [map(_csv_value, column[start:start + chunk_rows]) for column in values]
+        writer.writerows(zip(*block))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if not length:
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_array(values: Sequence[Any]):
+    """Builds a typed Arrow array; strings (and nested values, as JSON text) are dictionary-encoded."""
+    values = list(values)
+    types = {type(v) for v in values if v is not None}
+    if not types:
+        return pa.nulls(len(values))
+    if types == {bool}:
+        return pa.array(values, pa.bool_())
+    if types == {int}:
+        try:
+            return pa.array(values, pa.int64())
+        except OverflowError:
+            pass
+    elif types <= {int, float}:
+        return pa.array(values, pa.float64())
+    if types != {str}:
+        values = [None if v is None else json.dumps(v, ensure_ascii=False) for v in values]
+    return pa.array(values, pa.string()).dictionary_encode()
+
+
+def write_columnar(columns: Columns, export_format: str) -> bytes:
+    """Encodes the columns as a Parquet file or an Arrow IPC stream."""
+    if pa is None:
+        raise ExportUnavailableError(f"{export_format} export requires the optional 'pyarrow' package")
+    table = pa.table({name: _arrow_array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    if export_format == FORMAT_PARQUET:
+        pa_parquet.write_table(table, sink, compression="zstd")
+    else:
+        with pa_ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,69 @@
+# http_cache.py
+
+import hashlib
+import time
+from email.utils import formatdate
+from typing import Callable, Hashable, Sequence
+
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import Response
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+class ConditionalGetMiddleware(BaseHTTPMiddleware):
+    """
+    ETag / If-None-Match revalidation for read endpoints, derived from the data version.
+
+    The ETag hashes `version()`, a write generation (bumped by every successful non-GET
+    request) and the request path and query, so it can be computed before the handler runs:
+    a matching If-None-Match gets a 304 without the response ever being built. Responses
+    that set their own ETag (e.g. file downloads) are left alone. The write generation starts
+    at 0 in every process, so `version()` must also tell apart the data different processes
+    started from; otherwise a tag issued before a restart could match different data after it.
+    """
+
+    def __init__(self, app, version: Callable[[], Hashable], cache_control: str = "no-cache",
+                 exclude_prefixes: Sequence[str] = ()):
+        super().__init__(app)
+        self._version = version
+        self._cache_control = cache_control
+        self._exclude_prefixes = tuple(exclude_prefixes)
+        self._generation = 0
+        self._last_modified = time.time()
+
+    def etag_for(self, request: Request) -> str:
+        query = sorted(request.query_params.multi_items())
+        token = repr((self._generation, self._version(), request.url.path, query))
+        return '"' + hashlib.sha1(token.encode("utf-8")).hexdigest()[:20] + '"'
+
+    @staticmethod
+    def _matches(if_none_match: str, etag: str) -> bool:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+    async def dispatch(self, request: Request, call_next):
+        if request.method not in SAFE_METHODS:
+            response = await call_next(request)
+            if response.status_code < 400:
+                self._generation += 1
+                self._last_modified = time.time()
+            return response
+        if request.url.path.startswith(self._exclude_prefixes):
+            return await call_next(request)
+
+        etag = self.etag_for(request)
+        headers = {
+            "ETag": etag,
+            "Cache-Control": self._cache_control,
+            "Last-Modified": formatdate(self._last_modified, usegmt=True),
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self._matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+
+        response = await call_next(request)
+        if response.status_code == 200 and "etag" not in response.headers:
+            response.headers.update(headers)
+        return response
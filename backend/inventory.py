@@ -0,0 +1,266 @@
+# inventory.py
+
+import copy
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Response formats of EquipmentInventory.render()
+FORMAT_DENSE = "dense"
+FORMAT_SPARSE = "sparse"
+INVENTORY_FORMATS = (FORMAT_DENSE, FORMAT_SPARSE)
+
+UNKNOWN_YEAR = 0
+
+# Per-item arrays of EquipmentInventory, all in the same (hospital, equipment type, position) order
+_ITEM_ARRAYS = ("item_rows", "indices", "position", "quantity", "category", "installation_year", "available")
+
+
+def _relabel(labels: List[str], codes: np.ndarray, extra: Optional[str] = None):
+    """Sorted labels still in use by `codes` (plus `extra`), their lookup and the codes renumbered to match."""
+    kept = sorted({labels[c] for c in np.unique(codes)} | ({extra} if extra is not None else set()))
+    lookup = {label: i for i, label in enumerate(kept)}
+    remap = np.array([lookup.get(label, -1) for label in labels], dtype=np.int64)
+    return kept, lookup, remap[codes] if len(codes) else codes
+
+
+class InventorySlice:
+    """Hospital x equipment type quantities of a selection, as CSR arrays over its non-zero cells."""
+
+    __slots__ = ("row_ids", "column_labels", "indptr", "indices", "values", "first_seen")
+
+    def __init__(self, row_ids: List[Hashable], column_labels: List[str], indptr: np.ndarray,
+                 indices: np.ndarray, values: np.ndarray, first_seen: np.ndarray):
+        self.row_ids = row_ids
+        self.column_labels = column_labels
+        self.indptr = indptr
+        self.indices = indices
+        self.values = values
+        self.first_seen = first_seen  # Per row: position of its first selected item in the source data
+
+    def row(self, r: int) -> Dict[str, int]:
+        start, end = self.indptr[r], self.indptr[r + 1]
+        return {self.column_labels[c]: int(v) for c, v in zip(self.indices[start:end], self.values[start:end])}
+
+    def render(self, r: int, fmt: str = FORMAT_SPARSE) -> Dict[str, int]:
+        """One row's quantities: every column (dense, zeros included) or only non-zero cells (sparse)."""
+        cells = self.row(r)
+        if fmt == FORMAT_DENSE:
+            return {label: cells.get(label, 0) for label in self.column_labels}
+        if fmt == FORMAT_SPARSE:
+            return cells
+        raise ValueError(f"Unknown inventory format: {fmt}")
+
+
+class EquipmentInventory:
+    """
+    Equipment items held column-wise in NumPy arrays, sorted by (hospital, equipment type).
+
+    Every item keeps its quantity, category, installation year and availability, with
+    `indptr` marking each hospital's slice (CSR layout), so hospital, type, category and
+    availability filters are boolean masks and totals are bincounts. A selection aggregates
+    only the non-zero (hospital, type) cells; zeros are never materialized unless a dense
+    rendering asks for them.
+    """
+
+    def __init__(self, hospital_ids: Sequence[Hashable], items: Iterable[Dict[str, Any]]):
+        sources = [(p, item) for p, item in enumerate(items) if self._usable(item)]
+        rows = [item for _, item in sources]
+        self.row_ids: List[Hashable] = list(hospital_ids)
+        known = set(self.row_ids)
+        for item in rows:  # Items of hospitals missing from hospital_ids get rows at the end
+            if item["hospital_id"] not in known:
+                known.add(item["hospital_id"])
+                self.row_ids.append(item["hospital_id"])
+        self._row_of = {hospital_id: r for r, hospital_id in enumerate(self.row_ids)}
+        self.column_labels = sorted({item["equipment_name"] for item in rows})
+        self._column_of = {label: c for c, label in enumerate(self.column_labels)}
+        self.categories = sorted({item.get("category") or "" for item in rows})
+        self._category_of = {label: k for k, label in enumerate(self.categories)}
+
+        row = np.array([self._row_of[item["hospital_id"]] for item in rows], dtype=np.int64)
+        column = np.array([self._column_of[item["equipment_name"]] for item in rows], dtype=np.int64)
+        position = np.array([p for p, _ in sources], dtype=np.int64)
+        order = np.lexsort((position, column, row))
+        self.item_rows = row[order]
+        self.indices = column[order]
+        self.position = position[order]  # Position of each item in the source data
+        self.quantity = np.array([item.get("quantity") or 0 for item in rows], dtype=np.int64)[order]
+        self.category = np.array([self._category_of[item.get("category") or ""] for item in rows], dtype=np.int64)[order]
+        self.installation_year = np.array(
+            [item.get("installation_year") or UNKNOWN_YEAR for item in rows], dtype=np.int64)[order]
+        self.available = np.array([bool(item.get("is_available")) for item in rows], dtype=bool)[order]
+        self.indptr = np.searchsorted(self.item_rows, np.arange(len(self.row_ids) + 1))
+
+    @staticmethod
+    def _usable(item: Optional[Dict[str, Any]]) -> bool:
+        return item is not None and item.get("hospital_id") is not None and bool(item.get("equipment_name"))
+
+    def with_change(self, old_position: Optional[int], new_position: Optional[int],
+                    item: Optional[Dict[str, Any]]) -> "EquipmentInventory":
+        """
+        A copy with one source item changed, without reloading the rest: the item at `old_position`
+        is dropped and `item` is placed at `new_position` (either may be None for an insert or a
+        delete), and later positions shift as the source list does. This instance is left as is.
+        """
+        keep = self.position != old_position
+        arrays = {name: getattr(self, name)[keep] for name in _ITEM_ARRAYS}
+        position = arrays["position"]
+        if old_position is not None and new_position is None:
+            position = np.where(position > old_position, position - 1, position)
+        if new_position is not None and old_position is None:
+            position = np.where(position >= new_position, position + 1, position)
+        arrays["position"] = position
+
+        changed = copy.copy(self)
+        added = self._usable(item) and new_position is not None
+        if added and item["hospital_id"] not in self._row_of:
+            changed.row_ids = [*self.row_ids, item["hospital_id"]]
+            changed._row_of = {**self._row_of, item["hospital_id"]: len(self.row_ids)}
+        changed.column_labels, changed._column_of, arrays["indices"] = _relabel(
+            self.column_labels, arrays["indices"], item["equipment_name"] if added else None)
+        changed.categories, changed._category_of, arrays["category"] = _relabel(
+            self.categories, arrays["category"], (item.get("category") or "") if added else None)
+        if added:
+            for name, value in (
+                ("item_rows", changed._row_of[item["hospital_id"]]),
+                ("indices", changed._column_of[item["equipment_name"]]),
+                ("position", new_position),
+                ("quantity", item.get("quantity") or 0),
+                ("category", changed._category_of[item.get("category") or ""]),
+                ("installation_year", item.get("installation_year") or UNKNOWN_YEAR),
+                ("available", bool(item.get("is_available"))),
+            ):
+                arrays[name] = np.append(arrays[name], np.array(value, dtype=arrays[name].dtype))
+
+        order = np.lexsort((arrays["position"], arrays["indices"], arrays["item_rows"]))
+        for name, values in arrays.items():
+            setattr(changed, name, values[order])
+        changed.indptr = np.searchsorted(changed.item_rows, np.arange(len(changed.row_ids) + 1))
+        return changed
+
+    def _mask(self, hospital_ids: Optional[Iterable[Hashable]] = None, equipment_types: Optional[Iterable[str]] = None,
+              categories: Optional[Iterable[str]] = None, available_only: bool = False) -> np.ndarray:
+        mask = np.ones(len(self.indices), dtype=bool)
+        if hospital_ids is not None:
+            selected = np.zeros(len(self.row_ids), dtype=bool)
+            selected[[self._row_of[h] for h in hospital_ids if h in self._row_of]] = True
+            mask &= selected[self.item_rows]
+        if equipment_types is not None:
+            selected = np.zeros(len(self.column_labels), dtype=bool)
+            selected[[self._column_of[t] for t in equipment_types if t in self._column_of]] = True
+            mask &= selected[self.indices]
+        if categories is not None:
+            selected = np.zeros(len(self.categories), dtype=bool)
+            selected[[self._category_of[c] for c in categories if c in self._category_of]] = True
+            mask &= selected[self.category]
+        if available_only:
+            mask &= self.available
+        return mask
+
+    def select(self, hospital_ids: Optional[Iterable[Hashable]] = None,
+               equipment_types: Optional[Iterable[str]] = None, categories: Optional[Iterable[str]] = None,
+               available_only: bool = False, all_columns: bool = True) -> InventorySlice:
+        """
+        Aggregates the selected items into (hospital, type) cells. Rows are every known hospital
+        in the filter (or all of them); columns are all types, or with all_columns=False only the
+        types of selected items.
+        """
+        mask = self._mask(hospital_ids, equipment_types, categories, available_only)
+        rows, columns = self.item_rows[mask], self.indices[mask]
+        n_columns = len(self.column_labels)
+        cells, inverse = np.unique(rows * n_columns + columns, return_inverse=True)
+        values = np.bincount(inverse, weights=self.quantity[mask], minlength=len(cells)).astype(np.int64)
+        cell_rows, cell_columns = cells // n_columns, cells % n_columns
+
+        if hospital_ids is None:
+            row_index = np.arange(len(self.row_ids))
+        else:
+            row_index = np.array(sorted({self._row_of[h] for h in hospital_ids if h in self._row_of}), dtype=np.int64)
+        if all_columns:
+            column_labels, column_map = self.column_labels, None
+        else:
+            used = np.unique(cell_columns)
+            column_labels = [self.column_labels[c] for c in used]
+            column_map = np.full(n_columns, -1, dtype=np.int64)
+            column_map[used] = np.arange(len(used))
+            cell_columns = column_map[cell_columns]
+
+        first_seen = np.full(len(self.row_ids), np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(first_seen, rows, self.position[mask])
+        local_row = np.full(len(self.row_ids), -1, dtype=np.int64)
+        local_row[row_index] = np.arange(len(row_index))
+        indptr = np.searchsorted(local_row[cell_rows], np.arange(len(row_index) + 1))
+        return InventorySlice(
+            [self.row_ids[r] for r in row_index], column_labels, indptr, cell_columns, values, first_seen[row_index],
+        )
+
+    def category_totals(self, hospital_ids: Optional[Iterable[Hashable]] = None,
+                        available_only: bool = False) -> List[Dict[str, Any]]:
+        """Items, quantity, available quantity and hospitals per category."""
+        mask = self._mask(hospital_ids, available_only=available_only)
+        category, quantity = self.category[mask], self.quantity[mask]
+        n = len(self.categories)
+        items = np.bincount(category, minlength=n)
+        totals = np.bincount(category, weights=quantity, minlength=n)
+        available = np.bincount(category, weights=quantity * self.available[mask], minlength=n)
+        pairs = np.unique(category * len(self.row_ids) + self.item_rows[mask])
+        hospitals = np.bincount(pairs // len(self.row_ids), minlength=n) if len(self.row_ids) else np.zeros(n)
+        return [
+            {
+                "category": label or None,
+                "items": int(items[k]),
+                "total_quantity": int(totals[k]),
+                "available_quantity": int(available[k]),
+                "hospitals": int(hospitals[k]),
+            }
+            for k, label in enumerate(self.categories) if items[k]
+        ]
+
+    def age_profile(self, as_of_year: int, bucket_years: int = 5, hospital_ids: Optional[Iterable[Hashable]] = None,
+                    categories: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Quantity by equipment age (as_of_year - installation_year) in buckets of bucket_years, per category.
+        Raises ValueError if as_of_year is before the installation year of any selected item.
+        """
+        mask = self._mask(hospital_ids, categories=categories)
+        years, quantity, category = self.installation_year[mask], self.quantity[mask], self.category[mask]
+        known = years != UNKNOWN_YEAR
+        latest = int(years[known].max()) if known.any() else None
+        if latest is not None and latest > as_of_year:
+            raise ValueError(f"as_of_year {as_of_year} is before the installation year {latest} of selected equipment")
+        ages = as_of_year - years[known]
+        buckets = ages // bucket_years
+        n_buckets = int(buckets.max()) + 1 if len(buckets) else 0
+        n = len(self.categories)
+        grid = np.bincount(category[known] * max(n_buckets, 1) + buckets, weights=quantity[known],
+                           minlength=n * max(n_buckets, 1)).reshape(n, max(n_buckets, 1))[:, :n_buckets]
+        unknown = np.bincount(category[~known], weights=quantity[~known], minlength=n)
+        labels = [f"{b * bucket_years}-{(b + 1) * bucket_years - 1}" for b in range(n_buckets)]
+        weighted_age = float((ages * quantity[known]).sum() / quantity[known].sum()) if quantity[known].sum() else None
+        return {
+            "as_of_year": as_of_year,
+            "bucket_years": bucket_years,
+            "age_buckets": labels,
+            "total": dict(zip(labels, (int(v) for v in grid.sum(axis=0)))),
+            "unknown_year_quantity": int(unknown.sum()),
+            "mean_age_years": round(weighted_age, 2) if weighted_age is not None else None,
+            "by_category": {
+                label or "Uncategorized": {
+                    **{bucket: int(v) for bucket, v in zip(labels, grid[k]) if v},
+                    **({"unknown": int(unknown[k])} if unknown[k] else {}),
+                }
+                for k, label in enumerate(self.categories) if grid[k].any() or unknown[k]
+            },
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        cells = len(np.unique(self.item_rows * max(len(self.column_labels), 1) + self.indices))
+        dense = len(self.row_ids) * len(self.column_labels)
+        return {
+            "hospitals": len(self.row_ids),
+            "equipment_types": len(self.column_labels),
+            "items": len(self.indices),
+            "non_zero_cells": cells,
+            "density": round(cells / dense, 4) if dense else 0.0,
+        }
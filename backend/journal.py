@@ -0,0 +1,451 @@
+# journal.py
+
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # No advisory locks (e.g. Windows): the process is taken to be the only writer
+    fcntl = None
+
+
+class JournalReadOnlyError(RuntimeError):
+    """append() or rotate() was called in a process that does not hold the journal's writer lock."""
+
+
+class JournalGapError(RuntimeError):
+    """A read-only process fell behind further than the compacted segments the writer keeps."""
+
+
+class WriteJournal:
+    """
+    Append-only JSON-lines journal of data mutations with group commit.
+
+    append() only queues entries; wait_durable() makes them durable. The first waiter that finds
+    no flush in progress writes every queued entry with one write and one fsync, so concurrent
+    writers share a single fsync instead of paying one each. rotate() hands the current file to
+    the compactor and starts a fresh one, so writes never wait for compaction.
+
+    Only one process may write: the first to open the journal takes an exclusive lock on
+    <journal>.lock for its lifetime and is `writable`. Other processes can read the journal
+    but append() and rotate() raise JournalReadOnlyError in them.
+
+    Read-only processes follow the writer with read_since() and record how far they got in
+    <journal>.readers/<pid>. A compacted file is kept as a segment (<journal>.<last seq>.folded)
+    until every live reader is past it, so none of them misses an entry to compaction.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.compacting_path = self.path.with_name(self.path.name + ".compacting")
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.readers_path = self.path.with_name(self.path.name + ".readers")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_file = None
+        self.writable = self._lock_writer()
+        if self.writable:
+            self._drop_torn_tail()
+        else:
+            # Registered before the caller reads the data files, so segments folded meanwhile are kept
+            self.report_progress(0)
+            atexit.register(self._unregister_reader)
+        self._cond = threading.Condition()
+        self._pending: List[bytes] = []
+        self._flushing = False
+        # The newest segment is never dropped, so numbering carries on after a compaction and a restart
+        self._seq = max(
+            [entry.get("seq", 0) for entry in self.read_entries()] + [self._segment_seq(p) for p in self._segments()],
+            default=0,
+        )
+        self._durable_seq = self._seq
+        # Unbuffered, so a failed flush leaves nothing behind to be written again later
+        self._file = open(self.path, "ab", buffering=0) if self.writable else None
+        self.fsyncs = 0
+        self.entries_written = 0
+        # Where read_since() stopped: (inode of the journal file, offset in it, last seq returned)
+        self._tail: Optional[Tuple[int, int, int]] = None
+
+    def _lock_writer(self) -> bool:
+        """Takes the writer lock, held until the process exits; False if another process holds it."""
+        if fcntl is None:
+            return True
+        self._lock_file = open(self.lock_path, "ab")
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            return False
+        return True
+
+    def _drop_torn_tail(self):
+        """Cuts a partial last line left by a crash mid-write, so new entries are not appended behind it."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            os.truncate(self.path, end)
+
+    def _write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[self._file.write(view):]
+
+    def _require_writer(self):
+        if not self.writable:
+            raise JournalReadOnlyError(f"Another process holds the writer lock on {self.lock_path}")
+
+    @staticmethod
+    def read_file(path: Path) -> List[Dict[str, Any]]:
+        entries = []
+        try:
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break  # A torn final line from a crash mid-write; nothing after it was acknowledged
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def read_entries(self) -> List[Dict[str, Any]]:
+        """Entries not yet folded into the data files, oldest first (including an interrupted compaction)."""
+        return self.read_file(self.compacting_path) + self.read_file(self.path)
+
+    def _segments(self) -> List[Path]:
+        """Compacted files kept for readers, oldest first."""
+        return sorted(self.path.parent.glob(self.path.name + ".*.folded"))
+
+    @staticmethod
+    def _segment_seq(path: Path) -> int:
+        return int(path.name.rsplit(".", 2)[-2])
+
+    @staticmethod
+    def _read_from(path: Path, offset: int) -> Tuple[List[Dict[str, Any]], Optional[int], int]:
+        """Complete entries from `offset` on, the file's inode and the offset after the last of them."""
+        try:
+            with open(path, "rb") as f:
+                inode = os.fstat(f.fileno()).st_ino
+                f.seek(offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], None, 0
+        entries = []
+        for line in data.splitlines(keepends=True):
+            if not line.endswith(b"\n"):
+                break  # Still being written
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+            offset += len(line)
+        return entries, inode, offset
+
+    def read_since(self, seq: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Entries after `seq` (all kept entries for None), oldest first, for a read-only process
+        applying the writer's changes. While the journal file stays the same, only what was
+        appended since the previous call is read; after a rotation the segments and the
+        compacting file are read again too. Raises JournalGapError if entries after `seq` are gone.
+        """
+        tail = self._tail
+        if seq is not None and tail is not None and tail[2] == seq:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and stat.st_ino == tail[0] and stat.st_size == tail[1]:
+                return []
+            if stat is not None and stat.st_ino == tail[0] and stat.st_size > tail[1]:
+                entries, inode, end = self._read_from(self.path, tail[1])
+                if inode == tail[0] and (not entries or entries[0]["seq"] == seq + 1):
+                    self._tail = (inode, end, entries[-1]["seq"] if entries else seq)
+                    return entries
+
+        # The journal file first: entries rotated away meanwhile are then still found in the
+        # compacting file or a segment, which are read after it
+        current, inode, end = self._read_from(self.path, 0)
+        by_seq = {}
+        for entry in [*current, *self.read_file(self.compacting_path),
+                      *(e for path in self._segments() for e in self.read_file(path))]:
+            if seq is None or entry["seq"] > seq:
+                by_seq[entry["seq"]] = entry
+        entries = [by_seq[s] for s in sorted(by_seq)]
+        if seq is not None and entries and entries[0]["seq"] != seq + 1:
+            raise JournalGapError(f"Entries {seq + 1} to {entries[0]['seq'] - 1} are no longer in {self.path.parent}")
+        last = entries[-1]["seq"] if entries else seq
+        self._tail = (inode, end, last) if inode is not None and last is not None else None
+        return entries
+
+    def changed_since(self, seq: int) -> bool:
+        """Whether read_since(seq) may return anything, without reading the journal."""
+        tail = self._tail
+        if tail is None or tail[2] != seq:
+            return True
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+        return (stat.st_ino, stat.st_size) != tail[:2]
+
+    def report_progress(self, seq: int):
+        """Records that this read-only process has applied every entry up to `seq`."""
+        self.readers_path.mkdir(exist_ok=True)
+        (self.readers_path / str(os.getpid())).write_text(str(seq))
+
+    def _unregister_reader(self):
+        try:
+            (self.readers_path / str(os.getpid())).unlink()
+        except FileNotFoundError:
+            pass
+
+    def reader_progress(self) -> Dict[int, int]:
+        """How far each live read-only process got; the records of exited ones are removed."""
+        progress = {}
+        for path in self.readers_path.glob("*"):
+            try:
+                pid = int(path.name)
+                os.kill(pid, 0)
+            except ValueError:
+                continue
+            except ProcessLookupError:
+                path.unlink(missing_ok=True)
+                continue
+            except PermissionError:
+                pass  # Alive, owned by another user
+            try:
+                progress[pid] = int(path.read_text() or 0)
+            except (OSError, ValueError):
+                progress[pid] = 0  # Being rewritten; assume the reader still needs everything
+        return progress
+
+    def append(self, entries: Iterable[Dict[str, Any]]) -> int:
+        """Queues entries and returns the sequence number of the last one; see wait_durable()."""
+        self._require_writer()
+        with self._cond:
+            for entry in entries:
+                self._seq += 1
+                line = json.dumps({**entry, "seq": self._seq}, default=str) + "\n"
+                self._pending.append(line.encode("utf-8"))
+            return self._seq
+
+    def wait_durable(self, seq: int):
+        """Blocks until every entry up to `seq` has been written and fsync'd."""
+        with self._cond:
+            while self._durable_seq < seq:
+                if self._flushing:
+                    self._cond.wait()
+                    continue
+                self._flushing = True
+                batch, self._pending = self._pending, []
+                last = self._seq
+                self._cond.release()
+                offset = os.fstat(self._file.fileno()).st_size
+                try:
+                    self._write(b"".join(batch))
+                    os.fsync(self._file.fileno())
+                except BaseException:
+                    # The batch goes back in the queue, so whatever part of it reached the file is cut
+                    # again; otherwise the retry would duplicate it or land behind a torn line
+                    try:
+                        os.ftruncate(self._file.fileno(), offset)
+                    except OSError:
+                        pass
+                    self._cond.acquire()
+                    self._pending[:0] = batch
+                    self._flushing = False
+                    self._cond.notify_all()
+                    raise
+                self._cond.acquire()
+                self._flushing = False
+                self._durable_seq = last
+                self.fsyncs += 1
+                self.entries_written += len(batch)
+                self._cond.notify_all()
+
+    def rotate(self) -> Optional[Path]:
+        """
+        Moves the journal aside for compaction and returns the file to fold, or None if there is
+        nothing to fold. A file left over from an interrupted compaction is returned first.
+        """
+        self._require_writer()
+        self.wait_durable(self._seq)
+        with self._cond:
+            while self._flushing:
+                self._cond.wait()
+            if self.compacting_path.exists():
+                return self.compacting_path
+            if self._file.tell() == 0:
+                return None
+            self._file.close()
+            os.replace(self.path, self.compacting_path)
+            self._file = open(self.path, "ab", buffering=0)
+            return self.compacting_path
+
+    def finish_compaction(self):
+        """
+        Called once the compacted file's entries are safely in the data files: keeps it as a
+        segment named after its last entry (an empty file is dropped), then drops every segment
+        all live readers have applied, except the newest.
+        """
+        entries = self.read_file(self.compacting_path)
+        try:
+            if entries:
+                os.replace(self.compacting_path, self.path.with_name(f"{self.path.name}.{entries[-1]['seq']:012d}.folded"))
+            else:
+                self.compacting_path.unlink()
+        except FileNotFoundError:
+            pass
+        applied = min(self.reader_progress().values(), default=None)
+        for path in self._segments()[:-1]:
+            if applied is None or self._segment_seq(path) <= applied:
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "path": str(self.path),
+                "writer": self.writable,
+                "last_seq": self._seq,
+                "durable_seq": self._durable_seq,
+                "pending": len(self._pending),
+                "journal_bytes": self.path.stat().st_size if self.path.exists() else 0,
+                "compaction_pending": self.compacting_path.exists(),
+                "segments": len(self._segments()),
+                "entries_written": self.entries_written,
+                "fsyncs": self.fsyncs,
+            }
+
+
+class JournalCompactor:
+    """
+    Periodically folds the journal into the data files on a daemon thread.
+
+    `fold` receives the entries of the rotated journal file and must apply them idempotently
+    (entries carry full rows), since a crash between folding and dropping the file replays them.
+    """
+
+    def __init__(self, journal: WriteJournal, fold: Callable[[List[Dict[str, Any]]], None],
+                 interval_seconds: float = 30.0):
+        self._journal = journal
+        self._fold = fold
+        self._interval = interval_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.compactions = 0
+        self.entries_compacted = 0
+        self.last_compacted_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def run_once(self) -> int:
+        """Folds whatever the journal holds now; returns the number of entries folded."""
+        with self._lock:
+            path = self._journal.rotate()
+            if path is None:
+                return 0
+            entries = self._journal.read_file(path)
+            if entries:
+                self._fold(entries)
+            self._journal.finish_compaction()
+            self.compactions += 1
+            self.entries_compacted += len(entries)
+            self.last_compacted_at = time.time()
+            return len(entries)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:  # Keep the thread alive; the entries stay in the journal for the next run
+                self.last_error = repr(e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal-compactor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self._interval,
+            "compactions": self.compactions,
+            "entries_compacted": self.entries_compacted,
+            "last_compacted_at": self.last_compacted_at,
+            "last_error": self.last_error,
+        }
+
+
+class JournalFollower:
+    """
+    Keeps a read-only process up to date with the writer. sync() passes every entry appended
+    since the last call to `apply`, one at a time and in order, and records the progress with
+    the journal; a daemon thread also calls it every `interval_seconds`, so an idle process
+    keeps up too and the writer can drop the segments it has applied.
+    """
+
+    def __init__(self, journal: WriteJournal, apply: Callable[[Dict[str, Any]], None], applied_seq: int,
+                 interval_seconds: float = 1.0):
+        self._journal = journal
+        self._apply = apply
+        self._interval = interval_seconds
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.applied_seq = applied_seq
+        self.entries_applied = 0
+        self.last_error: Optional[str] = None
+        if not journal.writable:
+            journal.report_progress(applied_seq)
+
+    def behind(self) -> bool:
+        """A cheap check (one stat) whether sync() may have anything to apply."""
+        return self._journal.changed_since(self.applied_seq)
+
+    def sync(self) -> int:
+        """Applies the entries appended since the last call; returns how many."""
+        with self._lock:
+            entries = self._journal.read_since(self.applied_seq)
+            for entry in entries:
+                self._apply(entry)
+                self.applied_seq = entry["seq"]
+                self.entries_applied += 1
+            if entries:
+                self._journal.report_progress(self.applied_seq)
+            return len(entries)
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.sync()
+                self.last_error = None
+            except Exception as e:  # Keep following; a failed entry is read and applied again next time
+                self.last_error = repr(e)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="journal-follower", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self._interval,
+            "applied_seq": self.applied_seq,
+            "entries_applied": self.entries_applied,
+            "last_error": self.last_error,
+        }
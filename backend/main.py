@@ -1,15 +1,117 @@
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from fastapi.middleware.cors import CORSMiddleware
 import json
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from collections import defaultdict
-from datetime import date, datetime, timedelta
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+from collections import defaultdict, OrderedDict
+from itertools import combinations
+import threading
+import hashlib
+import math
+from datetime import date, datetime, timedelta, timezone
+import tempfile
+import mimetypes
+import numpy as np
+from columnar import load_snapshot, OverlayTable
+from journal import JournalCompactor, JournalFollower, WriteJournal
+from partitions import LazyPartitionStore
+from cube import RollupCube
+from coverage import CoverageMatrix, COVERAGE_FORMATS, FORMAT_DENSE, FORMAT_SPARSE
+from spatial import NearestFacilityIndex
+from views import ViewRegistry
+from inventory import EquipmentInventory, INVENTORY_FORMATS, FORMAT_DENSE as INVENTORY_DENSE
+from scoring import (
+    Aggregate, Feature, ScoreIndex, ScoringPipeline, NORMALIZE_COMPLEMENT, NORMALIZE_MAX, NORMALIZE_PRESENCE,
+)
+from tariffs import DEFAULT_QUANTILES, GEOGRAPHY_LEVELS, TariffBenchmark
+from availability import CONSULTATION_BITS, DoctorAvailabilityIndex, parse_weekday
+from singleflight import SingleFlight
+from http_cache import ConditionalGetMiddleware
+from admission import CURRENT_COST_CLASS, AdmissionController, AdmissionMiddleware, CostClass
+from adequacy import AdequacyMatrix
+from documents import DocumentStore, DocumentTooLargeError
+from export import (
+    EXPORT_FORMATS, FORMAT_CSV, ExportUnavailableError, iter_csv, write_columnar,
+)
+from records import (
+    DocumentRecord, DoctorRecord, EquipmentRecord, HospitalRecord, IcuFacilityRecord, MetricsRecord,
+    SpecialtyRecord, WardRecord, RecordValidationError, check_references, group_by, replace_record,
+)
+from expiry import ExpiryIndex, STATUS_EXPIRED, STATUS_MALFORMED, STATUS_VALID
 
 # ----------------- Setup ----------------- #
 app = FastAPI(title="Hospital SOC Dashboard API")
 
+# Admission control: requests are admitted by cost class so that a burst of whole-network
+# reports or exports cannot take every worker thread from cheap interactive lookups.
+# Document downloads and uploads are disk-bound rather than CPU-bound, so they get their own
+# limits instead of queueing behind (or blocking) a bulk export.
+COST_INTERACTIVE = "interactive"
+COST_REPORT = "report"
+COST_DOWNLOAD = "download"
+COST_UPLOAD = "upload"
+COST_BULK = "bulk"
+
+# Whole-network reports (each scans every hospital or a full dataset)
+REPORT_ROUTES = {
+    "/hospitals/full-profile", "/hospitals/positioning/all", "/hospitals/geographic-coverage",
+    "/metrics/doctor-to-bed-ratio", "/doctor-to-bed-ratio", "/equipment-data", "/equipment/critical-care",
+    "/equipment/maintenance-schedule", "/hospitals/iso-certification", "/hospitals/by-city",
+    "/city-wise-medical-coverage", "/api/wards-rooms", "/api/hospitals/list", "/hospitals/quality-scores",
+    "/api/coverage-matrix", "/api/specialty_coverage_matrix", "/analytics/summary", "/analytics/rollup",
+    "/diagnostics/capacity", "/diagnostics/capacity/hospitals", "/tariffs/outliers",
+}
+
+def classify_request(method: str, path: str) -> Optional[str]:
+    """Maps a request to its admission cost class; None bypasses admission (health probes)."""
+    if path.startswith("/health"):
+        return None
+    if path.startswith("/export/"):
+        return COST_BULK
+    if path.startswith("/documents/") and path.endswith("/content"):
+        return COST_DOWNLOAD
+    if method == "POST" and path == "/documents":
+        return COST_UPLOAD
+    if path in REPORT_ROUTES or path.startswith("/network-adequacy/"):
+        return COST_REPORT
+    return COST_INTERACTIVE
+
+_report_slots = max(1, int(os.environ.get("DATA_IO_MAX_WORKERS", 4)) // 2)
+ADMISSION = AdmissionController(
+    [
+        CostClass(COST_INTERACTIVE, priority=0, max_concurrent=int(os.environ.get("ADMISSION_INTERACTIVE_LIMIT", 64)),
+                  max_queue=256, queue_timeout=10.0, retry_after=1),
+        CostClass(COST_REPORT, priority=1, max_concurrent=int(os.environ.get("ADMISSION_REPORT_LIMIT", _report_slots)),
+                  max_queue=int(os.environ.get("ADMISSION_REPORT_QUEUE", 32)), queue_timeout=15.0, retry_after=5),
+        CostClass(COST_DOWNLOAD, priority=1, max_concurrent=int(os.environ.get("ADMISSION_DOWNLOAD_LIMIT", 16)),
+                  max_queue=int(os.environ.get("ADMISSION_DOWNLOAD_QUEUE", 64)), queue_timeout=10.0, retry_after=2),
+        CostClass(COST_UPLOAD, priority=2, max_concurrent=int(os.environ.get("ADMISSION_UPLOAD_LIMIT", 4)),
+                  max_queue=int(os.environ.get("ADMISSION_UPLOAD_QUEUE", 16)), queue_timeout=30.0, retry_after=5),
+        CostClass(COST_BULK, priority=2, max_concurrent=int(os.environ.get("ADMISSION_BULK_LIMIT", 1)),
+                  max_queue=int(os.environ.get("ADMISSION_BULK_QUEUE", 4)), queue_timeout=30.0, retry_after=15),
+    ],
+    capacity=int(os.environ.get("ADMISSION_CAPACITY", 64)),
+)
+
+# Innermost of the three: conditional GETs answered with 304 never take an admission slot
+app.add_middleware(AdmissionMiddleware, controller=ADMISSION, classify=classify_request)
+
+# Read endpoints answer If-None-Match with 304 while the data is unchanged. Registered before
+# CORS so that CORS wraps it and 304s carry the CORS headers too.
+app.add_middleware(
+    ConditionalGetMiddleware,
+    version=lambda: (DATA_BOOT_ID, data_version(), date.today().isoformat()),
+    cache_control=os.environ.get("HTTP_CACHE_CONTROL", "private, no-cache"),
+    # Operational endpoints whose output changes without a write
+    exclude_prefixes=("/health", "/data/journal", "/api/regions", "/documents/store"),
+)
+
 # Allow frontend to access backend
 app.add_middleware(
     CORSMiddleware,
@@ -17,14 +119,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
 
 # Path to the data folder
 BASE_PATH = Path(__file__).parent / "data"
 
 # ----------------- Utility ----------------- #
-def read_json(filename: str) -> List[Dict[str, Any]]:
-    """Reads a JSON file from the data directory."""
+# Bounded pool used to keep blocking file I/O and lookups off the event loop
+DATA_IO_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("DATA_IO_MAX_WORKERS", 4)),
+    thread_name_prefix="data-io",
+)
+# Heavy cost classes run on pools of their own, sized to their admission limits, so reports,
+# exports and uploads together can never take the threads interactive requests need
+CLASS_EXECUTORS = {
+    name: ThreadPoolExecutor(max_workers=ADMISSION.classes[name].max_concurrent, thread_name_prefix=f"{name}-io")
+    for name in (COST_REPORT, COST_BULK, COST_UPLOAD)
+}
+
+# Parsed JSON files keyed by filename, revalidated against the file's mtime and size
+_JSON_CACHE: Dict[str, Tuple[Tuple[int, int], Any]] = {}
+
+def _load_json_file(filename: str) -> List[Dict[str, Any]]:
+    """Reads and parses a JSON file from the data directory without caching."""
     filepath = BASE_PATH / filename
     try:
         with open(filepath, "r", encoding="utf-8") as f:
@@ -34,27 +152,261 @@ def read_json(filename: str) -> List[Dict[str, Any]]:
     except json.JSONDecodeError:
         raise HTTPException(status_code=500, detail=f"Could not parse data from file: {filename}. The file might be corrupted.")
 
-# Load all JSON data from files
-HOSPITALS = read_json("hospitals.json")
-METRICS = read_json("hospital_metrics.json")
-CERTIFICATIONS = read_json("hospital_certifications.json")
-ADDRESSES = read_json("hospital_addresses.json")
-WARDS_ROOMS = read_json("wards_rooms.json")
-ICU_FACILITIES = read_json("icu_facilities.json")
-DOCTORS = read_json("doctors.json")
-MEDICAL_SPECIALTIES = read_json("medical_specialties.json")
-DOCUMENT_UPLOADS = read_json("document_uploads.json") # New data loaded here
+def _ensure_not_on_event_loop(filename: str):
+    """Refuses blocking disk reads from coroutines running on the event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return  # Worker thread or import time, blocking is fine here
+    raise RuntimeError(f"Blocking read of {filename} on the event loop; use read_json_async() instead.")
+
+def read_json(filename: str) -> List[Dict[str, Any]]:
+    """
+    Reads a JSON file from the data directory.
+    Parsed contents are cached until the file changes, so callers must treat the result as read-only.
+    """
+    _ensure_not_on_event_loop(filename)
+    table = MUTABLE_TABLES_BY_FILE.get(filename)
+    if table is not None:
+        # Always the worker's own tables: the file may be behind them (writes not compacted yet)
+        # or ahead of them (compacted by the writer before this worker applied the entries)
+        return table.rows()
+    try:
+        stat = (BASE_PATH / filename).stat()
+    except FileNotFoundError:
+        raise HTTPException(status_code=500, detail=f"Required data file not found: {filename}")
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _JSON_CACHE.get(filename)
+    if cached and cached[0] == version:
+        return cached[1]
+    data = _load_json_file(filename)
+    _JSON_CACHE[filename] = (version, data)
+    return data
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a blocking function on the executor of the request's cost class and awaits its result."""
+    loop = asyncio.get_running_loop()
+    executor = CLASS_EXECUTORS.get(CURRENT_COST_CLASS.get(), DATA_IO_EXECUTOR)
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+# Concurrent identical report requests share one computation instead of each taking a pool thread
+SINGLE_FLIGHT = SingleFlight()
+
+async def run_coalesced(func, *args, name: Optional[str] = None, **kwargs):
+    """
+    Like run_blocking(), but concurrent callers with the same function, arguments and data
+    version await one in-flight computation and share its result.
+    """
+    key = (args, tuple(sorted(kwargs.items())), data_version())
+    return await SINGLE_FLIGHT.do(name or func.__name__, key, lambda: run_blocking(func, *args, **kwargs))
+
+async def read_view(name: str):
+    """Returns a materialized view, coalescing concurrent reads that would (re)build it."""
+    return await run_coalesced(MATERIALIZED_VIEWS.get, name, name=f"view:{name}")
+
+async def read_json_async(filename: str) -> List[Dict[str, Any]]:
+    """Async variant of read_json() for coroutine handlers."""
+    return await run_blocking(read_json, filename)
+
+# Datasets kept in the shared, memory-mapped columnar snapshot.
+# All uvicorn workers map the same file instead of holding their own copy of every dict.
+COLUMNAR_DATASETS = {
+    "hospitals": "hospitals.json",
+    "hospital_metrics": "hospital_metrics.json",
+    "hospital_certifications": "hospital_certifications.json",
+    "hospital_addresses": "hospital_addresses.json",
+    "wards_rooms": "wards_rooms.json",
+    "icu_facilities": "icu_facilities.json",
+    "doctors": "doctors.json",
+    "medical_specialties": "medical_specialties.json",
+    "document_uploads": "document_uploads.json",
+    "hospital_equipment": "hospital_equipment.json",
+    "operation_theaters": "operation_theaters.json",
+    "diagnostic_services": "diagnostic_services.json",
+    "compliance_licenses": "compliance_licenses.json",
+    "support_services": "support_services.json",
+    "hospital_it_systems": "hospital_it_systems.json",
+    "hospital_infrastructure": "hospital_infrastructure.json",
+}
+JOURNAL_PATH = Path(os.environ.get("DATA_JOURNAL_PATH", Path(__file__).parent / "journal" / "data.journal"))
+# With several workers, the one that takes the journal's writer lock accepts writes; the rest serve reads
+# and follow the journal. Opened before the data files are read, so a read-only worker is registered
+# with the writer before it loads them and no entry missing from them is compacted away meanwhile.
+DATA_JOURNAL = WriteJournal(JOURNAL_PATH)
+
+SNAPSHOT_PATH = Path(os.environ.get("COLUMNAR_SNAPSHOT_PATH", Path(__file__).parent / ".cache" / "columnar.snap"))
+SNAPSHOT = load_snapshot(BASE_PATH, COLUMNAR_DATASETS, SNAPSHOT_PATH, _load_json_file)
+
+# Load all datasets as table views over the snapshot; writable datasets get an in-memory overlay
+HOSPITALS = OverlayTable(SNAPSHOT.table("hospitals"))
+METRICS = SNAPSHOT.table("hospital_metrics")
+CERTIFICATIONS = SNAPSHOT.table("hospital_certifications")
+ADDRESSES = SNAPSHOT.table("hospital_addresses")
+WARDS_ROOMS = OverlayTable(SNAPSHOT.table("wards_rooms"))
+ICU_FACILITIES = SNAPSHOT.table("icu_facilities")
+DOCTORS = OverlayTable(SNAPSHOT.table("doctors"))
+MEDICAL_SPECIALTIES = SNAPSHOT.table("medical_specialties")
+DOCUMENT_UPLOADS = OverlayTable(SNAPSHOT.table("document_uploads"))
+EQUIPMENT = OverlayTable(SNAPSHOT.table("hospital_equipment"))
+OPERATION_THEATERS = SNAPSHOT.table("operation_theaters")
+DIAGNOSTIC_SERVICES = SNAPSHOT.table("diagnostic_services")
+COMPLIANCE_LICENSES = SNAPSHOT.table("compliance_licenses")
+SUPPORT_SERVICES = SNAPSHOT.table("support_services")
+
+# ----------------- Write Journal ----------------- #
+# Datasets writable through the /data API: resource name -> (table name, record type)
+MUTABLE_RESOURCES = {
+    "hospitals": ("hospitals", HospitalRecord),
+    "doctors": ("doctors", DoctorRecord),
+    "wards": ("wards_rooms", WardRecord),
+    "equipment": ("hospital_equipment", EquipmentRecord),
+    "documents": ("document_uploads", DocumentRecord),
+}
+MUTABLE_TABLES = {
+    "hospitals": HOSPITALS,
+    "doctors": DOCTORS,
+    "wards_rooms": WARDS_ROOMS,
+    "hospital_equipment": EQUIPMENT,
+    "document_uploads": DOCUMENT_UPLOADS,
+}
+MUTABLE_TABLES_BY_FILE = {COLUMNAR_DATASETS[name]: table for name, table in MUTABLE_TABLES.items()}
+
+def require_journal_writer():
+    """Rejects a write in a worker that does not hold the journal's writer lock."""
+    if not DATA_JOURNAL.writable:
+        raise HTTPException(
+            status_code=503, detail="This worker is read-only; writes are accepted by the journal writer",
+            headers={"Retry-After": "1"},
+        )
+
+def apply_journal_entry(entry: Dict[str, Any]):
+    """Applies one journaled mutation to its in-memory table."""
+    table = MUTABLE_TABLES[entry["dataset"]]
+    if entry["op"] == "upsert":
+        table.upsert(entry["row"])
+    elif entry["op"] == "delete":
+        table.delete(entry["id"])
+
+# Per-dataset change counters, bumped once a write's derived state is in place;
+# materialized views remember the versions they were built from
+DATASET_VERSIONS = defaultdict(int)
+
+def dataset_version(datasets) -> Tuple[int, ...]:
+    return tuple(DATASET_VERSIONS[name] for name in datasets)
+
+def data_version() -> Tuple[int, ...]:
+    """Version of all writable data together."""
+    return dataset_version(MUTABLE_TABLES)
+
+# Journaled writes are replayed before any index is built. Entries already compacted into the
+# JSON files may be replayed too (from segments kept for read-only workers); they carry full rows.
+_REPLAYED = DATA_JOURNAL.read_since(None)
+for _entry in _REPLAYED:
+    apply_journal_entry(_entry)
+
+# The data a worker started from: the data files (as the snapshot saw them) plus the journal
+# replayed on top. data_version() only counts writes since startup, so ETags combine the two.
+DATA_BOOT_ID = hashlib.sha1(
+    repr((sorted(SNAPSHOT.signature.items()), DATA_JOURNAL.stats()["last_seq"])).encode("utf-8")
+).hexdigest()[:16]
 
 # Create maps for efficient data retrieval
 ADDRESSES_MAP = {addr.get("hospital_id"): addr for addr in ADDRESSES}
-WARDS_MAP = defaultdict(list)
-for item in WARDS_ROOMS:
-    WARDS_MAP[item['hospital_id']].append(item)
-ICU_MAP = defaultdict(list)
-for item in ICU_FACILITIES:
-    ICU_MAP[item['hospital_id']].append(item)
+PRIMARY_ADDRESSES = {addr.get("hospital_id"): addr for addr in ADDRESSES if addr.get("address_type") == "Primary"}
+
+# Typed records holding only the fields hot paths use, validated once at load
+DOCTOR_RECORDS = DoctorRecord.load(DOCTORS, "doctors")
+WARD_RECORDS = WardRecord.load(WARDS_ROOMS, "wards_rooms")
+ICU_RECORDS = IcuFacilityRecord.load(ICU_FACILITIES, "icu_facilities")
+SPECIALTY_RECORDS = SpecialtyRecord.load(MEDICAL_SPECIALTIES, "medical_specialties")
+METRIC_RECORDS = MetricsRecord.load(METRICS, "hospital_metrics")
+EQUIPMENT_RECORDS = EquipmentRecord.load(EQUIPMENT, "hospital_equipment")
+
+def validate_references():
+    """Fails startup with a ReferentialIntegrityError naming the dangling hospital or specialty IDs."""
+    hospital_ids = set(HOSPITALS.column("id"))
+    for records, dataset in (
+        (DOCTOR_RECORDS, "doctors"),
+        (WARD_RECORDS, "wards_rooms"),
+        (ICU_RECORDS, "icu_facilities"),
+        (SPECIALTY_RECORDS, "medical_specialties"),
+        (METRIC_RECORDS, "hospital_metrics"),
+        (EQUIPMENT_RECORDS, "hospital_equipment"),
+    ):
+        check_references(records, "hospital_id", hospital_ids, dataset, "hospitals")
+    check_references(DOCTOR_RECORDS, "specialty_id", (s.id for s in SPECIALTY_RECORDS),
+                     "doctors", "medical_specialties", allow_null=True)
+
+validate_references()
+
+WARDS_MAP = group_by(WARD_RECORDS, "hospital_id")
+ICU_MAP = group_by(ICU_RECORDS, "hospital_id")
+DOCTORS_BY_HOSPITAL = group_by(DOCTOR_RECORDS, "hospital_id")
+EQUIPMENT_BY_HOSPITAL = group_by(EQUIPMENT_RECORDS, "hospital_id")
+SPECIALTY_NAMES = {s.id: s.specialty_name for s in SPECIALTY_RECORDS}
+METRICS_BY_HOSPITAL = {}
+for metric in METRIC_RECORDS:
+    METRICS_BY_HOSPITAL.setdefault(metric.hospital_id, metric)
 HOSPITALS_MAP = {h.get("id"): h for h in HOSPITALS}
 
+# ----------------- Region Partitions ----------------- #
+def index_rows_by_hospital(table, key: str = "hospital_id") -> Dict[int, List[int]]:
+    """Maps each hospital ID to the row positions it owns in a snapshot table."""
+    positions = defaultdict(list)
+    for index, hospital_id in enumerate(table.column(key)):
+        positions[hospital_id].append(index)
+    return positions
+
+def build_home_address_map() -> Dict[int, Any]:
+    """Maps each hospital ID to its primary address, or its first address if none is primary."""
+    home_addresses = {}
+    for addr in ADDRESSES:
+        hospital_id = addr.get("hospital_id")
+        if addr.get("address_type") == "Primary" or hospital_id not in home_addresses:
+            home_addresses[hospital_id] = addr
+    return home_addresses
+
+HOME_ADDRESSES = build_home_address_map()
+
+def build_state_directory() -> Dict[str, List[int]]:
+    """Groups hospital IDs by the state of their home address."""
+    directory = defaultdict(list)
+    for hospital_id, addr in HOME_ADDRESSES.items():
+        state = addr.get("state")
+        if state:
+            directory[state].append(hospital_id)
+    return dict(directory)
+
+# Only row positions are indexed up front; the rows themselves are materialized per state on demand.
+# Writable tables are read through OverlayTable.select(), which keeps positions and rows consistent.
+ADDRESS_ROWS = index_rows_by_hospital(ADDRESSES)
+CERTIFICATION_ROWS = index_rows_by_hospital(CERTIFICATIONS)
+STATE_DIRECTORY = build_state_directory()
+STATE_NAMES = {state.casefold(): state for state in STATE_DIRECTORY}
+
+def load_state_partition(state: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Materializes the hospitals, addresses and wards of a single state, in file order."""
+    hospital_ids = STATE_DIRECTORY.get(state, [])
+    address_positions = sorted(i for hospital_id in hospital_ids for i in ADDRESS_ROWS.get(hospital_id, []))
+    return {
+        "hospitals": HOSPITALS.select("id", hospital_ids),
+        "addresses": [dict(ADDRESSES[i]) for i in address_positions],
+        "wards_rooms": WARDS_ROOMS.select("hospital_id", hospital_ids),
+    }
+
+REGION_PARTITIONS = LazyPartitionStore(
+    load_state_partition,
+    capacity=int(os.environ.get("REGION_PARTITION_CAPACITY", 8)),
+    idle_seconds=float(os.environ.get("REGION_PARTITION_IDLE_SECONDS", 900)),
+)
+
+def get_state_partition(state: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Returns the lazily loaded partition for a state name (case-insensitive); unknown states are empty."""
+    canonical = STATE_NAMES.get(state.strip().casefold())
+    if canonical is None:
+        return {"hospitals": [], "addresses": [], "wards_rooms": []}
+    return REGION_PARTITIONS.get(canonical)
+
 def calculate_network_averages(metrics: List[Dict[str, Any]]):
     """Calculates network averages for key metrics."""
     network_averages = {
@@ -82,7 +434,7 @@ def calculate_network_averages(metrics: List[Dict[str, Any]]):
         if counts[key] > 0:
             network_averages[key] = round(sums[key] / counts[key], 2)
     
-    total_beds_sum = sum(h.get("beds_operational", 0) for h in HOSPITALS)
+    total_beds_sum = sum(h.get("beds_operational") or 0 for h in HOSPITALS)
     total_hospitals_with_beds = sum(1 for h in HOSPITALS if h.get("beds_operational") is not None)
     if total_hospitals_with_beds > 0:
         network_averages["beds_operational"] = round(total_beds_sum / total_hospitals_with_beds, 2)
@@ -93,12 +445,13 @@ NETWORK_AVERAGES = calculate_network_averages(METRICS)
 
 def get_positioning_data(hospital_id: int) -> Optional[Dict[str, Any]]:
     """Helper function to get positioning data for a single hospital."""
-    hospital = next((h for h in HOSPITALS if h["id"] == hospital_id), None)
+    hospital = HOSPITALS_MAP.get(hospital_id)
     if not hospital:
         return None
 
-    hospital_metrics = next((m for m in METRICS if m["hospital_id"] == hospital_id), {})
-    hospital_certifications = [c for c in CERTIFICATIONS if c["hospital_id"] == hospital_id]
+    metrics_record = METRICS_BY_HOSPITAL.get(hospital_id)
+    hospital_metrics = metrics_record.to_dict() if metrics_record else {}
+    hospital_certifications = [CERTIFICATIONS[i] for i in CERTIFICATION_ROWS.get(hospital_id, [])]
     hospital_address = ADDRESSES_MAP.get(hospital_id, {})
 
     selected_hospital_values = {
@@ -129,7 +482,7 @@ def get_positioning_data(hospital_id: int) -> Optional[Dict[str, Any]]:
             "selected_hospital_values": selected_hospital_values,
             "relative_positioning_percent": relative_positioning_percent
         },
-        "certifications": hospital_certifications
+        "certifications": [dict(c) for c in hospital_certifications]
     }
 
 # ----------------- Merged Endpoint Logic ----------------- #
@@ -172,29 +525,33 @@ def get_all_hospital_details() -> List[Dict[str, Any]]:
 def count_doctors_per_hospital():
     """Counts the total number of doctors for each hospital."""
     doctor_counts = defaultdict(int)
-    for doctor in DOCTORS:
-        if doctor['hospital_id'] in doctor_counts:
-            doctor_counts[doctor['hospital_id']] += 1
-        else:
-            doctor_counts[doctor['hospital_id']] = 1
+    for hospital_id in DOCTORS.column('hospital_id'):
+        doctor_counts[hospital_id] += 1
     return doctor_counts
 
+# Verified vs. unverified document counts per hospital, kept current by document writes
+DOCUMENT_STATUS_COUNTS = defaultdict(lambda: {"total": 0, "verified": 0, "unverified": 0})
+
+def count_document(doc: Optional[Dict[str, Any]], delta: int):
+    """Adds (delta=1) or removes (delta=-1) one document from DOCUMENT_STATUS_COUNTS."""
+    if not doc or doc.get("entity_type") != "hospital":
+        return
+    hospital_id = doc.get("entity_id")
+    if hospital_id:
+        status_counts = DOCUMENT_STATUS_COUNTS[hospital_id]
+        status_counts["total"] += delta
+        status_counts["verified" if doc.get("is_verified") else "unverified"] += delta
+        if status_counts["total"] <= 0:
+            del DOCUMENT_STATUS_COUNTS[hospital_id]
+
+for _doc in DOCUMENT_UPLOADS:
+    count_document(_doc, 1)
+
 def calculate_document_status() -> List[Dict[str, Any]]:
     """Calculates the document verification status for each hospital."""
-    # Group documents by hospital ID and count verified vs. unverified
-    hospital_docs_status = defaultdict(lambda: {"total": 0, "verified": 0, "unverified": 0})
-    for doc in DOCUMENT_UPLOADS:
-        hospital_id = doc.get("entity_id")
-        if hospital_id:
-            hospital_docs_status[hospital_id]["total"] += 1
-            if doc.get("is_verified"):
-                hospital_docs_status[hospital_id]["verified"] += 1
-            else:
-                hospital_docs_status[hospital_id]["unverified"] += 1
-    
     # Format the data for the API response
     status_list = []
-    for hospital_id, status_counts in hospital_docs_status.items():
+    for hospital_id, status_counts in list(DOCUMENT_STATUS_COUNTS.items()):
         hospital_info = HOSPITALS_MAP.get(hospital_id, {})
         if not hospital_info:
             continue # Skip if no matching hospital is found
@@ -221,13 +578,11 @@ def calculate_document_status() -> List[Dict[str, Any]]:
     return status_list
 
 @app.get("/hospitals/full-profile", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_all_hospitals_full_profile():
-    data = get_all_hospital_details()
+async def get_all_hospitals_full_profile():
+    data = await read_view("full-profile")
     return data
 
-# New endpoint to get a summary of hospitals and their doctor counts
-@app.get("/api/hospital-doctors-summary", tags=["Directory"])
-def get_hospitals_with_doctor_count():
+def summarize_doctors_per_hospital() -> List[Dict[str, Any]]:
     doctor_counts = count_doctors_per_hospital()
     summary = []
     for hospital in HOSPITALS:
@@ -236,107 +591,224 @@ def get_hospitals_with_doctor_count():
         summary.append({
             "id": hospital_id,
             "name": hospital["name"],
-            "address": hospital_address,
+            "address": dict(hospital_address),
             "total_doctors": doctor_counts.get(hospital_id, 0)
         })
     return summary
 
+# New endpoint to get a summary of hospitals and their doctor counts
+@app.get("/api/hospital-doctors-summary", tags=["Directory"])
+async def get_hospitals_with_doctor_count():
+    return await run_coalesced(summarize_doctors_per_hospital)
+
 # Existing endpoint to get detailed doctors for a specific hospital
 @app.get("/api/doctors/{hospital_id}", tags=["Directory"])
-def get_doctors_by_hospital(hospital_id: int):
+async def get_doctors_by_hospital(hospital_id: int):
     """
     Endpoint to get doctors and their specialties for a selected hospital.
     It joins doctors.json and medical_specialties.json data.
     """
-    # Create a dictionary for quick specialty lookup
-    specialties_map = {
-        item['id']: item['specialty_name']
-        for item in MEDICAL_SPECIALTIES
-    }
-
-    # Filter doctors by the selected hospital ID
-    filtered_doctors = [
-        doctor
-        for doctor in DOCTORS
-        if doctor['hospital_id'] == hospital_id
-    ]
-
-    # Join doctors with specialty names
+    # Join the hospital's doctors with specialty names
     doctors_with_specialty = []
-    for doctor in filtered_doctors:
-        specialty_name = specialties_map.get(doctor.get('specialty_id'))
+    for doctor in DOCTORS_BY_HOSPITAL.get(hospital_id, []):
+        specialty_name = SPECIALTY_NAMES.get(doctor.specialty_id)
         if specialty_name:
             doctors_with_specialty.append({
-                "id": doctor["id"],
-                "name": doctor["name"],
-                "designation": doctor["designation"],
+                "id": doctor.id,
+                "name": doctor.name,
+                "designation": doctor.designation,
                 "specialty_name": specialty_name,
-                "qualification": doctor["qualification"],
-                "experience_years": doctor["experience_years"],
-                "consultation_type": doctor["consultation_type"]
+                "qualification": doctor.qualification,
+                "experience_years": doctor.experience_years,
+                "consultation_type": doctor.consultation_type
             })
 
     return doctors_with_specialty
 
+# ----------------- Doctor Availability ----------------- #
+def doctor_availability_entry(doctor: DoctorRecord) -> tuple:
+    """The DoctorAvailabilityIndex.add() / insert() arguments of one doctor."""
+    specialty_name = SPECIALTY_NAMES.get(doctor.specialty_id)
+    city = HOME_ADDRESSES.get(doctor.hospital_id, {}).get("city_town")
+    return (
+        {
+            "id": doctor.id,
+            "name": doctor.name,
+            "designation": doctor.designation,
+            "specialty_name": specialty_name,
+            "qualification": doctor.qualification,
+            "experience_years": doctor.experience_years,
+            "consultation_type": doctor.consultation_type,
+            "availability_days": doctor.availability_days,
+            "hospital_id": doctor.hospital_id,
+            "hospital_name": HOSPITALS_MAP.get(doctor.hospital_id, {}).get("name"),
+            "city": city,
+        },
+        doctor.availability_days, doctor.consultation_type, specialty_name, city,
+    )
+
+def build_doctor_availability() -> DoctorAvailabilityIndex:
+    """Indexes active doctors by weekday availability, consultation type, specialty and hospital city."""
+    index = DoctorAvailabilityIndex()
+    for doctor in DOCTOR_RECORDS:
+        if doctor.is_active is not False:
+            index.add(*doctor_availability_entry(doctor))
+    return index.build()
+
+def update_doctor_availability(doctor_id: int, doctor: Optional[DoctorRecord]):
+    """Re-indexes one doctor after a write; inactive or deleted doctors leave the index."""
+    DOCTOR_AVAILABILITY.remove(doctor_id)
+    if doctor is not None and doctor.is_active is not False:
+        DOCTOR_AVAILABILITY.insert(*doctor_availability_entry(doctor))
+
+DOCTOR_AVAILABILITY = build_doctor_availability()
+
+@app.get("/doctors/available", response_model=List[Dict[str, Any]], tags=["Directory"])
+async def get_available_doctors(
+    day: str,
+    specialty: Optional[str] = None,
+    city: Optional[str] = None,
+    consultation_type: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Doctors available on a weekday (e.g. "Tue" or "Tuesday"), optionally filtered by specialty
+    name, hospital city and consultation type (OPD / IPD; doctors offering both match either),
+    most experienced first. Doctors on a rota without fixed weekdays ("Alternate Days") are never
+    returned; /doctors/available/stats counts them.
+    """
+    try:
+        day_bit = parse_weekday(day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    consultation = None
+    if consultation_type is not None:
+        consultation = CONSULTATION_BITS.get(consultation_type.strip().lower())
+        if consultation not in (CONSULTATION_BITS["opd"], CONSULTATION_BITS["ipd"]):
+            raise HTTPException(status_code=400, detail="consultation_type must be 'OPD' or 'IPD'")
+    return DOCTOR_AVAILABILITY.query(day_bit, specialty, city, consultation, limit)
+
+@app.get("/doctors/available/stats", tags=["Directory"])
+async def get_doctor_availability_stats():
+    """Indexed doctors, and how many have no fixed weekdays or an unreadable availability_days."""
+    return DOCTOR_AVAILABILITY.stats()
+
+# ----------------- Coverage Matrix Engine ----------------- #
+# Address fields usable as coverage matrix rows
+COVERAGE_ROW_DIMENSIONS = {
+    "city": "city_town",
+    "district": "district",
+    "state": "state",
+}
+
+def _coverage_sources() -> Dict[str, Tuple[Any, str, Any]]:
+    """Column dimensions: (table, label field, predicate deciding whether a record counts as coverage)."""
+    return {
+        "specialty": (MEDICAL_SPECIALTIES, "specialty_name", lambda r: bool(r.get("is_available"))),
+        "support_service": (SUPPORT_SERVICES, "service_name", lambda r: r.get("is_active") is not False),
+        "diagnostic_service": (DIAGNOSTIC_SERVICES, "service_name", lambda r: r.get("is_active") is not False),
+        "equipment": (EQUIPMENT, "equipment_name", lambda r: bool(r.get("is_available")) and (r.get("quantity") or 0) > 0),
+    }
+
+COVERAGE_COLUMN_DIMENSIONS = tuple(_coverage_sources())
+
+@functools.lru_cache(maxsize=None)
+def get_coverage_matrix(row_dimension: str, column_dimension: str) -> CoverageMatrix:
+    """Builds (once) the bitset coverage matrix for a geography x service dimension pair."""
+    address_field = COVERAGE_ROW_DIMENSIONS[row_dimension]
+    table, label_field, is_covered = _coverage_sources()[column_dimension]
+
+    hospital_region = {
+        hospital_id: addr.get(address_field)
+        for hospital_id, addr in HOME_ADDRESSES.items()
+        if addr.get(address_field)
+    }
+    labels = []
+    covered_pairs = []
+    for record in table:
+        label = record.get(label_field)
+        if not label:
+            continue
+        labels.append(label)
+        region = hospital_region.get(record.get("hospital_id"))
+        if region and is_covered(record):
+            covered_pairs.append((region, label))
+    return CoverageMatrix.from_pairs(hospital_region.values(), labels, covered_pairs)
+
+def _split_labels(value: Optional[str]) -> Optional[List[str]]:
+    return [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+def get_coverage_matrix_data(row_dimension: str, column_dimension: str, response_format: str,
+                             rows: Optional[str] = None, columns: Optional[str] = None) -> Dict[str, Any]:
+    """Selects the requested rows/columns of a coverage matrix and renders it in the requested format."""
+    if row_dimension not in COVERAGE_ROW_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"rows must be one of: {', '.join(COVERAGE_ROW_DIMENSIONS)}")
+    if column_dimension not in COVERAGE_COLUMN_DIMENSIONS:
+        raise HTTPException(status_code=400, detail=f"columns must be one of: {', '.join(COVERAGE_COLUMN_DIMENSIONS)}")
+    if response_format not in COVERAGE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(COVERAGE_FORMATS)}")
+
+    matrix = get_coverage_matrix(row_dimension, column_dimension).select(_split_labels(rows), _split_labels(columns))
+    return {
+        "row_dimension": row_dimension,
+        "column_dimension": column_dimension,
+        "format": response_format,
+        "rows": matrix.row_labels,
+        "columns": matrix.column_labels,
+        "matrix": matrix.render(response_format),
+        "column_coverage_counts": matrix.column_counts(),
+        **matrix.stats(),
+    }
+
+@app.get("/api/coverage-matrix", tags=["Coverage"])
+async def get_coverage_matrix_endpoint(
+    rows: str = "city",
+    columns: str = "specialty",
+    response_format: str = Query(FORMAT_SPARSE, alias="format"),
+    row_filter: Optional[str] = None,
+    column_filter: Optional[str] = None,
+):
+    """
+    Returns a coverage matrix for any geography (city / district / state) by service
+    (specialty / support_service / diagnostic_service / equipment) pair.
+
+    `format=sparse` lists covered column indices per row, `format=bitset` returns a
+    base64 little-endian bitset per row and `format=dense` returns booleans.
+    `row_filter` and `column_filter` take comma-separated labels.
+    """
+    return await run_coalesced(get_coverage_matrix_data, rows, columns, response_format, row_filter, column_filter)
+
 @app.get("/api/specialty_coverage_matrix")
-async def get_specialty_coverage_matrix():
+async def get_specialty_coverage_matrix(
+    response_format: str = Query(FORMAT_DENSE, alias="format"),
+    cities: Optional[str] = None,
+    specialties: Optional[str] = None,
+):
     """
     Calculates and returns a matrix of specialty availability by city.
+    The default dense format keeps the original response shape; `format=sparse` or
+    `format=bitset` return the compact coverage matrix form instead.
     """
-    try:
-        specialties_data = read_json("medical_specialties.json")
-        addresses_data = read_json("hospital_addresses.json")
-        
-        # Create mappings for quick lookups
-        hospital_id_to_city = {
-            addr["hospital_id"]: addr["city_town"]
-            for addr in addresses_data
-            if addr.get("address_type") == "Primary"
-        }
-        
-        # Get all unique cities and specialties
-        all_cities = sorted(list(set(hospital_id_to_city.values())))
-        all_specialties = sorted(list(set(s["specialty_name"] for s in specialties_data)))
-
-        # Build the coverage data structure
-        coverage_map = defaultdict(lambda: defaultdict(bool))
-        for specialty_record in specialties_data:
-            hospital_id = specialty_record["hospital_id"]
-            specialty_name = specialty_record["specialty_name"]
-            
-            city = hospital_id_to_city.get(hospital_id)
-            
-            if city and specialty_record.get("is_available"):
-                coverage_map[city][specialty_name] = True
-        
-        # Create the final matrix
-        matrix = []
-        for city in all_cities:
-            row = {
-                "city": city,
-                "coverage": {}
-            }
-            for specialty in all_specialties:
-                is_available = coverage_map.get(city, {}).get(specialty, False)
-                row["coverage"][specialty] = is_available
-            matrix.append(row)
-
-        return {
-            "cities": all_cities,
-            "specialties": all_specialties,
-            "matrix_data": matrix
-        }
-    
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    data = await run_coalesced(get_coverage_matrix_data, "city", "specialty", response_format, cities, specialties)
+    if response_format != FORMAT_DENSE:
+        return data
+
+    return {
+        "cities": data["rows"],
+        "specialties": data["columns"],
+        "matrix_data": [
+            {"city": city, "coverage": coverage}
+            for city, coverage in zip(data["rows"], data["matrix"])
+        ],
+    }
 
 @app.get("/api/hospitals/document-status", tags=["Documents"])
-def get_hospital_document_status():
+async def get_hospital_document_status():
     """
     Provides a summary of document verification status for all hospitals.
     Counts verified vs. unverified documents for each hospital.
     """
-    return calculate_document_status()
+    return await run_coalesced(calculate_document_status)
 # ------------- New Endpoint for Geographic Coverage ------------- #
 
 def get_geographic_data() -> List[Dict[str, Any]]:
@@ -365,9 +837,9 @@ def get_geographic_data() -> List[Dict[str, Any]]:
     return geographic_data
 
 @app.get("/hospitals/geographic-coverage", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_geographic_coverage():
+async def get_geographic_coverage():
     """Returns geographic data for all hospitals, including service radius."""
-    data = get_geographic_data()
+    data = await read_view("geographic-coverage")
     return data
 
 # ------------- New Endpoints for ICU Capacity Network Analysis ------------- #
@@ -383,19 +855,19 @@ def get_icu_summary_data():
     for hospital in HOSPITALS:
         hospital_id = hospital['id']
         wards_for_hospital = WARDS_MAP.get(hospital_id, [])
-        icu_beds_from_wards = sum(item['total_beds'] for item in wards_for_hospital if item['ward_type'] == 'ICU')
-        available_icu_beds_from_wards = sum(item['available_beds'] for item in wards_for_hospital if item['ward_type'] == 'ICU')
+        icu_beds_from_wards = sum(item.total_beds or 0 for item in wards_for_hospital if item.ward_type == 'ICU')
+        available_icu_beds_from_wards = sum(item.available_beds or 0 for item in wards_for_hospital if item.ward_type == 'ICU')
         
         total_icu_beds += icu_beds_from_wards
         total_available_icu_beds += available_icu_beds_from_wards
         
         icu_data_for_hospital = ICU_MAP.get(hospital_id, [])
-        total_ventilators += sum(d['ventilators'] for d in icu_data_for_hospital)
-        total_monitors += sum(d['monitors'] for d in icu_data_for_hospital)
+        total_ventilators += sum(d.ventilators for d in icu_data_for_hospital)
+        total_monitors += sum(d.monitors for d in icu_data_for_hospital)
 
-        metrics_for_hospital = next((m for m in METRICS if m['hospital_id'] == hospital_id), None)
-        if metrics_for_hospital and 'icu_doctor_bed_ratio' in metrics_for_hospital:
-            total_icu_doctor_bed_ratio += metrics_for_hospital['icu_doctor_bed_ratio']
+        metrics_for_hospital = METRICS_BY_HOSPITAL.get(hospital_id)
+        if metrics_for_hospital and metrics_for_hospital.icu_doctor_bed_ratio is not None:
+            total_icu_doctor_bed_ratio += metrics_for_hospital.icu_doctor_bed_ratio
             hospital_count += 1
             
     utilization_rate = (total_icu_beds - total_available_icu_beds) / total_icu_beds if total_icu_beds > 0 else 0
@@ -411,9 +883,9 @@ def get_icu_summary_data():
     }
 
 @app.get("/api/icu-capacity/summary", tags=["ICU Capacity"])
-def icu_summary():
+async def icu_summary():
     """Returns a network-wide summary of ICU bed capacity and utilization."""
-    return get_icu_summary_data()
+    return await run_coalesced(get_icu_summary_data)
 
 @app.get("/api/icu-capacity/hospitals", tags=["ICU Capacity"])
 def icu_hospitals():
@@ -426,13 +898,13 @@ def icu_hospitals():
         address_info = ADDRESSES_MAP.get(hospital_id, {})
         
         wards_for_hospital = WARDS_MAP.get(hospital_id, [])
-        icu_beds_from_wards = sum(item['total_beds'] for item in wards_for_hospital if item['ward_type'] == 'ICU')
-        available_beds_from_wards = sum(item['available_beds'] for item in wards_for_hospital if item['ward_type'] == 'ICU')
+        icu_beds_from_wards = sum(item.total_beds or 0 for item in wards_for_hospital if item.ward_type == 'ICU')
+        available_beds_from_wards = sum(item.available_beds or 0 for item in wards_for_hospital if item.ward_type == 'ICU')
         
         utilization_rate = (icu_beds_from_wards - available_beds_from_wards) / icu_beds_from_wards if icu_beds_from_wards > 0 else 0
         
         icu_facilities_list = ICU_MAP.get(hospital_id, [])
-        metrics_for_hospital = next((m for m in METRICS if m['hospital_id'] == hospital_id), {})
+        metrics_for_hospital = METRICS_BY_HOSPITAL.get(hospital_id)
         
         hospital_details = {
             'hospital_id': hospital_id,
@@ -442,106 +914,500 @@ def icu_hospitals():
             'total_icu_beds': icu_beds_from_wards,
             'available_icu_beds': available_beds_from_wards,
             'icu_utilization': round(utilization_rate, 2),
-            'icu_facilities': icu_facilities_list,
-            'metrics': metrics_for_hospital
+            'icu_facilities': [dict(ICU_FACILITIES[item.row]) for item in icu_facilities_list],
+            'metrics': dict(METRICS[metrics_for_hospital.row]) if metrics_for_hospital else {}
         }
         hospitals_list.append(hospital_details)
         
     return hospitals_list
 
+def icu_availability_of(hospital_id: int) -> Dict[str, int]:
+    """ICU beds of a hospital from its ICU wards and ventilators from its ICU facilities."""
+    icu_wards = [item for item in WARDS_MAP.get(hospital_id, []) if item.ward_type == 'ICU']
+    return {
+        "total_icu_beds": sum(item.total_beds or 0 for item in icu_wards),
+        "available_icu_beds": sum(item.available_beds or 0 for item in icu_wards),
+        "ventilators": sum(d.ventilators or 0 for d in ICU_MAP.get(hospital_id, [])),
+    }
+
+def build_icu_availability() -> Dict[int, Dict[str, int]]:
+    return {hospital_id: icu_availability_of(hospital_id) for hospital_id in HOSPITALS.column("id")}
+
+def build_icu_locator(availability: Dict[int, Dict[str, int]]) -> NearestFacilityIndex:
+    locator = NearestFacilityIndex(
+        zip(HOSPITALS.column("id"), HOSPITALS.column("latitude"), HOSPITALS.column("longitude"))
+    )
+    locator.load_availability({
+        hospital_id: (entry["available_icu_beds"], entry["ventilators"])
+        for hospital_id, entry in availability.items()
+    })
+    return locator
+
+ICU_AVAILABILITY = build_icu_availability()
+ICU_LOCATOR = build_icu_locator(ICU_AVAILABILITY)
+
+def update_icu_availability(hospital_id: int, available_icu_beds: Optional[int] = None,
+                            ventilators: Optional[int] = None):
+    """Applies a live bed or ventilator count so the nearest-bed search sees it immediately."""
+    entry = ICU_AVAILABILITY.get(hospital_id)
+    if entry is None:
+        return
+    if available_icu_beds is not None:
+        entry["available_icu_beds"] = available_icu_beds
+    if ventilators is not None:
+        entry["ventilators"] = ventilators
+    ICU_LOCATOR.set_availability(hospital_id, available_icu_beds, ventilators)
+
+@app.get("/api/icu-capacity/nearest", tags=["ICU Capacity"])
+async def nearest_icu_beds(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(5, ge=1, le=100),
+    min_beds: int = Query(1, ge=0),
+    needs_ventilator: bool = False,
+    max_distance_km: Optional[float] = Query(None, gt=0),
+):
+    """
+    Returns the k closest hospitals with at least `min_beds` available ICU beds (and a
+    ventilator when `needs_ventilator` is set), nearest first, for patient transfers.
+    """
+    matches = ICU_LOCATOR.nearest(
+        lat, lon, k=k, min_beds=min_beds,
+        min_ventilators=1 if needs_ventilator else 0,
+        max_distance_km=max_distance_km,
+    )
+    results = []
+    for match in matches:
+        hospital_id = match["id"]
+        hospital = HOSPITALS_MAP.get(hospital_id, {})
+        address = HOME_ADDRESSES.get(hospital_id, {})
+        results.append({
+            "hospital_id": hospital_id,
+            "name": hospital.get("name"),
+            "city": address.get("city_town"),
+            "state": address.get("state"),
+            "telephone": hospital.get("telephone"),
+            "distance_km": match["distance_km"],
+            "available_icu_beds": match["available_beds"],
+            "total_icu_beds": ICU_AVAILABILITY[hospital_id]["total_icu_beds"],
+            "ventilators": match["ventilators"],
+        })
+    return results
+
+# ----------------- Network Adequacy ----------------- #
+PIN_CODE_DATASET = "pin-codes"
+ADEQUACY_CACHE_SIZE = int(os.environ.get("ADEQUACY_CACHE_SIZE", 16))
+ADEQUACY_DATASETS: "OrderedDict[str, AdequacyMatrix]" = OrderedDict()
+ADEQUACY_LOCK = threading.Lock()
+
+class MemberLocation(BaseModel):
+    location_id: str
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+class MemberLocationUpload(BaseModel):
+    locations: List[MemberLocation] = Field(..., min_length=1)
+
+def build_specialty_providers() -> Dict[str, List[Tuple[int, float, float]]]:
+    """Maps each available specialty to the located hospitals offering it."""
+    providers = defaultdict(dict)
+    for hospital_id, name, available in zip(
+        MEDICAL_SPECIALTIES.column("hospital_id"),
+        MEDICAL_SPECIALTIES.column("specialty_name"),
+        MEDICAL_SPECIALTIES.column("is_available"),
+    ):
+        hospital = HOSPITALS_MAP.get(hospital_id)
+        if not available or not name or hospital is None:
+            continue
+        if hospital.get("latitude") is None or hospital.get("longitude") is None:
+            continue
+        providers[name][hospital_id] = (hospital_id, hospital["latitude"], hospital["longitude"])
+    return {name: list(by_hospital.values()) for name, by_hospital in providers.items()}
+
+def build_pin_code_centroids() -> List[Tuple[str, float, float]]:
+    """
+    Approximates each PIN code's centroid by the mean coordinates of the hospitals with an
+    address in it, since addresses carry no coordinates of their own.
+    """
+    points = defaultdict(dict)
+    for hospital_id, pin_code in zip(ADDRESSES.column("hospital_id"), ADDRESSES.column("pin_code")):
+        hospital = HOSPITALS_MAP.get(hospital_id)
+        if not pin_code or hospital is None or hospital.get("latitude") is None or hospital.get("longitude") is None:
+            continue
+        points[str(pin_code)][hospital_id] = (hospital["latitude"], hospital["longitude"])
+    centroids = []
+    for pin_code, coords in sorted(points.items()):
+        lats, lons = zip(*coords.values())
+        centroids.append((pin_code, sum(lats) / len(lats), sum(lons) / len(lons)))
+    return centroids
+
+def compute_adequacy(locations: List[Tuple[str, float, float]]) -> AdequacyMatrix:
+    location_ids, latitudes, longitudes = zip(*locations) if locations else ((), (), ())
+    return AdequacyMatrix(location_ids, latitudes, longitudes, build_specialty_providers())
+
+def cache_adequacy(dataset_id: str, matrix: AdequacyMatrix):
+    with ADEQUACY_LOCK:
+        ADEQUACY_DATASETS[dataset_id] = matrix
+        ADEQUACY_DATASETS.move_to_end(dataset_id)
+        while len(ADEQUACY_DATASETS) > ADEQUACY_CACHE_SIZE:
+            ADEQUACY_DATASETS.popitem(last=False)
+
+def get_adequacy_matrix(dataset_id: str) -> AdequacyMatrix:
+    """Returns a cached adequacy matrix; the PIN code dataset is computed on first use."""
+    with ADEQUACY_LOCK:
+        matrix = ADEQUACY_DATASETS.get(dataset_id)
+        if matrix is not None:
+            ADEQUACY_DATASETS.move_to_end(dataset_id)
+            return matrix
+    if dataset_id != PIN_CODE_DATASET:
+        raise HTTPException(status_code=404, detail="Adequacy dataset not found")
+    matrix = compute_adequacy(build_pin_code_centroids())
+    cache_adequacy(dataset_id, matrix)
+    return matrix
+
+@app.post("/network-adequacy/locations", tags=["Coverage"])
+async def upload_member_locations(upload: MemberLocationUpload):
+    """
+    Computes the distance from each uploaded member location to the nearest provider of every
+    specialty and caches it. Identical uploads map to the same dataset ID.
+    """
+    locations = sorted((loc.location_id, loc.latitude, loc.longitude) for loc in upload.locations)
+    dataset_id = hashlib.sha256(json.dumps(locations).encode("utf-8")).hexdigest()[:16]
+    with ADEQUACY_LOCK:
+        cached = dataset_id in ADEQUACY_DATASETS
+    if not cached:
+        cache_adequacy(dataset_id, await run_blocking(compute_adequacy, locations))
+    return {"dataset_id": dataset_id, "location_count": len(locations)}
+
+@app.get("/network-adequacy/{dataset_id}", tags=["Coverage"])
+async def get_network_adequacy(
+    dataset_id: str,
+    threshold_km: float = Query(30.0, gt=0),
+    specialty: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Reports, per specialty, how many locations have a provider within `threshold_km`, and
+    lists the location/specialty gaps above it, worst first (404 for a specialty no hospital
+    offers). Use `pin-codes` for the PIN code
+    centroids of the network, or the ID returned by POST /network-adequacy/locations.
+    """
+    matrix = await run_coalesced(get_adequacy_matrix, dataset_id)
+    if specialty is not None and not matrix.has_specialty(specialty):
+        raise HTTPException(status_code=404, detail=f"Unknown specialty '{specialty}'")
+    gaps = matrix.gaps(threshold_km, specialty)
+    return {
+        "dataset_id": dataset_id,
+        "threshold_km": threshold_km,
+        "location_count": len(matrix.location_ids),
+        "summary": matrix.summary(threshold_km, specialty),
+        "gap_count": len(gaps),
+        "gaps": gaps[:limit] if limit else gaps,
+    }
+
 # ----------------- New Endpoint for Quality Score Calculation ----------------- #
 
-def get_quality_scores() -> List[Dict[str, Any]]:
+# Weights of the normalized components in the 0-100 quality score (the "quality" score index)
+QUALITY_WEIGHTS = {
+    "certifications": 40,
+    "doctorRatio": 30,
+    "nurseRatio": 30,
+}
+
+# The default-weight ranking, rebuilt only when the "quality" feature matrix changes
+_QUALITY_RANKING: Optional[Dict[str, Any]] = None
+_QUALITY_RANKING_LOCK = threading.Lock()
+
+def quality_ranking() -> Dict[str, Any]:
     """
-    Calculates and returns a list of hospitals with their quality scores.
-    The score is based on certifications, doctor ratio, and nurse ratio.
+    The "quality" index ranked once per feature matrix: row positions best first, overall and
+    per city, and each hospital's row, rank and in-city rank for lookups.
     """
-    # Create maps for efficient lookup
-    metrics_map = {m['hospital_id']: m for m in METRICS}
-    cert_counts = defaultdict(int)
-    for c in CERTIFICATIONS:
-        cert_counts[c['hospital_id']] += 1
-
-    hospitals_with_data = []
-    for h in HOSPITALS:
-        hospital_id = h.get('id')
-        metrics = metrics_map.get(hospital_id)
-        certifications = cert_counts.get(hospital_id, 0)
-        address = ADDRESSES_MAP.get(hospital_id, {})
-
-        if metrics:
-            hospitals_with_data.append({
-                "hospital_id": hospital_id,
-                "name": h.get('name'),
-                "city": address.get('city_town'),
-                "certifications": certifications,
-                "doctorRatio": metrics.get('doctor_bed_ratio', 0),
-                "nurseRatio": metrics.get('nurse_bed_ratio', 0),
-            })
+    global _QUALITY_RANKING
+    ranking = _QUALITY_RANKING
+    if ranking is not None and ranking["raw"] is SCORING.matrix("quality").raw:
+        return ranking
+    with _QUALITY_RANKING_LOCK:
+        ranking = _QUALITY_RANKING
+        if ranking is not None and ranking["raw"] is SCORING.matrix("quality").raw:
+            return ranking
+        _, result, scores, order = rank_score_index("quality")
+        cities = [ADDRESSES_MAP.get(hospital_id, {}).get("city_town") for hospital_id in result["hospital_ids"]]
+        by_city = defaultdict(list)
+        ranks = {}
+        for rank, i in enumerate(order, start=1):
+            members = by_city[cities[i]]
+            members.append(i)
+            ranks[result["hospital_ids"][i]] = (i, rank, len(members))
+        ranking = _QUALITY_RANKING = {
+            "raw": result["raw"], "hospital_ids": result["hospital_ids"], "scores": scores, "cities": cities,
+            "order": order, "by_city": dict(by_city), "ranks": ranks,
+        }
+        return ranking
 
-    # Find max values for normalization to a 0-100 scale
-    max_certs = max(h['certifications'] for h in hospitals_with_data) if hospitals_with_data else 0
-    max_doctor_ratio = max(h['doctorRatio'] for h in hospitals_with_data) if hospitals_with_data else 0
-    max_nurse_ratio = max(h['nurseRatio'] for h in hospitals_with_data) if hospitals_with_data else 0
-    
-    scored_hospitals = []
-    for h in hospitals_with_data:
-        normalized_cert_score = (h['certifications'] / max_certs) if max_certs > 0 else 0
-        normalized_doctor_score = (h['doctorRatio'] / max_doctor_ratio) if max_doctor_ratio > 0 else 0
-        normalized_nurse_score = (h['nurseRatio'] / max_nurse_ratio) if max_nurse_ratio > 0 else 0
-
-        # Calculate the final score based on weights
-        final_score = (normalized_cert_score * 40) + (normalized_doctor_score * 30) + (normalized_nurse_score * 30)
-
-        scored_hospitals.append({
-            "hospital_id": h['hospital_id'],
-            "name": h['name'],
-            "city": h['city'],
-            "certifications": h['certifications'],
-            "doctorRatio": h['doctorRatio'],
-            "nurseRatio": h['nurseRatio'],
-            "qualityScore": round(final_score),
-        })
+def quality_entry(ranking: Dict[str, Any], i: int) -> Dict[str, Any]:
+    hospital_id = ranking["hospital_ids"][i]
+    certifications, doctor_ratio, nurse_ratio = ranking["raw"][i].tolist()
+    return {
+        "hospital_id": hospital_id,
+        "name": HOSPITALS_MAP.get(hospital_id, {}).get("name"),
+        "city": ranking["cities"][i],
+        "certifications": int(certifications),
+        "doctorRatio": doctor_ratio,
+        "nurseRatio": nurse_ratio,
+        "qualityScore": ranking["scores"][i],
+    }
 
-    # Sort hospitals by quality score in descending order
-    scored_hospitals.sort(key=lambda x: x['qualityScore'], reverse=True)
-    
-    return scored_hospitals
+def get_quality_scores(top: Optional[int] = None, city: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns hospitals with their quality scores, best first, from the "quality" score index.
+    The score is based on certifications, doctor ratio, and nurse ratio.
+    """
+    ranking = quality_ranking()
+    order = ranking["order"] if city is None else ranking["by_city"].get(city, [])
+    return [quality_entry(ranking, i) for i in order[:top]]
+
+def get_quality_rank(hospital_id: int) -> Optional[Dict[str, Any]]:
+    """A hospital's quality score with its network-wide and in-city rank, or None if it is not ranked."""
+    ranking = quality_ranking()
+    found = ranking["ranks"].get(hospital_id)
+    if found is None:
+        return None
+    i, rank, city_rank = found
+    entry = quality_entry(ranking, i)
+    return {
+        **entry,
+        "rank": rank,
+        "total_ranked": len(ranking["order"]),
+        "city_rank": city_rank,
+        "city_total_ranked": len(ranking["by_city"][entry["city"]]),
+    }
 
 @app.get("/hospitals/quality-scores", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_hospitals_quality_scores():
-    """Returns a list of all hospitals with a calculated quality score and ranking."""
-    data = get_quality_scores()
+async def get_hospitals_quality_scores(top: Optional[int] = None, city: Optional[str] = None):
+    """
+    Returns hospitals with a calculated quality score and ranking.
+    Use `top` to get only the k best hospitals and `city` to rank within a single city.
+    """
+    if top is not None and top < 1:
+        raise HTTPException(status_code=400, detail="top must be a positive integer")
+    return await run_coalesced(get_quality_scores, top, city)
+
+@app.get("/hospitals/{hospital_id}/quality-rank", response_model=Dict[str, Any], tags=["Hospitals"])
+async def get_hospital_quality_rank(hospital_id: int):
+    """Returns a hospital's quality score with its network-wide and in-city rank."""
+    data = await run_coalesced(get_quality_rank, hospital_id)
+    if not data:
+        raise HTTPException(status_code=404, detail="Hospital not found in quality ranking")
     return data
 
+# ----------------- Compliance Expiry Index ----------------- #
+def build_expiry_index() -> ExpiryIndex:
+    """Parses certification expiry and license validity dates once into sorted per-type arrays."""
+    index = ExpiryIndex()
+    index.add_many(
+        "certification", CERTIFICATIONS, type_field="certification_type", date_field="expiry_date",
+        detail_fields=["certificate_number", "certification_level", "issuing_authority"],
+    )
+    index.add_many(
+        "license", COMPLIANCE_LICENSES, type_field="license_type", date_field="valid_upto",
+        detail_fields=["license_number", "issuing_authority"],
+    )
+    return index
+
+EXPIRY_INDEX = build_expiry_index()
+
+def certification_epoch(as_of: date, hospital_id: Optional[int] = None,
+                        record_type: Optional[str] = None) -> Optional[date]:
+    """
+    The next date any certification status in scope flips. Results that depend on the date only
+    through those statuses are identical for every day before it, so it can stand in for today
+    in cache keys.
+    """
+    return EXPIRY_INDEX.next_status_change(as_of, "certification", record_type, hospital_id)
+
+def format_expiry_entries(entries: List[Dict[str, Any]], as_of: date) -> List[Dict[str, Any]]:
+    """Adds hospital names and days remaining to expiry index entries."""
+    formatted = []
+    for entry in entries:
+        hospital = HOSPITALS_MAP.get(entry["hospital_id"], {})
+        formatted.append({
+            **ExpiryIndex.public(entry),
+            "hospital_name": hospital.get("name", "Unknown Hospital"),
+            "days_remaining": (entry["_expiry"] - as_of).days,
+        })
+    return formatted
+
+def parse_record_kind(record_kind: Optional[str]) -> Optional[str]:
+    if record_kind not in (None, "certification", "license"):
+        raise HTTPException(status_code=400, detail="record_kind must be 'certification' or 'license'")
+    return record_kind
+
+@app.get("/compliance/expiring", tags=["Certifications"])
+async def get_expiring_compliance_records(
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    days: int = 90,
+    record_kind: Optional[str] = None,
+    record_type: Optional[str] = None,
+    hospital_id: Optional[int] = None,
+):
+    """
+    Returns certifications and licenses expiring between from_date (default today) and
+    to_date (default from_date + days), soonest first. Filter with record_kind
+    (certification / license), record_type (e.g. "NABH", "Fire NOC") or hospital_id.
+    """
+    start = from_date or date.today()
+    end = to_date or start + timedelta(days=days)
+    if end < start:
+        raise HTTPException(status_code=400, detail="to_date must not be before from_date")
+    entries = EXPIRY_INDEX.expiring_between(start, end, parse_record_kind(record_kind), record_type, hospital_id)
+    return {
+        "from_date": start.isoformat(),
+        "to_date": end.isoformat(),
+        "count": len(entries),
+        "records": format_expiry_entries(entries, start),
+    }
+
+@app.get("/compliance/expired", tags=["Certifications"])
+async def get_expired_compliance_records(
+    as_of: Optional[date] = None,
+    record_kind: Optional[str] = None,
+    record_type: Optional[str] = None,
+    hospital_id: Optional[int] = None,
+):
+    """Returns certifications and licenses already expired as of a date (default today)."""
+    day = as_of or date.today()
+    entries = EXPIRY_INDEX.expired_as_of(day, parse_record_kind(record_kind), record_type, hospital_id)
+    return {
+        "as_of": day.isoformat(),
+        "count": len(entries),
+        "records": format_expiry_entries(entries, day),
+    }
+
+@app.get("/compliance/hospitals/{hospital_id}/next-expiry", tags=["Certifications"])
+async def get_hospital_next_expiry(hospital_id: int, as_of: Optional[date] = None, record_kind: Optional[str] = None):
+    """Returns the next certification or license of a hospital to expire on or after a date."""
+    if hospital_id not in HOSPITALS_MAP:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    day = as_of or date.today()
+    entry = EXPIRY_INDEX.next_expiry(hospital_id, day, parse_record_kind(record_kind))
+    return {
+        "hospital_id": hospital_id,
+        "as_of": day.isoformat(),
+        "next_expiry": format_expiry_entries([entry], day)[0] if entry else None,
+    }
+
+# ----------------- Hospital Rollup Cube ----------------- #
+# Dimensions and additive measures of the pre-aggregated hospital cube
+ROLLUP_DIMENSIONS = ("state", "district", "city", "hospital_type", "ownership_type", "size_bucket")
+ROLLUP_MEASURES = (
+    "hospitals", "beds_registered", "beds_operational", "doctors", "nurses",
+    "icu_beds", "ventilators", "equipment_quantity",
+)
+
+def size_bucket(hospital) -> Optional[str]:
+    """Small (<100 beds), Medium (100-300) or Large (>300), by operational beds falling back to registered."""
+    bed_count = hospital.get("beds_operational") or hospital.get("beds_registered")
+    if bed_count is None or not isinstance(bed_count, int):
+        return None
+    if bed_count < 100:
+        return "Small"
+    if bed_count <= 300:
+        return "Medium"
+    return "Large"
+
+# Metrics are read-only, so each hospital's nurse total is summed once
+NURSES_BY_HOSPITAL: Dict[int, int] = defaultdict(int)
+for _metric in METRIC_RECORDS:
+    NURSES_BY_HOSPITAL[_metric.hospital_id] += _metric.qualified_nurses or 0
+
+def hospital_cube_fact(hospital) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """A hospital's dimension values and capacity measures, as added to the rollup cube."""
+    hospital_id = hospital.get("id")
+    address = HOME_ADDRESSES.get(hospital_id, {})
+    icu_facilities = ICU_MAP.get(hospital_id, [])
+    return (
+        {
+            "state": address.get("state"),
+            "district": address.get("district"),
+            "city": address.get("city_town"),
+            "hospital_type": hospital.get("hospital_type"),
+            "ownership_type": hospital.get("ownership_type"),
+            "size_bucket": size_bucket(hospital),
+        },
+        {
+            "doctors": len(DOCTORS_BY_HOSPITAL.get(hospital_id, [])),
+            "nurses": NURSES_BY_HOSPITAL.get(hospital_id, 0),
+            "icu_beds": sum(icu.total_beds or 0 for icu in icu_facilities),
+            "ventilators": sum(icu.ventilators or 0 for icu in icu_facilities),
+            "equipment_quantity": sum(item.quantity or 0 for item in EQUIPMENT_BY_HOSPITAL.get(hospital_id, [])),
+            "hospitals": 1,
+            "beds_registered": hospital.get("beds_registered"),
+            "beds_operational": hospital.get("beds_operational"),
+        },
+    )
+
+def build_hospital_cube() -> RollupCube:
+    """Aggregates per-hospital capacity and pre-rolls it over every dimension subset."""
+    cube = RollupCube(ROLLUP_DIMENSIONS, ROLLUP_MEASURES)
+    for hospital in HOSPITALS:
+        cube.add(*hospital_cube_fact(hospital))
+    return cube.build()
+
+HOSPITAL_CUBE = build_hospital_cube()
+
+def parse_rollup_filters(filters: Optional[List[str]]) -> Dict[str, List[str]]:
+    """Parses `dimension:value` clauses; alternatives for one dimension are separated by `|`."""
+    parsed = defaultdict(list)
+    for clause in filters or []:
+        dimension, sep, values = clause.partition(":")
+        if not sep or not dimension.strip():
+            raise HTTPException(status_code=400, detail=f"Invalid filter '{clause}', expected dimension:value")
+        parsed[dimension.strip()].extend(value.strip() for value in values.split("|"))
+    return dict(parsed)
+
+@app.get("/analytics/rollup", tags=["Analytics"])
+async def get_analytics_rollup(
+    group_by: Optional[str] = None,
+    measures: Optional[str] = None,
+    filter: Optional[List[str]] = Query(None),
+):
+    """
+    Answers a group-by over the hospital cube from pre-aggregated cells.
+    `group_by` and `measures` are comma separated; `filter` is repeatable, e.g.
+    `?group_by=city,size_bucket&measures=hospitals,icu_beds&filter=state:Maharashtra&filter=ownership_type:Private|Trust`.
+    Without a group_by the network totals are returned.
+    """
+    dimensions = _split_labels(group_by) or []
+    selected = _split_labels(measures) or list(ROLLUP_MEASURES)
+    filters = parse_rollup_filters(filter)
+    try:
+        data = HOSPITAL_CUBE.query(dimensions, selected, filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "group_by": dimensions,
+        "measures": selected,
+        "filters": filters,
+        "data": data,
+    }
+
 # ----------------- New Endpoint for Hospital Size Classification ----------------- #
 def classify_hospitals_by_size() -> Dict[str, Any]:
-    hospitals = read_json("hospitals.json")
-    classifications = {
-        "Small": 0,
-        "Medium": 0,
-        "Large": 0,
+    counts = {
+        row["size_bucket"]: row["hospitals"]
+        for row in HOSPITAL_CUBE.query(["size_bucket"], ["hospitals"])
     }
-    
-    for hospital in hospitals:
-        bed_count = hospital.get("beds_operational") or hospital.get("beds_registered")
-        if bed_count is None or not isinstance(bed_count, int):
-            continue
-        if bed_count < 100:
-            classifications["Small"] += 1
-        elif 100 <= bed_count <= 300:
-            classifications["Medium"] += 1
-        else:
-            classifications["Large"] += 1
 
-    total_hospitals = len(hospitals)
+    total_hospitals = sum(counts.values())
     if total_hospitals == 0:
         return {"distribution": [], "total_hospitals": 0}
 
     pie_chart_data = [
-        {"name": "Small (<100 beds)", "value": classifications["Small"]},
-        {"name": "Medium (100-300 beds)", "value": classifications["Medium"]},
-        {"name": "Large (>300 beds)", "value": classifications["Large"]},
+        {"name": "Small (<100 beds)", "value": counts.get("Small", 0)},
+        {"name": "Medium (100-300 beds)", "value": counts.get("Medium", 0)},
+        {"name": "Large (>300 beds)", "value": counts.get("Large", 0)},
     ]
 
     return {
@@ -550,31 +1416,96 @@ def classify_hospitals_by_size() -> Dict[str, Any]:
     }
 
 @app.get("/hospitals/size-distribution", response_model=Dict[str, Any], tags=["Hospitals"])
-def get_hospital_size_distribution():
-    data = classify_hospitals_by_size()
-    return data
+async def get_hospital_size_distribution():
+    return classify_hospitals_by_size()
 
 # ----------------- Hospital Positioning Endpoints ----------------- #
 @app.get("/hospitals/{hospital_id}/positioning", response_model=Dict[str, Any], tags=["Hospitals", "Metrics"])
-def get_hospital_positioning(hospital_id: int):
+async def get_hospital_positioning(hospital_id: int):
     """
     Calculates and returns a selected hospital's key metrics
     relative to the network averages.
     """
-    data = get_positioning_data(hospital_id)
+    data = await run_coalesced(get_positioning_data, hospital_id)
     if not data:
         raise HTTPException(status_code=404, detail="Hospital not found")
     return data
 
 @app.get("/hospitals/positioning/all", tags=["Hospitals"])
-def get_all_hospital_positioning():
+async def get_all_hospital_positioning():
     """
     Returns the positioning report for all hospitals in the network.
     """
+    return await read_view("positioning-all")
+
+# ----------------- Equipment Inventory Engine ----------------- #
+def build_equipment_inventory() -> EquipmentInventory:
+    """Loads equipment items into the sparse hospital x equipment type inventory, hospitals in table order."""
+    hospital_ids = [hospital_id for hospital_id in HOSPITALS.column("id") if hospital_id is not None]
+    return EquipmentInventory(hospital_ids, (record.to_dict() for record in EQUIPMENT_RECORDS))
+
+EQUIPMENT_INVENTORY = build_equipment_inventory()
+
+def hospitals_in_area(state: Optional[str] = None, city: Optional[str] = None) -> Optional[List[int]]:
+    """IDs of hospitals whose primary address is in the state and/or city, or None when neither is given."""
+    if not state and not city:
+        return None
+    state, city = (state or "").strip().lower(), (city or "").strip().lower()
+    return [
+        hospital_id for hospital_id, addr in HOME_ADDRESSES.items()
+        if (not state or (addr.get("state") or "").lower() == state)
+        and (not city or (addr.get("city_town") or "").lower() == city)
+    ]
+
+def parse_inventory_format(response_format: str) -> str:
+    if response_format not in INVENTORY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(INVENTORY_FORMATS)}")
+    return response_format
+
+def get_equipment_category_totals_data(state: Optional[str], city: Optional[str], hospital_id: Optional[int],
+                                      available_only: bool) -> List[Dict[str, Any]]:
+    hospital_ids = [hospital_id] if hospital_id is not None else hospitals_in_area(state, city)
+    return EQUIPMENT_INVENTORY.category_totals(hospital_ids, available_only)
+
+def get_equipment_age_profile_data(as_of_year: int, bucket_years: int, state: Optional[str], city: Optional[str],
+                                   category: Optional[str]) -> Dict[str, Any]:
+    try:
+        return EQUIPMENT_INVENTORY.age_profile(as_of_year, bucket_years, hospitals_in_area(state, city), _split_labels(category))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/equipment/inventory/categories", response_model=List[Dict[str, Any]], tags=["Equipment"])
+async def get_equipment_category_totals(
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    hospital_id: Optional[int] = None,
+    available_only: bool = False,
+):
+    """Items, total and available quantity and number of hospitals per equipment category."""
+    return await run_coalesced(get_equipment_category_totals_data, state, city, hospital_id, available_only)
+
+@app.get("/equipment/inventory/age-profile", response_model=Dict[str, Any], tags=["Equipment"])
+async def get_equipment_age_profile(
+    bucket_years: int = Query(5, ge=1, le=50),
+    as_of_year: Optional[int] = None,
+    category: Optional[str] = None,
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+):
+    """
+    Equipment quantity by age since installation_year, in buckets of `bucket_years`, overall and
+    per category. `category` takes comma-separated category names. An `as_of_year` before the
+    installation year of selected equipment is rejected with 400.
+    """
+    return await run_coalesced(
+        get_equipment_age_profile_data, as_of_year or date.today().year, bucket_years, state, city, category,
+    )
+
+# ----------------- Existing Endpoints (retained and corrected) ----------------- #
+def get_all_positioning_data() -> List[Dict[str, Any]]:
     all_hospitals_data = [get_positioning_data(h["id"]) for h in HOSPITALS]
     return [data for data in all_hospitals_data if data is not None]
 
-# ----------------- Existing Endpoints (retained and corrected) ----------------- #
 def get_merged_metrics_data() -> List[Dict[str, Any]]:
     metrics_data = read_json("hospital_metrics.json")
     addresses_data = read_json("hospital_addresses.json")
@@ -603,30 +1534,35 @@ def get_merged_metrics_data() -> List[Dict[str, Any]]:
         item["rank"] = i
     return merged_list
 
-def get_equipment_data():
+def get_equipment_data(response_format: str = INVENTORY_DENSE, state: Optional[str] = None,
+                       city: Optional[str] = None, categories: Optional[Sequence[str]] = None,
+                       equipment_types: Optional[Sequence[str]] = None):
+    """
+    Equipment quantity per hospital and equipment type from the inventory engine. Dense rows list
+    every type (zeros included); sparse rows only the types the hospital has.
+    """
     hospitals_data = read_json("hospitals.json")
     addresses_data = read_json("hospital_addresses.json")
-    equipment_data = read_json("hospital_equipment.json")
     addresses_map = {addr.get("hospital_id"): addr for addr in addresses_data if addr.get("hospital_id")}
-    equipment_map = defaultdict(lambda: defaultdict(int))
-    for item in equipment_data:
-        hospital_id = item.get("hospital_id")
-        equipment_name = item.get("equipment_name")
-        quantity = item.get("quantity", 0)
-        if hospital_id is not None and equipment_name is not None:
-            equipment_map[hospital_id][equipment_name] += quantity
-    all_equipment_types = sorted(list(set(item.get("equipment_name") for item in equipment_data if item.get("equipment_name"))))
+    area = hospitals_in_area(state, city)
+    selection = EQUIPMENT_INVENTORY.select(
+        area, equipment_types, categories, all_columns=categories is None and equipment_types is None,
+    )
+    row_of = {hospital_id: r for r, hospital_id in enumerate(selection.row_ids)}
+    area = set(area) if area is not None else None
     merged_data = []
     for hospital in hospitals_data:
         hospital_id = hospital.get("id")
-        if hospital_id is None:
+        if hospital_id is None or (area is not None and hospital_id not in area):
             continue
-        hospital_equipment = equipment_map.get(hospital_id, {})
         hospital_address = addresses_map.get(hospital_id, {})
-        equipment_status = {
-            eq_type: hospital_equipment.get(eq_type, 0)
-        for eq_type in all_equipment_types
-        }
+        r = row_of.get(hospital_id)
+        if r is not None:
+            equipment_status = selection.render(r, response_format)
+        elif response_format == INVENTORY_DENSE:
+            equipment_status = dict.fromkeys(selection.column_labels, 0)
+        else:
+            equipment_status = {}
         merged_data.append({
             "id": hospital_id,
             "name": hospital.get("name", "Unknown"),
@@ -636,18 +1572,34 @@ def get_equipment_data():
         })
     return {
         "data": merged_data,
-        "equipmentTypes": all_equipment_types
+        "equipmentTypes": selection.column_labels
     }
 
 @app.get("/metrics/doctor-to-bed-ratio", response_model=Dict[str, Any], tags=["Metrics"])
-def merged_doctor_to_bed_ratio():
-    data = get_merged_metrics_data()
+async def merged_doctor_to_bed_ratio():
+    data = await read_view("doctor-to-bed-ratio")
     return {"data": data}
 
 @app.get("/equipment-data", response_model=Dict[str, Any], tags=["Equipment"])
-def equipment_data():
-    data = get_equipment_data()
-    return data
+async def equipment_data(
+    response_format: str = Query(INVENTORY_DENSE, alias="format"),
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    types: Optional[str] = None,
+):
+    """
+    Equipment quantity per hospital and type. `format=sparse` omits zero cells; `state`/`city`
+    filter hospitals and `category`/`types` (comma-separated) filter equipment columns.
+    """
+    parse_inventory_format(response_format)
+    if response_format == INVENTORY_DENSE and not any((state, city, category, types)):
+        return await read_view("equipment-data")
+    categories, equipment_types = _split_labels(category), _split_labels(types)
+    return await run_coalesced(
+        get_equipment_data, response_format, state, city,
+        tuple(categories) if categories else None, tuple(equipment_types) if equipment_types else None,
+    )
     
 def calculate_doctor_bed_ratio():
     hospitals_data = read_json("hospitals.json")
@@ -670,17 +1622,17 @@ def calculate_doctor_bed_ratio():
     return merged
 
 @app.get("/doctor-to-bed-ratio", response_model=Dict[str, Any], tags=["Original"])
-def doctor_to_bed_ratio():
-    data = calculate_doctor_bed_ratio()
+async def doctor_to_bed_ratio():
+    data = await read_view("doctor-bed-ratio")
     return {"data": data}
 
 @app.get("/hospitals", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_all_hospitals():
-    return read_json("hospitals.json")
+async def get_all_hospitals():
+    return await read_json_async("hospitals.json")
 
 @app.get("/hospital_addresses", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_hospital_addresses():
-    return read_json("hospital_addresses.json")
+async def get_hospital_addresses():
+    return await read_json_async("hospital_addresses.json")
 
 @app.get("/hospitals/basic", response_model=List[Dict[str, Any]], tags=["Hospitals"])
 def get_hospitals_basic():
@@ -791,7 +1743,7 @@ def get_analytics_summary():
     doctors = read_json("doctors.json")
 
     total_hospitals = len(hospitals)
-    total_beds = sum(h.get("beds_operational", 0) for h in hospitals)
+    total_beds = sum(h.get("beds_operational") or 0 for h in hospitals)
     total_doctors = len(doctors)
     
     total_ratio_sum = sum(m.get("doctor_bed_ratio", 0) for m in metrics)
@@ -846,11 +1798,11 @@ def get_hospital_locations() -> List[Dict[str, Any]]:
     return formatted_locations
 
 @app.get("/hospitals/locations", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_hospital_locations_endpoint():
+async def get_hospital_locations_endpoint():
     """
     Endpoint to get location and address details for all hospitals.
     """
-    return get_hospital_locations()
+    return await read_view("hospital-locations")
     
 # ----------------- New Combined Endpoint for Dashboard Cards ----------------- #
 def get_hospitals_for_dashboard() -> List[Dict[str, Any]]:
@@ -886,11 +1838,11 @@ def get_hospitals_for_dashboard() -> List[Dict[str, Any]]:
     return combined_data
 
 @app.get("/hospitals/dashboard", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_hospitals_for_dashboard_endpoint():
+async def get_hospitals_for_dashboard_endpoint():
     """
     Endpoint to get combined hospital name and address for the dashboard.
     """
-    return get_hospitals_for_dashboard()
+    return await read_view("hospitals-dashboard")
 
 # ----------------- New Endpoint for ISO Certification Status ----------------- #
 def get_iso_certification_status() -> List[Dict[str, Any]]:
@@ -911,17 +1863,9 @@ def get_iso_certification_status() -> List[Dict[str, Any]]:
             hospital_id = cert.get("hospital_id")
             hospital_name = hospital_name_map.get(hospital_id, "Unknown Hospital")
             
-            # Safely get the expiry date
+            # Expiry dates are parsed once in the expiry index; missing or malformed dates count as expired
             expiry_date_str = cert.get("expiry_date")
-            is_valid = False
-            
-            if expiry_date_str:
-                try:
-                    expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-                    is_valid = expiry_date >= today
-                except ValueError:
-                    # Handle malformed dates gracefully
-                    is_valid = False
+            is_valid = EXPIRY_INDEX.status("certification", cert.get("id"), today, expiry_date_str) == STATUS_VALID
 
             iso_cert_data.append({
                 "hospital_id": hospital_id,
@@ -936,133 +1880,91 @@ def get_iso_certification_status() -> List[Dict[str, Any]]:
     return iso_cert_data
 
 @app.get("/hospitals/iso-certification", response_model=List[Dict[str, Any]], tags=["Certifications"])
-def get_iso_certification_endpoint():
+async def get_iso_certification_endpoint():
     """
     Endpoint to get all hospitals with ISO 9001 certification status (Valid/Expired).
     """
-    return get_iso_certification_status()
+    return await read_view("iso-certification")
 
 
 # ----------------- New Endpoint for Critical Care Equipment Analysis ----------------- #
-def get_critical_care_equipment_analysis_data() -> Dict[str, Any]:
+def get_critical_care_equipment_analysis_data(response_format: str = INVENTORY_DENSE, state: Optional[str] = None,
+                                              city: Optional[str] = None) -> Dict[str, Any]:
     """
     Analyzes and returns the count of critical care equipment per hospital.
     """
-    try:
-        equipment_data = read_json("hospital_equipment.json")
-        hospitals_data = read_json("hospitals.json")
-    except HTTPException as e:
-        return {"data": [], "equipmentTypes": []}
-
-    # Map hospital IDs to names for the final output
-    hospital_name_map = {h.get("id"): h.get("name") for h in hospitals_data if h.get("id")}
-    
-    # Use a defaultdict to aggregate counts for each equipment type per hospital
-    equipment_by_hospital = defaultdict(lambda: defaultdict(int))
-    
-    # Collect all unique equipment names
-    all_critical_care_equipment_types = set()
-
-    # Filter for critical care equipment and aggregate data
-    for item in equipment_data:
-        if item.get("category") == "Critical Care":
-            hospital_id = item.get("hospital_id")
-            equipment_name = item.get("equipment_name")
-            quantity = item.get("quantity", 0)
-            
-            if hospital_id and equipment_name:
-                equipment_by_hospital[hospital_id][equipment_name] += quantity
-                all_critical_care_equipment_types.add(equipment_name)
+    # Only critical care columns, and only hospitals that list any of them, in order of first listing
+    selection = EQUIPMENT_INVENTORY.select(
+        hospitals_in_area(state, city), categories=["Critical Care"], all_columns=False,
+    )
+    rows = [r for r in range(len(selection.row_ids)) if selection.indptr[r + 1] > selection.indptr[r]]
+    rows.sort(key=lambda r: selection.first_seen[r])
 
     # Structure the data for the stacked bar chart
     structured_data = []
-    sorted_equipment_types = sorted(list(all_critical_care_equipment_types))
-
-    for hosp_id, equipment_counts in equipment_by_hospital.items():
-        hospital_name = hospital_name_map.get(hosp_id, "Unknown Hospital")
-        
-        # Create a dictionary for the equipment counts, including 0 for missing types
-        equipment_status = {
-            eq_type: equipment_counts.get(eq_type, 0)
-            for eq_type in sorted_equipment_types
-        }
-
+    for r in rows:
+        hosp_id = selection.row_ids[r]
         structured_data.append({
-            "name": hospital_name,
+            "name": HOSPITALS_MAP.get(hosp_id, {}).get("name", "Unknown Hospital"),
             "id": hosp_id,
-            **equipment_status # Flatten the equipment counts into the main dictionary
+            **selection.render(r, response_format)  # Flatten the equipment counts into the main dictionary
         })
 
     return {
         "data": structured_data,
-        "equipmentTypes": sorted_equipment_types
+        "equipmentTypes": selection.column_labels
     }
 
 
 @app.get("/equipment/critical-care", response_model=Dict[str, Any], tags=["Equipment"])
-def get_critical_care_equipment_endpoint():
+async def get_critical_care_equipment_endpoint(
+    response_format: str = Query(INVENTORY_DENSE, alias="format"),
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+):
     """
     Endpoint to get the distribution of critical care equipment across hospitals.
+    `format=sparse` omits zero cells; `state`/`city` filter hospitals.
     """
-    data = get_critical_care_equipment_analysis_data()
-    return data
+    parse_inventory_format(response_format)
+    if response_format == INVENTORY_DENSE and not state and not city:
+        return await read_view("critical-care-equipment")
+    return await run_coalesced(get_critical_care_equipment_analysis_data, response_format, state, city)
     
-def get_city_medical_coverage_data() -> List[Dict[str, Any]]:
+def get_city_medical_coverage_data(state: Optional[str] = None) -> List[Dict[str, Any]]:
     """
-    Reads hospital data from JSON files, joins the data by hospital ID,
-    and aggregates the number of hospitals and total registered beds per city.
+    Returns the number of hospitals and total registered beds per city from the hospital cube.
+    When a state is given, only that state's cells are rolled up.
     """
-    try:
-        hospitals = read_json("hospitals.json")
-        addresses = read_json("hospital_addresses.json")
-    except HTTPException:
-        return []
-
-    # Create a robust mapping from hospital_id to city_town using the first found address
-    hospital_city_map = {}
-    for address in addresses:
-        hospital_id = address.get('hospital_id')
-        city_town = address.get('city_town')
-        
-        if hospital_id and city_town and hospital_id not in hospital_city_map:
-            hospital_city_map[hospital_id] = city_town
-
-    # Aggregate hospital count and bed capacity by city
-    city_coverage = defaultdict(lambda: {
-        'city': '', 
-        'hospital_count': 0, 
-        'total_beds': 0
-    })
-
-    for hospital in hospitals:
-        hospital_id = hospital.get('id')
-        beds_registered = hospital.get('beds_registered', 0)
-
-        city = hospital_city_map.get(hospital_id)
-        if city:
-            city_coverage[city]['city'] = city
-            city_coverage[city]['hospital_count'] += 1
-            city_coverage[city]['total_beds'] += beds_registered
-
-    # Convert the dictionary values to a list for the final JSON response
-    return list(city_coverage.values())
+    filters = {"state": [state.strip()]} if state else None
+    return [
+        {"city": row["city"], "hospital_count": row["hospitals"], "total_beds": row["beds_registered"]}
+        for row in HOSPITAL_CUBE.query(["city"], ["hospitals", "beds_registered"], filters)
+        if row["city"]
+    ]
 
 @app.get("/city-wise-medical-coverage", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_city_wise_medical_coverage_endpoint():
+async def get_city_wise_medical_coverage_endpoint(state: Optional[str] = None):
     """
     Returns the number of hospitals and total bed capacity, grouped by city.
+    Optionally scoped to a single state.
     """
-    return get_city_medical_coverage_data()
+    return get_city_medical_coverage_data(state)
 
 
 # ----------------- New Endpoint for Hospitals by City ----------------- #
-def get_hospitals_by_city() -> Dict[str, List[Dict[str, Any]]]:
+def get_hospitals_by_city(state: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
     """
     Reads hospital and address data, then groups hospitals by city.
+    When a state is given, only that state's partition is read.
     """
     try:
-        hospitals_data = read_json("hospitals.json")
-        addresses_data = read_json("hospital_addresses.json")
+        if state:
+            partition = get_state_partition(state)
+            hospitals_data, addresses_data = partition["hospitals"], partition["addresses"]
+        else:
+            hospitals_data = read_json("hospitals.json")
+            addresses_data = read_json("hospital_addresses.json")
     except HTTPException:
         return {}
 
@@ -1092,22 +1994,30 @@ def get_hospitals_by_city() -> Dict[str, List[Dict[str, Any]]]:
 
 
 @app.get("/hospitals/by-city", response_model=Dict[str, List[Dict[str, Any]]], tags=["Hospitals"])
-def get_hospitals_by_city_endpoint():
+async def get_hospitals_by_city_endpoint(state: Optional[str] = None):
     """
     Returns a dictionary of cities, with each city containing a list of its hospitals.
+    Optionally scoped to a single state.
     """
-    return get_hospitals_by_city()
+    return await run_coalesced(get_hospitals_by_city, state)
 
 @app.get("/api/wards-rooms")
-def get_wards_rooms():
+def get_wards_rooms(state: Optional[str] = None):
     """
     Reads the wards_rooms.json, hospitals.json, and hospital_addresses.json files,
     combining the data to include hospital names and addresses in the response.
+    When a state is given, only that state's partition is read.
     """
-    # Use the existing read_json utility for consistent file handling and error management
-    wards_data = read_json("wards_rooms.json")
-    hospitals_data = read_json("hospitals.json")
-    addresses_data = read_json("hospital_addresses.json")
+    if state:
+        partition = get_state_partition(state)
+        wards_data = partition["wards_rooms"]
+        hospitals_data = partition["hospitals"]
+        addresses_data = partition["addresses"]
+    else:
+        # Use the existing read_json utility for consistent file handling and error management
+        wards_data = read_json("wards_rooms.json")
+        hospitals_data = read_json("hospitals.json")
+        addresses_data = read_json("hospital_addresses.json")
 
     # Create dictionaries for efficient lookup
     hospitals_dict = {h['id']: h for h in hospitals_data}
@@ -1123,19 +2033,35 @@ def get_wards_rooms():
             hospital_details = hospitals_dict[hospital_id]
             address_details = addresses_dict[hospital_id]
             
-            ward['hospital_name'] = hospital_details.get('name', 'N/A')
-            ward['hospital_address'] = {
-                "street": address_details.get("street", "N/A"),
-                "city": address_details.get("city_town", "N/A"),
-                "state": address_details.get("state", "N/A"),
-                "pin_code": address_details.get("pin_code", "N/A")
-            }
-            enriched_data.append(ward)
+            # Copy the ward so the cached file contents are never mutated
+            enriched_data.append({
+                **ward,
+                'hospital_name': hospital_details.get('name', 'N/A'),
+                'hospital_address': {
+                    "street": address_details.get("street", "N/A"),
+                    "city": address_details.get("city_town", "N/A"),
+                    "state": address_details.get("state", "N/A"),
+                    "pin_code": address_details.get("pin_code", "N/A")
+                },
+            })
             
     return enriched_data
 
+@app.get("/api/regions", tags=["Regions"])
+async def get_regions():
+    """
+    Lists the states hospitals are partitioned by, with resident partition statistics.
+    """
+    return {
+        "states": [
+            {"state": state, "hospital_count": len(hospital_ids)}
+            for state, hospital_ids in sorted(STATE_DIRECTORY.items())
+        ],
+        "partitions": REGION_PARTITIONS.stats(),
+    }
+
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Welcome to the Hospital Data API!"}
 
 # ----------------- New Service and Endpoint for Equipment Maintenance ----------------- #
@@ -1204,319 +2130,1453 @@ def get_equipment_maintenance_data():
     return processed_equipment
 
 @app.get("/equipment/maintenance-schedule", response_model=List[Dict[str, Any]], tags=["Equipment"])
-def get_equipment_maintenance_schedule_endpoint():
+async def get_equipment_maintenance_schedule_endpoint():
     """
     API endpoint to retrieve equipment maintenance schedules with
     calculated next due dates.
     """
-    data = get_equipment_maintenance_data()
+    data = await read_view("maintenance-schedule")
     return data
 
 @app.get("/hospitals", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_all_hospitals():
-    return read_json("hospitals.json")
+async def get_all_hospitals():
+    return await read_json_async("hospitals.json")
 
 # ----------------- New Endpoint for Hospital Risk Profile Dashboard ----------------- #
 
+def risk_contributions(hospital_id: int) -> Optional[Dict[str, float]]:
+    """The weighted features of one hospital's score on the "risk" index, or None if it is not scored."""
+    result = SCORING.score("risk")
+    try:
+        position = result["hospital_ids"].index(hospital_id)
+    except ValueError:
+        return None
+    return dict(zip(result["weights"], result["contributions"][position].tolist()))
+
 def get_hospital_risk_profile_data(hospital_id: int) -> Dict[str, Any]:
     """
-    Analyzes all relevant data to calculate a comprehensive risk profile for a single hospital.
-    
-    This function has been revised to be more robust against missing data and
-    to align the output structure with the frontend's expectations.
+    Breaks a hospital's score on the "risk" index down into its staffing, certification and
+    document parts, with the certifications and unverified documents behind them.
     """
-    try:
-        # Load all necessary data using the existing utility function
-        hospitals_data = read_json("hospitals.json")
-        certifications_data = read_json("hospital_certifications.json")
-        metrics_data = read_json("hospital_metrics.json")
-        documents_data = read_json("document_uploads.json")
-        addresses_data = read_json("hospital_addresses.json")
-        
-        # Find the specific hospital and its related data, using robust defaults
-        hospital = next((h for h in hospitals_data if h.get('id') == hospital_id), None)
-        if not hospital:
-            raise HTTPException(status_code=404, detail="Hospital not found.")
-            
-        address = next((a for a in addresses_data if a.get('hospital_id') == hospital_id and a.get('address_type') == 'Primary'), {})
-        certifications = [c for c in certifications_data if c.get('hospital_id') == hospital_id]
-        metrics = next((m for m in metrics_data if m.get('hospital_id') == hospital_id), {})
-        documents = [d for d in documents_data if d.get('entity_id') == hospital_id and d.get('entity_type') == 'hospital']
-        
-        # 1. Calculate Metrics Risk Score (based on staffing and operational metrics)
-        metrics_risk_score = 0
-        metrics_sub_score = 0
-        
-        # Define and calculate individual sub-scores
-        doctor_bed_ratio_score = (1 - metrics.get('doctor_bed_ratio', 1)) * 5
-        nurse_bed_ratio_score = (1 - metrics.get('nurse_bed_ratio', 1)) * 5
-        icu_doctor_bed_ratio_score = (1 - metrics.get('icu_doctor_bed_ratio', 1)) * 5
-        icu_nurse_bed_ratio_score = (1 - metrics.get('icu_nurse_bed_ratio', 1)) * 5
-        
-        metrics_risk_score = doctor_bed_ratio_score + nurse_bed_ratio_score + icu_doctor_bed_ratio_score + icu_nurse_bed_ratio_score
-        metrics_sub_score = metrics_risk_score
-        
-        # 2. Calculate Certification Risk Score
-        certification_risk_score = 0
-        today = date.today()
-        cert_details = []
-        for cert in certifications:
-            is_expired = False
-            expiry_date_str = cert.get('expiry_date')
-            if expiry_date_str:
-                try:
-                    expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-                    if expiry_date < today:
-                        is_expired = True
-                        certification_risk_score += 10 # High penalty for expired cert
-                except ValueError:
-                    certification_risk_score += 5 # Lower penalty for malformed date
-            
-            # Prepare status for frontend
-            status = "Expired" if is_expired else "Valid"
-            cert_details.append({
-                "id": cert.get("id"),
-                "certification_type": cert.get("certification_type"),
-                "status": status
-            })
+    hospital = HOSPITALS_MAP.get(hospital_id)
+    risk = risk_contributions(hospital_id)
+    if hospital is None or risk is None:
+        raise HTTPException(status_code=404, detail="Hospital not found.")
+    address = PRIMARY_ADDRESSES.get(hospital_id, {})
+    metrics_record = METRICS_BY_HOSPITAL.get(hospital_id)
+    metrics = METRICS[metrics_record.row] if metrics_record else {}
+
+    # 1. Metrics risk score (staffing shortfalls)
+    doctor_bed_ratio_score = risk["doctor_bed_ratio"]
+    nurse_bed_ratio_score = risk["nurse_bed_ratio"]
+    icu_doctor_bed_ratio_score = risk["icu_doctor_bed_ratio"]
+    icu_nurse_bed_ratio_score = risk["icu_nurse_bed_ratio"]
+    metrics_risk_score = doctor_bed_ratio_score + nurse_bed_ratio_score + icu_doctor_bed_ratio_score + icu_nurse_bed_ratio_score
+
+    # 2. Certification risk score, and each certification's status for the frontend
+    certification_risk_score = risk["expired_certifications"] + risk["malformed_certification_dates"]
+    today = date.today()
+    cert_details = []
+    for row in CERTIFICATION_ROWS.get(hospital_id, []):
+        cert = CERTIFICATIONS[row]
+        expiry_status = EXPIRY_INDEX.status("certification", cert.get("id"), today, cert.get("expiry_date"))
+        cert_details.append({
+            "id": cert.get("id"),
+            "certification_type": cert.get("certification_type"),
+            "status": "Expired" if expiry_status == STATUS_EXPIRED else "Valid",
+        })
 
-        # 3. Calculate Document Verification Risk Score
-        document_risk_score = 0
-        unverified_documents = []
-        for doc in documents:
-            if not doc.get('is_verified', True):
-                document_risk_score += 5  # Add a penalty for each unverified document
-                unverified_documents.append(doc)
-        
-        # 4. Total Risk Score
-        total_risk_score = metrics_risk_score + certification_risk_score + document_risk_score
-
-        # 5. Assign Risk Category
-        risk_category = "Low"
-        if total_risk_score >= 20:
-            risk_category = "High"
-        elif total_risk_score >= 10:
-            risk_category = "Medium"
-        
-        # Final response data, structured for the frontend
-        return {
-            "hospital_id": hospital_id,
-            "name": hospital.get('name'),
-            "address": f"{address.get('street', 'N/A')}, {address.get('area_locality', 'N/A')}, {address.get('city_town', 'N/A')}, {address.get('state', 'N/A')} - {address.get('pin_code', 'N/A')}",
-            "total_risk_score": round(total_risk_score, 2),
-            "risk_category": risk_category,
-            "metrics_risk_score": round(metrics_risk_score, 2),
-            "metrics_sub_score": round(metrics_sub_score, 2),
-            "certification_risk_score": round(certification_risk_score, 2),
-            "document_risk_score": document_risk_score,
-            "metrics": {
-                "doctor_bed_ratio": metrics.get('doctor_bed_ratio'),
-                "nurse_bed_ratio": metrics.get('nurse_bed_ratio'),
-                "icu_doctor_bed_ratio": metrics.get('icu_doctor_bed_ratio'),
-                "icu_nurse_bed_ratio": metrics.get('icu_nurse_bed_ratio'),
-                "doctor_bed_ratio_score": round(doctor_bed_ratio_score, 2),
-                "nurse_bed_ratio_score": round(nurse_bed_ratio_score, 2),
-                "icu_doctor_bed_ratio_score": round(icu_doctor_bed_ratio_score, 2),
-                "icu_nurse_bed_ratio_score": round(icu_nurse_bed_ratio_score, 2),
-            },
-            "certifications": cert_details,
-            "unverified_documents": unverified_documents
-        }
+    # 3. Document verification risk score
+    document_risk_score = int(risk["unverified_documents"])
+    unverified_documents = [
+        doc for doc in DOCUMENT_UPLOADS.select("entity_id", [hospital_id])
+        if doc.get("entity_type") == "hospital" and not doc.get("is_verified", True)
+    ]
 
-    except HTTPException:
-        # Re-raise explicit HTTPException
-        raise
-    except Exception as e:
-        # Catch all other unhandled exceptions and return a clean server error
-        print(f"An unhandled error occurred in get_hospital_risk_profile_data: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error. Check logs for details.")
+    total_risk_score = round(metrics_risk_score + certification_risk_score + document_risk_score, 2)
+    return {
+        "hospital_id": hospital_id,
+        "name": hospital.get('name'),
+        "address": f"{address.get('street', 'N/A')}, {address.get('area_locality', 'N/A')}, {address.get('city_town', 'N/A')}, {address.get('state', 'N/A')} - {address.get('pin_code', 'N/A')}",
+        "total_risk_score": total_risk_score,
+        "risk_category": SCORING.index("risk").band(total_risk_score),
+        "metrics_risk_score": round(metrics_risk_score, 2),
+        "metrics_sub_score": round(metrics_risk_score, 2),
+        "certification_risk_score": round(certification_risk_score, 2),
+        "document_risk_score": document_risk_score,
+        "metrics": {
+            "doctor_bed_ratio": metrics.get('doctor_bed_ratio'),
+            "nurse_bed_ratio": metrics.get('nurse_bed_ratio'),
+            "icu_doctor_bed_ratio": metrics.get('icu_doctor_bed_ratio'),
+            "icu_nurse_bed_ratio": metrics.get('icu_nurse_bed_ratio'),
+            "doctor_bed_ratio_score": round(doctor_bed_ratio_score, 2),
+            "nurse_bed_ratio_score": round(nurse_bed_ratio_score, 2),
+            "icu_doctor_bed_ratio_score": round(icu_doctor_bed_ratio_score, 2),
+            "icu_nurse_bed_ratio_score": round(icu_nurse_bed_ratio_score, 2),
+        },
+        "certifications": cert_details,
+        "unverified_documents": unverified_documents,
+    }
 
 @app.get("/api/hospitals/risk-profile/{hospital_id}", response_model=Dict[str, Any], tags=["Hospitals"])
-def get_hospital_risk_profile_endpoint(hospital_id: int):
+async def get_hospital_risk_profile_endpoint(hospital_id: int):
     """
     Endpoint to retrieve a comprehensive risk profile for a selected hospital.
     """
-    return get_hospital_risk_profile_data(hospital_id)
+    return await run_coalesced(get_hospital_risk_profile_data, hospital_id)
 
 # ----------------- New Function and Endpoint for List View ----------------- #
 
 def get_all_hospitals_data() -> List[Dict[str, Any]]:
     """
-    Retrieves a simplified list of all hospitals with their primary risk scores
+    Retrieves a simplified list of all hospitals with their score and band on the "risk" index
     for the dashboard overview.
     """
+    index, result, scores, _ = rank_score_index("risk")
+    all_hospitals_summary = []
+    for hospital_id, total_risk_score in zip(result["hospital_ids"], scores):
+        address = PRIMARY_ADDRESSES.get(hospital_id, {})
+        all_hospitals_summary.append({
+            "id": hospital_id,
+            "name": HOSPITALS_MAP.get(hospital_id, {}).get('name'),
+            "address": f"{address.get('street', 'N/A')}, {address.get('area_locality', 'N/A')}, {address.get('city_town', 'N/A')}",
+            "total_risk_score": total_risk_score,
+            "risk_category": index.band(total_risk_score),
+        })
+    return all_hospitals_summary
+
+
+@app.get("/api/hospitals/list", response_model=List[Dict[str, Any]], tags=["Hospitals"])
+async def get_all_hospitals_endpoint():
+    """
+    Endpoint to retrieve a simplified list of all hospitals for the dashboard overview.
+    """
+    return await read_view("hospitals-list")
+
+# ----------------- Surgical Capacity Engine ----------------- #
+# Weight of each tallied component in the surgical capacity score
+SURGICAL_SCORE_WEIGHTS = {
+    "surgical_equipment_count": 1,
+    "surgical_specialties_count": 1,
+    "surgeon_count": 1,
+    "major_ots": 2,
+    "minor_ots": 1,
+    "advanced_ot_features": 1,
+}
+
+# Operation theater capabilities that count towards advanced_ot_features
+OT_CAPABILITY_FIELDS = [
+    "laminar_air_flow",
+    "c_arm_available",
+    "laparoscopic_equipment",
+    "arthroscopy",
+    "computer_navigation",
+    "harmonic_scalpel",
+    "ligasure",
+]
+
+def count_ot_features() -> Dict[int, Dict[str, int]]:
+    """Active operation theaters with each advanced capability, per hospital, read column by column."""
+    counts = {}
+    ot_columns = [OPERATION_THEATERS.column(field) for field in OT_CAPABILITY_FIELDS]
+    for hospital_id, is_active, *features in zip(
+        OPERATION_THEATERS.column('hospital_id'), OPERATION_THEATERS.column('is_active'), *ot_columns,
+    ):
+        if is_active is False:
+            continue
+        data = counts.setdefault(hospital_id, {field: 0 for field in OT_CAPABILITY_FIELDS})
+        for field, present in zip(OT_CAPABILITY_FIELDS, features):
+            if present:
+                data[field] += 1
+    return counts
+
+# Specialties and operation theaters are read-only, so these are computed once
+SURGICAL_SPECIALTY_IDS = {  # Available surgical specialties; their doctors count as surgeons
+    specialty.id for specialty in SPECIALTY_RECORDS if specialty.specialty_category == 'Surgery' and specialty.is_available
+}
+OT_FEATURE_COUNTS = count_ot_features()
+
+def get_surgical_capacity(city: Optional[str] = None, state: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Returns the surgical capacity of hospitals with a primary address, from the
+    "surgical-capacity" score index, optionally filtered by city and/or state (case-insensitive).
+
+    Each entry carries the equipment, specialty, surgeon and operation theater tallies,
+    the weighted score components and the total surgical_capacity_score.
+    """
+    result = SCORING.score("surgical-capacity")
+    city_key = city.strip().casefold() if city else None
+    state_key = state.strip().casefold() if state else None
+    capacity = []
+    for i, hospital_id in enumerate(result["hospital_ids"]):
+        address_info = PRIMARY_ADDRESSES.get(hospital_id)
+        if address_info is None:
+            continue
+        if city_key is not None and (address_info.get('city_town') or '').casefold() != city_key:
+            continue
+        if state_key is not None and (address_info.get('state') or '').casefold() != state_key:
+            continue
+        tallies = dict(zip(result["weights"], (int(value) for value in result["raw"][i].tolist())))
+        capacity.append({
+            'hospital_id': hospital_id,
+            'surgical_equipment_count': tallies['surgical_equipment_count'],
+            'surgical_specialties_count': tallies['surgical_specialties_count'],
+            'surgeon_count': tallies['surgeon_count'],
+            'major_ots': tallies['major_ots'],
+            'minor_ots': tallies['minor_ots'],
+            'ot_features': dict(OT_FEATURE_COUNTS.get(hospital_id) or {field: 0 for field in OT_CAPABILITY_FIELDS}),
+            'advanced_ot_features': tallies['advanced_ot_features'],
+            'hospital_name': HOSPITALS_MAP.get(hospital_id, {}).get('name'),
+            'city_town': address_info.get('city_town'),
+            'state': address_info.get('state'),
+            'score_components': dict(zip(result["weights"], (int(value) for value in result["contributions"][i].tolist()))),
+            'surgical_capacity_score': int(result["scores"][i]),
+        })
+    return capacity
+
+@app.get('/api/hospitals/surgical-capacity', tags=["Hospitals"])
+async def surgical_capacity_endpoint(city: Optional[str] = None, state: Optional[str] = None):
+    return await run_coalesced(get_surgical_capacity, city, state)
+
+# ----------------- Diagnostic Capacity Planner ----------------- #
+# Dimensions diagnostic throughput can be grouped and filtered by
+DIAGNOSTIC_DIMENSIONS = ("state", "district", "city", "service_category", "service_name")
+
+def build_diagnostic_services() -> List[Dict[str, Any]]:
+    """Joins every active diagnostic service with its hospital's home address."""
+    services = []
+    for row in DIAGNOSTIC_SERVICES:
+        if row.get("is_active") is False:
+            continue
+        hospital_id = row.get("hospital_id")
+        if hospital_id not in HOSPITALS_MAP:
+            continue
+        address = HOME_ADDRESSES.get(hospital_id, {})
+        services.append({
+            "service_id": row.get("id"),
+            "hospital_id": hospital_id,
+            "hospital_name": HOSPITALS_MAP[hospital_id].get("name"),
+            "state": address.get("state"),
+            "district": address.get("district"),
+            "city": address.get("city_town"),
+            "service_category": row.get("service_category"),
+            "service_name": row.get("service_name"),
+            "service_type": row.get("service_type"),
+            "operational_hours": row.get("operational_hours"),
+            "capacity_per_day": row.get("capacity_per_day") or 0,
+        })
+    return services
+
+def build_diagnostic_rollups(services: List[Dict[str, Any]]) -> Dict[Tuple[str, ...], Dict[Tuple, Dict[str, Any]]]:
+    """
+    Precomputes daily capacity for every combination of DIAGNOSTIC_DIMENSIONS.
+    Keys are the grouping (a sorted tuple of dimension names) and then the tuple of dimension values.
+    """
+    groupings = [
+        grouping
+        for size in range(len(DIAGNOSTIC_DIMENSIONS) + 1)
+        for grouping in combinations(DIAGNOSTIC_DIMENSIONS, size)
+    ]
+    rollups = {grouping: {} for grouping in groupings}
+    for service in services:
+        for grouping in groupings:
+            key = tuple(service[dim] for dim in grouping)
+            cell = rollups[grouping].get(key)
+            if cell is None:
+                cell = rollups[grouping][key] = {"capacity_per_day": 0, "service_count": 0, "hospitals": set()}
+            cell["capacity_per_day"] += service["capacity_per_day"]
+            cell["service_count"] += 1
+            cell["hospitals"].add(service["hospital_id"])
+
+    # Distinct hospitals are only needed while building; keep the counts
+    for cells in rollups.values():
+        for cell in cells.values():
+            cell["hospital_count"] = len(cell.pop("hospitals"))
+    return rollups
+
+def index_diagnostic_services_by_name(services: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    by_name = defaultdict(list)
+    for service in services:
+        by_name[(service["service_name"] or "").casefold()].append(service)
+    return by_name
+
+def index_diagnostic_services_by_hospital(services: List[Dict[str, Any]]) -> Dict[int, List[Dict[str, Any]]]:
+    by_hospital = defaultdict(list)
+    for service in services:
+        by_hospital[service["hospital_id"]].append(service)
+    return by_hospital
+
+# Snapshot rows per hospital, whether or not they made it into the joined list
+DIAGNOSTIC_ROWS = index_rows_by_hospital(DIAGNOSTIC_SERVICES)
+DIAGNOSTIC_SERVICE_LIST = build_diagnostic_services()
+DIAGNOSTIC_ROLLUPS = build_diagnostic_rollups(DIAGNOSTIC_SERVICE_LIST)
+DIAGNOSTIC_SERVICES_BY_NAME = index_diagnostic_services_by_name(DIAGNOSTIC_SERVICE_LIST)
+DIAGNOSTIC_SERVICES_BY_HOSPITAL = index_diagnostic_services_by_hospital(DIAGNOSTIC_SERVICE_LIST)
+
+def parse_diagnostic_filters(**filters: Optional[str]) -> Dict[str, str]:
+    """Keeps only the filters that were given, matched case-insensitively."""
+    return {dim: value.strip().casefold() for dim, value in filters.items() if value}
+
+def _matches(values: Dict[str, Any], filters: Dict[str, str]) -> bool:
+    return all((values.get(dim) or "").casefold() == value for dim, value in filters.items())
+
+def get_diagnostic_capacity_rollup(group_by: List[str], filters: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Answers a capacity query from the precomputed rollup covering the group-by and filter dimensions."""
+    unknown = [dim for dim in group_by if dim not in DIAGNOSTIC_DIMENSIONS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown group_by dimension(s): {', '.join(unknown)}")
+
+    needed = set(group_by) | set(filters)
+    grouping = tuple(dim for dim in DIAGNOSTIC_DIMENSIONS if dim in needed)
+    merged = {}
+    for key, cell in DIAGNOSTIC_ROLLUPS[grouping].items():
+        values = dict(zip(grouping, key))
+        if not _matches(values, filters):
+            continue
+        out_key = tuple(values[dim] for dim in group_by)
+        row = merged.get(out_key)
+        if row is None:
+            # Distinct hospital counts are exact while a row is backed by a single cell
+            row = merged[out_key] = {
+                **{dim: values[dim] for dim in group_by},
+                "capacity_per_day": 0,
+                "service_count": 0,
+                "hospital_count": cell["hospital_count"],
+            }
+        else:
+            row["hospital_count"] = None
+        row["capacity_per_day"] += cell["capacity_per_day"]
+        row["service_count"] += cell["service_count"]
+
+    return sorted(merged.values(), key=lambda r: r["capacity_per_day"], reverse=True)
+
+def rank_diagnostic_capacity(service_name: Optional[str], filters: Dict[str, str],
+                             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Ranks hospitals by the daily capacity of their matching diagnostic services."""
+    candidates = DIAGNOSTIC_SERVICE_LIST
+    if service_name:
+        candidates = DIAGNOSTIC_SERVICES_BY_NAME.get(service_name.strip().casefold(), [])
+
+    per_hospital = {}
+    for service in candidates:
+        if not _matches(service, filters):
+            continue
+        entry = per_hospital.get(service["hospital_id"])
+        if entry is None:
+            entry = per_hospital[service["hospital_id"]] = {
+                "hospital_id": service["hospital_id"],
+                "hospital_name": service["hospital_name"],
+                "city": service["city"],
+                "district": service["district"],
+                "state": service["state"],
+                "capacity_per_day": 0,
+                "services": [],
+            }
+        entry["capacity_per_day"] += service["capacity_per_day"]
+        entry["services"].append({
+            "service_name": service["service_name"],
+            "service_category": service["service_category"],
+            "operational_hours": service["operational_hours"],
+            "capacity_per_day": service["capacity_per_day"],
+        })
+
+    ranked = sorted(per_hospital.values(), key=lambda e: e["capacity_per_day"], reverse=True)
+    return ranked[:limit] if limit else ranked
+
+@app.get("/diagnostics/capacity", tags=["Diagnostics"])
+async def get_diagnostic_capacity_endpoint(
+    group_by: str = "state",
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    city: Optional[str] = None,
+    service_category: Optional[str] = None,
+    service_name: Optional[str] = None,
+):
+    """
+    Returns total diagnostic capacity per day grouped by any of state, district, city,
+    service_category and service_name (comma separated), with optional filters.
+    For example `?group_by=service_name&state=Maharashtra&service_name=MRI` gives the MRI slots per day in a state.
+    """
+    dimensions = [dim.strip() for dim in group_by.split(",") if dim.strip()]
+    filters = parse_diagnostic_filters(
+        state=state, district=district, city=city,
+        service_category=service_category, service_name=service_name,
+    )
+    return {
+        "group_by": dimensions,
+        "filters": filters,
+        "data": get_diagnostic_capacity_rollup(dimensions, filters),
+    }
+
+@app.get("/diagnostics/capacity/hospitals", tags=["Diagnostics"])
+async def get_diagnostic_hospital_capacity_endpoint(
+    service_name: Optional[str] = None,
+    service_category: Optional[str] = None,
+    state: Optional[str] = None,
+    district: Optional[str] = None,
+    city: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+):
+    """
+    Ranks hospitals by daily diagnostic capacity, optionally for one service or category
+    within a region, for routing diagnostic pre-authorizations.
+    """
+    filters = parse_diagnostic_filters(state=state, district=district, city=city, service_category=service_category)
+    return await run_blocking(rank_diagnostic_capacity, service_name, filters, limit)
+
+# ----------------- Composite Score Indices ----------------- #
+# Each index is declared as weighted, normalized per-hospital features over dataset columns;
+# SCORING evaluates a whole index across all hospitals with grouped array operations.
+def flag(values: np.ndarray) -> np.ndarray:
+    """True where a bool column is true; nulls are false."""
+    return np.nan_to_num(values) != 0
+
+def is_active(col) -> np.ndarray:
+    """Rows not marked inactive; a null is_active counts as active."""
+    return col("is_active") != 0
+
+def certification_status_is(status: str):
+    """Row filter for certifications whose expiry status today is `status`."""
+    def where(col):
+        today = date.today()
+        return np.array([
+            EXPIRY_INDEX.status("certification", cert_id, today, expiry) == status
+            for cert_id, expiry in zip(col("id"), col("expiry_date"))
+        ], dtype=bool)
+    return where
+
+def surgeon_rows(col) -> np.ndarray:
+    """Doctors whose specialty is an available surgical specialty."""
+    return np.isin(col("specialty_id"), list(SURGICAL_SPECIALTY_IDS))
+
+def metric_shortfall(column: str) -> Feature:
+    # Missing metrics count as a ratio of 1, i.e. no shortfall
+    return Feature(column, Aggregate("hospital_metrics", column, agg="first", fill=1.0, default=1.0), 5,
+                   NORMALIZE_COMPLEMENT, f"1 - {column}")
+
+def it_system(system_type: str, weight: float) -> Feature:
+    return Feature(
+        system_type,
+        Aggregate("hospital_it_systems", agg="count",
+                  where=lambda col: (col("system_type") == system_type) & flag(col("is_available")) & is_active(col)),
+        weight, NORMALIZE_PRESENCE, f"{system_type} system in use",
+    )
+
+def operational_infrastructure(category: str, weight: float) -> Feature:
+    return Feature(
+        category,
+        Aggregate("hospital_infrastructure", agg="count",
+                  where=lambda col: (col("category") == category) & (col("operational_status") == "Operational")),
+        weight, NORMALIZE_PRESENCE, f"Operational {category} infrastructure",
+    )
+
+SCORING = ScoringPipeline(
+    hospital_ids=lambda: [hospital_id for hospital_id in HOSPITALS.column("id") if hospital_id is not None],
+    table_of=lambda name: MUTABLE_TABLES.get(name) or SNAPSHOT.table(name),
+    version_of=dataset_version,
+)
+SCORING.register(ScoreIndex(
+    "quality",
+    [
+        Feature("certifications", Aggregate("hospital_certifications", agg="count"),
+                QUALITY_WEIGHTS["certifications"], NORMALIZE_MAX, "Certifications held"),
+        Feature("doctorRatio", Aggregate("hospital_metrics", "doctor_bed_ratio", agg="first"),
+                QUALITY_WEIGHTS["doctorRatio"], NORMALIZE_MAX, "Doctor to bed ratio"),
+        Feature("nurseRatio", Aggregate("hospital_metrics", "nurse_bed_ratio", agg="first"),
+                QUALITY_WEIGHTS["nurseRatio"], NORMALIZE_MAX, "Nurse to bed ratio"),
+    ],
+    depends_on=["hospitals"],
+    description="0-100 quality score of hospitals with metrics (as /hospitals/quality-scores)",
+    require=Aggregate("hospital_metrics", agg="count"),
+    digits=0,
+))
+SCORING.register(ScoreIndex(
+    "risk",
+    [
+        metric_shortfall("doctor_bed_ratio"),
+        metric_shortfall("nurse_bed_ratio"),
+        metric_shortfall("icu_doctor_bed_ratio"),
+        metric_shortfall("icu_nurse_bed_ratio"),
+        Feature("expired_certifications",
+                Aggregate("hospital_certifications", agg="count", where=certification_status_is(STATUS_EXPIRED)),
+                10, description="Certifications past their expiry date"),
+        Feature("malformed_certification_dates",
+                Aggregate("hospital_certifications", agg="count", where=certification_status_is(STATUS_MALFORMED)),
+                5, description="Certifications with an unreadable expiry date"),
+        Feature("unverified_documents",
+                Aggregate("document_uploads", agg="count", key="entity_id",
+                          where=lambda col: (col("entity_type") == "hospital") & ~flag(col("is_verified"))),
+                5, description="Hospital documents not yet verified"),
+    ],
+    depends_on=["hospitals", "document_uploads"],
+    description="Staffing, certification and document risk (as /api/hospitals/list); higher is riskier",
+    bands=[(20, "High"), (10, "Medium"), (float("-inf"), "Low")],
+    epoch=lambda: certification_epoch(date.today()),
+))
+SCORING.register(ScoreIndex(
+    "surgical-capacity",
+    [
+        Feature("surgical_equipment_count",
+                Aggregate("hospital_equipment", "quantity", fill=1, where=lambda col: col("category") == "Surgery"),
+                SURGICAL_SCORE_WEIGHTS["surgical_equipment_count"], description="Surgical equipment units"),
+        Feature("surgical_specialties_count",
+                Aggregate("medical_specialties", agg="count", where=lambda col: col("specialty_category") == "Surgery"),
+                SURGICAL_SCORE_WEIGHTS["surgical_specialties_count"], description="Surgical specialties"),
+        Feature("surgeon_count", Aggregate("doctors", agg="count", where=surgeon_rows),
+                SURGICAL_SCORE_WEIGHTS["surgeon_count"], description="Doctors in available surgical specialties"),
+        Feature("major_ots", Aggregate("operation_theaters", "major_ots", where=is_active),
+                SURGICAL_SCORE_WEIGHTS["major_ots"], description="Major operation theaters"),
+        Feature("minor_ots", Aggregate("operation_theaters", "minor_ots", where=is_active),
+                SURGICAL_SCORE_WEIGHTS["minor_ots"], description="Minor operation theaters"),
+        Feature("advanced_ot_features",
+                Aggregate("operation_theaters", lambda col: sum(flag(col(field)).astype(float) for field in OT_CAPABILITY_FIELDS),
+                          where=is_active),
+                SURGICAL_SCORE_WEIGHTS["advanced_ot_features"], description="Advanced capabilities across active OTs"),
+    ],
+    depends_on=["hospitals", "doctors", "hospital_equipment"],
+    description="Weighted surgical tallies (as /api/hospitals/surgical-capacity)",
+))
+SCORING.register(ScoreIndex(
+    "digital-maturity",
+    [it_system("HMS", 30), it_system("LIS", 25), it_system("RIS", 20), it_system("PACS", 25)],
+    depends_on=["hospitals"],
+    description="0-100 score for the core clinical IT systems in use",
+    bands=[(75, "Advanced"), (40, "Developing"), (float("-inf"), "Basic")],
+))
+SCORING.register(ScoreIndex(
+    "infrastructure-readiness",
+    [
+        Feature("operational_share",
+                Aggregate("hospital_infrastructure", lambda col: col("operational_status") == "Operational", agg="mean"),
+                40, description="Share of infrastructure items operational (not under maintenance)"),
+        operational_infrastructure("Power", 15),
+        operational_infrastructure("Medical Gas", 15),
+        operational_infrastructure("Fire Safety", 15),
+        operational_infrastructure("Water", 15),
+    ],
+    depends_on=["hospitals"],
+    description="0-100 score for operational power, medical gas, fire safety and water infrastructure",
+    bands=[(80, "Ready"), (50, "Partial"), (float("-inf"), "At Risk")],
+))
+
+def parse_weight_overrides(value: Optional[str]) -> Dict[str, float]:
+    """Parses "feature:weight,feature:weight" what-if weights."""
+    overrides = {}
+    for item in _split_labels(value) or []:
+        name, sep, weight = item.partition(":")
+        try:
+            overrides[name.strip()] = float(weight)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="weights must look like 'feature:weight,feature:weight'")
+        if not sep:
+            raise HTTPException(status_code=400, detail="weights must look like 'feature:weight,feature:weight'")
+        if not math.isfinite(overrides[name.strip()]):
+            raise HTTPException(status_code=400, detail=f"Weight of {name.strip()} must be a finite number")
+    return overrides
+
+def rank_score_index(name: str, weights: Optional[Tuple[Tuple[str, float], ...]] = None):
+    """
+    Scores every hospital of an index. Returns the index, the SCORING.score() result, the scores
+    rounded to the index's digits, and hospital positions best first (ties keep hospital order).
+    """
+    if name not in SCORING:
+        raise HTTPException(status_code=404, detail=f"Unknown score index: {name}")
+    index = SCORING.index(name)
     try:
-        hospitals_data = read_json("hospitals.json")
-        certifications_data = read_json("hospital_certifications.json")
-        metrics_data = read_json("hospital_metrics.json")
-        documents_data = read_json("document_uploads.json")
-        addresses_data = read_json("hospital_addresses.json")
+        result = SCORING.score(name, dict(weights or ()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    digits = index.digits
+    scores = [round(score, digits) if digits else round(score) for score in result["scores"].tolist()]
+    order = sorted(range(len(scores)), key=lambda i: -scores[i])
+    return index, result, scores, order
+
+def get_score_index(name: str, weights: Optional[Tuple[Tuple[str, float], ...]] = None) -> Dict[str, Any]:
+    """Scores and ranks every hospital of an index, with each feature's raw, normalized and weighted value."""
+    index, result, scores, order = rank_score_index(name, weights)
+    names = [feature.name for feature in index.features]
+    hospitals = []
+    for rank, i in enumerate(order, start=1):
+        hospital_id = result["hospital_ids"][i]
+        score = scores[i]
+        hospitals.append({
+            "hospital_id": hospital_id,
+            "hospital_name": HOSPITALS_MAP.get(hospital_id, {}).get("name"),
+            "city": HOME_ADDRESSES.get(hospital_id, {}).get("city_town"),
+            "score": score,
+            "band": index.band(score),
+            "rank": rank,
+            "components": {
+                feature: {
+                    "raw": round(float(result["raw"][i, f]), 4),
+                    "normalized": round(float(result["normalized"][i, f]), 4),
+                    "contribution": round(float(result["contributions"][i, f]), 4),
+                }
+                for f, feature in enumerate(names)
+            },
+        })
+    return {
+        "index": name,
+        "description": index.description,
+        "weights": result["weights"],
+        "overridden": sorted(dict(weights or ())),
+        "hospital_count": len(hospitals),
+        "hospitals": hospitals,
+    }
 
-        all_hospitals_summary = []
+@app.get("/scores", tags=["Scores"])
+async def list_score_indices():
+    """Lists the composite score indices with their features, normalizations and default weights."""
+    return [
+        {
+            "index": index.name,
+            "description": index.description,
+            "features": [
+                {"name": f.name, "weight": f.weight, "normalize": f.normalize, "description": f.description}
+                for f in index.features
+            ],
+            "bands": [label for _, label in index.bands],
+        }
+        for index in SCORING.indices()
+    ]
 
-        for hospital in hospitals_data:
-            hospital_id = hospital.get('id')
-            
-            # Find related data for this hospital
-            address = next((a for a in addresses_data if a.get('hospital_id') == hospital_id and a.get('address_type') == 'Primary'), {})
-            certifications = [c for c in certifications_data if c.get('hospital_id') == hospital_id]
-            metrics = next((m for m in metrics_data if m.get('hospital_id') == hospital_id), {})
-            documents = [d for d in documents_data if d.get('entity_id') == hospital_id and d.get('entity_type') == 'hospital']
-            
-            # Calculate scores (reusing the same logic)
-            metrics_risk_score = ((1 - metrics.get('doctor_bed_ratio', 1)) * 5) + \
-                                 ((1 - metrics.get('nurse_bed_ratio', 1)) * 5) + \
-                                 ((1 - metrics.get('icu_doctor_bed_ratio', 1)) * 5) + \
-                                 ((1 - metrics.get('icu_nurse_bed_ratio', 1)) * 5)
-                                 
-            certification_risk_score = 0
-            today = date.today()
-            for cert in certifications:
-                expiry_date_str = cert.get('expiry_date')
-                if expiry_date_str:
-                    try:
-                        expiry_date = datetime.strptime(expiry_date_str, "%Y-%m-%d").date()
-                        if expiry_date < today:
-                            certification_risk_score += 10
-                    except ValueError:
-                        certification_risk_score += 5
-
-            document_risk_score = len([doc for doc in documents if not doc.get('is_verified', True)]) * 5
-            
-            total_risk_score = metrics_risk_score + certification_risk_score + document_risk_score
-            
-            risk_category = "Low"
-            if total_risk_score >= 20:
-                risk_category = "High"
-            elif total_risk_score >= 10:
-                risk_category = "Medium"
-
-            # Append simplified profile to the list
-            all_hospitals_summary.append({
-                "id": hospital_id,
-                "name": hospital.get('name'),
-                "address": f"{address.get('street', 'N/A')}, {address.get('area_locality', 'N/A')}, {address.get('city_town', 'N/A')}",
-                "total_risk_score": round(total_risk_score, 2),
-                "risk_category": risk_category,
+@app.get("/scores/{index_name}", tags=["Scores"])
+async def get_score_index_endpoint(
+    index_name: str,
+    weights: Optional[str] = None,
+    top: Optional[int] = Query(None, ge=1),
+    city: Optional[str] = None,
+):
+    """
+    Hospitals ranked by a composite score, with per-feature breakdowns. `weights` overrides
+    feature weights for a what-if ranking (e.g. `certifications:60,nurseRatio:10`); ranks stay
+    network-wide when filtering by `city`.
+    """
+    overrides = tuple(sorted(parse_weight_overrides(weights).items()))
+    data = await run_coalesced(get_score_index, index_name, overrides)
+    hospitals = data["hospitals"]
+    if city:
+        hospitals = [h for h in hospitals if (h["city"] or "").casefold() == city.strip().casefold()]
+    return {**data, "hospitals": hospitals[:top] if top else hospitals}
+
+@app.get("/scores/{index_name}/hospitals/{hospital_id}", tags=["Scores"])
+async def get_hospital_score(index_name: str, hospital_id: int, weights: Optional[str] = None):
+    """A single hospital's score, band, rank and feature breakdown on an index."""
+    overrides = tuple(sorted(parse_weight_overrides(weights).items()))
+    data = await run_coalesced(get_score_index, index_name, overrides)
+    entry = next((h for h in data["hospitals"] if h["hospital_id"] == hospital_id), None)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Hospital {hospital_id} is not scored on {index_name}")
+    return {"index": index_name, "weights": data["weights"], "hospital_count": data["hospital_count"], **entry}
+
+# ----------------- Ward Tariff Benchmarks ----------------- #
+# Quantile sketches of daily_rate per peer group, updated per hospital as its wards change
+TARIFF_BENCHMARK = TariffBenchmark(accuracy=float(os.environ.get("TARIFF_SKETCH_ACCURACY", 0.01)))
+
+def sync_hospital_tariffs(hospital_id: int):
+    """Replaces a hospital's ward rates in the tariff sketches with its current wards."""
+    address = HOME_ADDRESSES.get(hospital_id, {})
+    TARIFF_BENCHMARK.replace_hospital(
+        hospital_id, [ward.to_dict() for ward in WARDS_MAP.get(hospital_id, [])],
+        state=address.get("state"), city=address.get("city_town"),
+    )
+
+for _hospital_id in list(WARDS_MAP):
+    sync_hospital_tariffs(_hospital_id)
+
+def parse_quantiles(value: Optional[str]) -> Tuple[float, ...]:
+    if not value:
+        return DEFAULT_QUANTILES
+    try:
+        quantiles = tuple(float(item) for item in value.split(",") if item.strip())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="quantiles must be comma-separated numbers between 0 and 1")
+    if not quantiles or any(not 0 <= q <= 1 for q in quantiles):
+        raise HTTPException(status_code=400, detail="quantiles must be comma-separated numbers between 0 and 1")
+    return quantiles
+
+def ward_tariff_position(ward, state: Optional[str], city: Optional[str]) -> Dict[str, Optional[float]]:
+    """Percentile of a ward's daily rate among same ward type and room category peers, per geography."""
+    return {
+        "city": TARIFF_BENCHMARK.percentile_of(ward.daily_rate, TariffBenchmark.peer_key(
+            city=city, ward_type=ward.ward_type, room_category=ward.room_category)) if city else None,
+        "state": TARIFF_BENCHMARK.percentile_of(ward.daily_rate, TariffBenchmark.peer_key(
+            state=state, ward_type=ward.ward_type, room_category=ward.room_category)) if state else None,
+        "national": TARIFF_BENCHMARK.percentile_of(ward.daily_rate, TariffBenchmark.peer_key(
+            ward_type=ward.ward_type, room_category=ward.room_category)),
+    }
+
+@app.get("/tariffs/benchmark", tags=["Tariffs"])
+async def get_tariff_benchmark(
+    state: Optional[str] = None,
+    city: Optional[str] = None,
+    ward_type: Optional[str] = None,
+    room_category: Optional[str] = None,
+    quantiles: Optional[str] = None,
+):
+    """
+    Daily rate quantiles (default p10/p25/p50/p75/p90) for a peer group: national, a state or a
+    city, optionally narrowed to a ward type and/or room category. Values are approximate within
+    the sketch accuracy (1% by default).
+    """
+    key = TariffBenchmark.peer_key(state, city, ward_type, room_category)
+    summary = TARIFF_BENCHMARK.summary(key, parse_quantiles(quantiles))
+    if summary is None:
+        raise HTTPException(status_code=404, detail="No ward tariffs for this peer group")
+    peer_group = {"state": state, "city": city, "ward_type": ward_type, "room_category": room_category}
+    return {"peer_group": {name: value for name, value in peer_group.items() if value}, **summary}
+
+@app.get("/tariffs/hospitals/{hospital_id}", tags=["Tariffs"])
+async def get_hospital_tariff_position(hospital_id: int):
+    """
+    Each of a hospital's ward rates with its percentile among same ward type and room category
+    wards in its city, its state and nationally (e.g. an ICU rate at the 92nd percentile in its city).
+    """
+    if hospital_id not in HOSPITALS_MAP:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    address = HOME_ADDRESSES.get(hospital_id, {})
+    state, city = address.get("state"), address.get("city_town")
+    return {
+        "hospital_id": hospital_id,
+        "hospital_name": HOSPITALS_MAP[hospital_id].get("name"),
+        "city": city,
+        "state": state,
+        "wards": [
+            {
+                "ward_id": ward.id,
+                "ward_type": ward.ward_type,
+                "room_category": ward.room_category,
+                "daily_rate": ward.daily_rate,
+                "percentile": ward_tariff_position(ward, state, city),
+            }
+            for ward in WARDS_MAP.get(hospital_id, []) if ward.daily_rate is not None
+        ],
+    }
+
+def find_tariff_outliers(scope: str, above: float, below: float, ward_type: Optional[str]) -> List[Dict[str, Any]]:
+    """Wards whose rate percentile among peers at `scope` is at or above `above` or at or below `below`."""
+    outliers = []
+    for hospital_id, wards in list(WARDS_MAP.items()):
+        address = HOME_ADDRESSES.get(hospital_id, {})
+        state, city = address.get("state"), address.get("city_town")
+        for ward in wards:
+            if ward.daily_rate is None or (ward_type and ward.ward_type != ward_type):
+                continue
+            percentile = ward_tariff_position(ward, state, city)[scope]
+            if percentile is None or below < percentile < above:
+                continue
+            outliers.append({
+                "hospital_id": hospital_id,
+                "hospital_name": HOSPITALS_MAP.get(hospital_id, {}).get("name"),
+                "city": city,
+                "state": state,
+                "ward_id": ward.id,
+                "ward_type": ward.ward_type,
+                "room_category": ward.room_category,
+                "daily_rate": ward.daily_rate,
+                "percentile": percentile,
+                "position": "high" if percentile >= above else "low",
             })
-        
-        return all_hospitals_summary
-    
-    except Exception as e:
-        print(f"An unhandled error occurred in get_all_hospitals_data: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error while fetching hospital list.")
+    outliers.sort(key=lambda item: -abs(item["percentile"] - 50))
+    return outliers
+
+@app.get("/tariffs/outliers", tags=["Tariffs"])
+async def get_tariff_outliers(
+    scope: str = "city",
+    above: float = Query(90, ge=0, le=100),
+    below: float = Query(10, ge=0, le=100),
+    ward_type: Optional[str] = None,
+):
+    """
+    Wards whose daily rate is at or above the `above` percentile, or at or below the `below`
+    percentile, among same ward type and room category peers in their city, state or the
+    whole network (`scope`). Most extreme first.
+    """
+    if scope not in GEOGRAPHY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"scope must be one of: {', '.join(GEOGRAPHY_LEVELS)}")
+    return await run_coalesced(find_tariff_outliers, scope, above, below, ward_type)
+
+@app.get("/health/tariffs", tags=["Health"])
+async def tariff_sketch_stats():
+    """Reports the number of tariff sketches and buckets held for the benchmarks."""
+    return TARIFF_BENCHMARK.stats()
+
+# ----------------- Hospital Bundles ----------------- #
+# Everything the hospital profile page shows, precomputed per hospital. A bundle is rebuilt only
+# after a write to one of that hospital's records (or a new day, for certificate-based risk);
+# positioning is relative to the network, so it is refreshed whenever any hospital changes.
+HOSPITAL_INPUT_VERSIONS = defaultdict(int)
+HOSPITAL_BUNDLES: Dict[int, Dict[str, Any]] = {}
+# Guards HOSPITAL_BUNDLES, which concurrent bundle requests read and replace entries of
+HOSPITAL_BUNDLES_LOCK = threading.Lock()
+SPECIALTY_ROWS = index_rows_by_hospital(MEDICAL_SPECIALTIES)
+CONTACTS_BY_HOSPITAL = defaultdict(list)
+for _contact in read_json("hospital_contacts.json"):
+    CONTACTS_BY_HOSPITAL[_contact.get("hospital_id")].append(_contact)
+
+def summarize_hospital_equipment(hospital_id: int) -> Dict[str, Any]:
+    by_category = defaultdict(int)
+    total_quantity = available_items = 0
+    records = EQUIPMENT_BY_HOSPITAL.get(hospital_id, [])
+    for record in records:
+        quantity = record.quantity or 0
+        total_quantity += quantity
+        by_category[record.category or "Uncategorized"] += quantity
+        if record.is_available:
+            available_items += 1
+    return {
+        "equipment_items": len(records),
+        "available_items": available_items,
+        "total_quantity": total_quantity,
+        "quantity_by_category": dict(by_category),
+    }
 
+def build_hospital_document(hospital_id: int) -> Dict[str, Any]:
+    """The per-hospital part of a bundle: everything except network-relative positioning."""
+    metrics_record = METRICS_BY_HOSPITAL.get(hospital_id)
+    address = HOME_ADDRESSES.get(hospital_id)
+    return {
+        "hospital": dict(HOSPITALS_MAP[hospital_id]),
+        "address": dict(address) if address else None,
+        "contacts": list(CONTACTS_BY_HOSPITAL.get(hospital_id, [])),
+        "specialties": [dict(MEDICAL_SPECIALTIES[i]) for i in SPECIALTY_ROWS.get(hospital_id, [])],
+        "metrics": dict(METRICS[metrics_record.row]) if metrics_record else None,
+        "certifications": [dict(CERTIFICATIONS[i]) for i in CERTIFICATION_ROWS.get(hospital_id, [])],
+        "doctor_count": len(DOCTORS_BY_HOSPITAL.get(hospital_id, [])),
+        "icu": {
+            **icu_availability_of(hospital_id),
+            "facilities": [dict(ICU_FACILITIES[record.row]) for record in ICU_MAP.get(hospital_id, [])],
+        },
+        "equipment_summary": summarize_hospital_equipment(hospital_id),
+        "risk": get_hospital_risk_profile_data(hospital_id),
+    }
 
-@app.get("/api/hospitals/list", response_model=List[Dict[str, Any]], tags=["Hospitals"])
-def get_all_hospitals_endpoint():
+def get_hospital_bundle(hospital_id: int) -> Dict[str, Any]:
+    """Returns a hospital's bundle, rebuilding only the parts whose inputs changed."""
+    if hospital_id not in HOSPITALS_MAP:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    # The risk profile depends on today's date only through certification expiry statuses
+    document_key = (HOSPITAL_INPUT_VERSIONS[hospital_id], certification_epoch(date.today(), hospital_id))
+    network_key = DATASET_VERSIONS["hospitals"]
+    with HOSPITAL_BUNDLES_LOCK:
+        cached = HOSPITAL_BUNDLES.get(hospital_id, {})
+
+    if cached.get("document_key") == document_key:
+        document = cached["document"]
+    else:
+        document = build_hospital_document(hospital_id)
+    if cached.get("network_key") == network_key:
+        positioning = cached["positioning"]
+    else:
+        positioning = get_positioning_data(hospital_id)
+
+    with HOSPITAL_BUNDLES_LOCK:
+        HOSPITAL_BUNDLES[hospital_id] = {
+            "document_key": document_key, "document": document,
+            "network_key": network_key, "positioning": positioning,
+        }
+    return {**document, "positioning": positioning}
+
+@app.get("/hospitals/{hospital_id}/bundle", tags=["Hospitals"])
+async def get_hospital_bundle_endpoint(hospital_id: int):
     """
-    Endpoint to retrieve a simplified list of all hospitals for the dashboard overview.
+    Everything the hospital profile page needs in one response: core fields, primary address,
+    contacts, specialties, metrics, positioning, risk profile, certifications, ICU and equipment summary.
     """
-    return get_all_hospitals_data()
+    return await run_coalesced(get_hospital_bundle, hospital_id)
 
-def get_surgical_capacity():
+# ----------------- Data Mutations ----------------- #
+# Writes are serialized in memory; their fsyncs are grouped by DATA_JOURNAL (single writer process)
+DATA_WRITE_LOCK = threading.Lock()
+
+def changed_fields(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> set:
+    """Names of the fields an update changed."""
+    if before is None or after is None:
+        return set(before or after or ())
+    return {name for name in before.keys() | after.keys() if before.get(name) != after.get(name)}
+
+def refresh_derived_state(dataset: str, record_id: Any, before: Optional[Dict[str, Any]],
+                          after: Optional[Dict[str, Any]], old_position: Optional[int]):
+    """
+    Brings the indexes and views derived from one written record up to date. Each structure
+    takes only that record's change (or its hospital's), and structures reading none of the
+    changed fields are skipped. Creates and deletes touch every field. `old_position` is the
+    record's place in its table before the write.
     """
-    Calculates and returns the surgical capacity of hospitals by combining data
-    from multiple JSON files.
+    global HOSPITALS_MAP, NETWORK_AVERAGES, DOCTOR_RECORDS, DOCTORS_BY_HOSPITAL
+    global WARD_RECORDS, WARDS_MAP, EQUIPMENT_RECORDS, EQUIPMENT_BY_HOSPITAL, EQUIPMENT_INVENTORY
+    global ICU_AVAILABILITY, ICU_LOCATOR
+    global DIAGNOSTIC_SERVICE_LIST, DIAGNOSTIC_ROLLUPS, DIAGNOSTIC_SERVICES_BY_NAME, DIAGNOSTIC_SERVICES_BY_HOSPITAL
 
-    Returns:
-        A JSON string containing an array of hospital objects with their
-        calculated surgical capacity scores, names, and locations.
+    resized = before is None or after is None
+    fields = changed_fields(before, after)
+
+    def touched(*names: str) -> bool:
+        return resized or not fields.isdisjoint(names)
+
+    if dataset == "hospitals":
+        hospital_ids = {record_id}
+    elif dataset == "document_uploads":
+        hospital_ids = {r.get("entity_id") for r in (before, after) if r and r.get("entity_type") == "hospital"}
+    else:
+        hospital_ids = {r.get("hospital_id") for r in (before, after) if r and r.get("hospital_id") is not None}
+
+    cube_changed = (
+        dataset == "hospitals" and touched("hospital_type", "ownership_type", "beds_registered", "beds_operational")
+        or dataset == "doctors" and touched("hospital_id")
+        or dataset == "hospital_equipment" and touched("hospital_id", "quantity")
+    )
+    # Read before the maps below move on, so the cube can take the difference
+    old_facts = {h: hospital_cube_fact(HOSPITALS_MAP[h]) for h in hospital_ids if h in HOSPITALS_MAP} if cube_changed else {}
+
+    if dataset == "hospitals":
+        hospitals_map = dict(HOSPITALS_MAP)
+        if after is None:
+            hospitals_map.pop(record_id, None)
+        else:
+            hospitals_map[record_id] = HOSPITALS.get(record_id)
+        HOSPITALS_MAP = hospitals_map
+        if touched("beds_operational"):
+            NETWORK_AVERAGES = calculate_network_averages(METRICS)
+        if resized and record_id in DIAGNOSTIC_ROWS:
+            DIAGNOSTIC_SERVICE_LIST = build_diagnostic_services()
+            DIAGNOSTIC_ROLLUPS = build_diagnostic_rollups(DIAGNOSTIC_SERVICE_LIST)
+            DIAGNOSTIC_SERVICES_BY_NAME = index_diagnostic_services_by_name(DIAGNOSTIC_SERVICE_LIST)
+            DIAGNOSTIC_SERVICES_BY_HOSPITAL = index_diagnostic_services_by_hospital(DIAGNOSTIC_SERVICE_LIST)
+        elif "name" in fields:
+            # Rollups only count hospitals, so a rename touches the joined service rows alone
+            for service in DIAGNOSTIC_SERVICES_BY_HOSPITAL.get(record_id, ()):
+                service["hospital_name"] = after.get("name")
+        if "name" in fields:
+            for doctor in DOCTORS_BY_HOSPITAL.get(record_id, []):
+                update_doctor_availability(doctor.id, doctor)
+        if touched("latitude", "longitude"):
+            with ADEQUACY_LOCK:
+                ADEQUACY_DATASETS.clear()
+        if resized:
+            EQUIPMENT_INVENTORY = build_equipment_inventory()
+    if dataset == "doctors":
+        doctor = DoctorRecord.from_mapping(after) if after is not None else None
+        DOCTOR_RECORDS, DOCTORS_BY_HOSPITAL = replace_record(
+            DOCTOR_RECORDS, DOCTORS_BY_HOSPITAL, "hospital_id", record_id, doctor, DOCTORS.position, old_position)
+        update_doctor_availability(record_id, doctor)
+    if dataset == "wards_rooms":
+        ward = WardRecord.from_mapping(after) if after is not None else None
+        WARD_RECORDS, WARDS_MAP = replace_record(
+            WARD_RECORDS, WARDS_MAP, "hospital_id", record_id, ward, WARDS_ROOMS.position, old_position)
+        if touched("hospital_id", "ward_type", "room_category", "daily_rate"):
+            for hospital_id in hospital_ids:
+                sync_hospital_tariffs(hospital_id)
+    if dataset == "hospital_equipment":
+        item = EquipmentRecord.from_mapping(after) if after is not None else None
+        EQUIPMENT_RECORDS, EQUIPMENT_BY_HOSPITAL = replace_record(
+            EQUIPMENT_RECORDS, EQUIPMENT_BY_HOSPITAL, "hospital_id", record_id, item, EQUIPMENT.position,
+            old_position)
+        get_coverage_matrix.cache_clear()
+        EQUIPMENT_INVENTORY = EQUIPMENT_INVENTORY.with_change(
+            old_position, EQUIPMENT.position(record_id) if item is not None else None,
+            item.to_dict() if item is not None else None,
+        )
+
+    if dataset in ("hospitals", "wards_rooms"):
+        for hospital_id in hospital_ids:
+            state = HOME_ADDRESSES.get(hospital_id, {}).get("state")
+            if state:
+                REGION_PARTITIONS.invalidate(state)
+    if cube_changed:
+        for hospital_id in hospital_ids:
+            fresh = hospital_cube_fact(HOSPITALS_MAP[hospital_id]) if hospital_id in HOSPITALS_MAP else None
+            HOSPITAL_CUBE.replace(old_facts.get(hospital_id), fresh)
+    if dataset == "hospitals" and touched("latitude", "longitude"):
+        # The spatial index cannot move a point, so it is rebuilt when coordinates change
+        ICU_AVAILABILITY = build_icu_availability()
+        ICU_LOCATOR = build_icu_locator(ICU_AVAILABILITY)
+    elif dataset == "wards_rooms" and touched("hospital_id", "ward_type", "total_beds", "available_beds"):
+        for hospital_id in hospital_ids:
+            fresh = icu_availability_of(hospital_id)
+            if hospital_id in ICU_AVAILABILITY:
+                ICU_AVAILABILITY[hospital_id]["total_icu_beds"] = fresh["total_icu_beds"]
+            update_icu_availability(hospital_id, available_icu_beds=fresh["available_icu_beds"])
+
+    DATASET_VERSIONS[dataset] += 1
+    for hospital_id in hospital_ids:
+        HOSPITAL_INPUT_VERSIONS[hospital_id] += 1
+    # Rebuilding a view is report work, kept off the interactive pool
+    MATERIALIZED_VIEWS.refresh_stale(CLASS_EXECUTORS[COST_REPORT])
+
+def resolve_resource(resource: str) -> Tuple[str, Any]:
+    if resource not in MUTABLE_RESOURCES:
+        raise HTTPException(status_code=404, detail=f"Unknown resource '{resource}'")
+    return MUTABLE_RESOURCES[resource]
+
+# What a document can be attached to
+DOCUMENT_ENTITY_TYPES = ("hospital", "doctor")
+
+def check_write_references(resource: str, row: Dict[str, Any]):
+    """Rejects rows pointing at hospitals, specialties or doctors that do not exist."""
+    if resource in ("doctors", "wards", "equipment") and row.get("hospital_id") not in HOSPITALS_MAP:
+        raise HTTPException(status_code=422, detail=f"hospital_id {row.get('hospital_id')} does not exist")
+    if resource == "doctors" and row.get("specialty_id") is not None and row["specialty_id"] not in SPECIALTY_NAMES:
+        raise HTTPException(status_code=422, detail=f"specialty_id {row['specialty_id']} does not exist")
+    if resource == "documents":
+        entity_type, entity_id = row.get("entity_type"), row.get("entity_id")
+        if entity_type not in DOCUMENT_ENTITY_TYPES:
+            raise HTTPException(status_code=422, detail=f"entity_type must be one of: {', '.join(DOCUMENT_ENTITY_TYPES)}")
+        if entity_type == "hospital" and entity_id not in HOSPITALS_MAP:
+            raise HTTPException(status_code=422, detail=f"hospital {entity_id} does not exist")
+        if entity_type == "doctor" and DOCTORS.get(entity_id) is None:
+            raise HTTPException(status_code=422, detail=f"doctor {entity_id} does not exist")
+
+def hospital_dependents(hospital_id: int) -> List[str]:
+    """Names the datasets that still hold records of a hospital."""
+    dependents = []
+    for name in COLUMNAR_DATASETS:
+        table = MUTABLE_TABLES.get(name) or SNAPSHOT.table(name)
+        if "hospital_id" in table.column_names and hospital_id in table.column("hospital_id"):
+            dependents.append(name)
+    if any(entity_type == "hospital" and entity_id == hospital_id for entity_type, entity_id in zip(
+        DOCUMENT_UPLOADS.column("entity_type"), DOCUMENT_UPLOADS.column("entity_id")
+    )):
+        dependents.append("document_uploads")
+    return dependents
+
+def write_record(resource: str, op: str, record_id: Optional[int] = None,
+                 changes: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Creates, updates or deletes one record. The change is applied to the in-memory tables and
+    indexes and journaled; the call returns once the journal entry is fsync'd.
     """
+    dataset, record_type = resolve_resource(resource)
+    require_journal_writer()
+    table = MUTABLE_TABLES[dataset]
+    now = datetime.now(timezone.utc).isoformat()
+    changes = dict(changes or {})
+    released_digest = None
+
+    with DATA_WRITE_LOCK:
+        found = table.get(record_id) if record_id is not None else None
+        current = dict(found) if found is not None else None
+        if op == "create":
+            record_id = changes.get("id") or table.next_key()
+            if table.get(record_id) is not None:
+                raise HTTPException(status_code=409, detail=f"{resource} {record_id} already exists")
+            row = {"created_at": now, "updated_at": None, "is_active": True, **changes, "id": record_id}
+        elif current is None:
+            raise HTTPException(status_code=404, detail=f"{resource} {record_id} not found")
+        elif op == "update":
+            row = {**current, **changes, "id": record_id, "updated_at": now}
+        else:
+            row = current
+            if dataset == "hospitals":
+                dependents = hospital_dependents(record_id)
+                if dependents:
+                    raise HTTPException(status_code=409, detail=f"Hospital {record_id} still has records in: {', '.join(dependents)}")
+
+        if op != "delete":
+            try:
+                record_type.validate(row, dataset)
+            except RecordValidationError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            check_write_references(resource, row)
+
+        entry = {"dataset": dataset, "op": "delete" if op == "delete" else "upsert", "id": record_id, "at": now}
+        if op != "delete":
+            entry["row"] = row
+        old_position = table.position(record_id) if current is not None else None
+        seq = DATA_JOURNAL.append([entry])
+        apply_journal_entry(entry)
+        if dataset == "document_uploads":
+            released_digest = track_document_change(current, row if op != "delete" else None)
+
+        refresh_derived_state(dataset, record_id, current, row if op != "delete" else None, old_position)
+
+    # Outside the lock, so concurrent writers share one fsync
+    DATA_JOURNAL.wait_durable(seq)
+    if released_digest:
+        # Only once the change is durable, so a replayed document never points at a deleted file
+        DOCUMENT_STORE.release(released_digest)
+    return row
+
+def write_json_atomic(filename: str, rows: List[Dict[str, Any]]):
+    """Replaces a data file with `rows` via a fsync'd temporary file and an atomic rename."""
+    path = BASE_PATH / filename
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
     try:
-        # Get the directory of the current script
-        script_dir = Path(__file__).parent
-        
-        # Define paths to the JSON files, now correctly including the 'data' subdirectory
-        data_dir = script_dir / 'data'
-        hospitals_path = data_dir / 'hospitals.json'
-        addresses_path = data_dir / 'hospital_addresses.json'
-        equipment_path = data_dir / 'hospital_equipment.json'
-        specialties_path = data_dir / 'medical_specialties.json'
-        doctors_path = data_dir / 'doctors.json'
-
-        # Load all JSON data from files
-        with open(hospitals_path, 'r', encoding='utf-8') as f:
-            hospitals_data = json.load(f)
-        with open(addresses_path, 'r', encoding='utf-8') as f:
-            addresses_data = json.load(f)
-        with open(equipment_path, 'r', encoding='utf-8') as f:
-            equipment_data = json.load(f)
-        with open(specialties_path, 'r', encoding='utf-8') as f:
-            specialties_data = json.load(f)
-        with open(doctors_path, 'r', encoding='utf-8') as f:
-            doctors_data = json.load(f)
-
-        # Create dictionaries for efficient data lookup
-        hospitals_map = {h['id']: {'name': h['name']} for h in hospitals_data}
-        addresses_map = {a['hospital_id']: a for a in addresses_data if a.get('address_type') == 'Primary'}
-        specialties_map = {s['id']: s for s in specialties_data if s.get('is_available')}
-        
-        # Identify surgical specialty IDs
-        surgical_specialty_ids = {
-            s_id for s_id, s_info in specialties_map.items() 
-            if s_info.get('specialty_category') == 'Surgery'
-        }
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+def fold_journal_entries(entries: List[Dict[str, Any]]):
+    """Applies journaled upserts and deletes to the JSON data files, one rewrite per touched file."""
+    by_dataset = defaultdict(list)
+    for entry in entries:
+        by_dataset[entry["dataset"]].append(entry)
+
+    for dataset, dataset_entries in by_dataset.items():
+        filename = COLUMNAR_DATASETS[dataset]
+        rows = _load_json_file(filename)
+        positions = {row.get("id"): i for i, row in enumerate(rows)}
+        for entry in dataset_entries:
+            position = positions.get(entry["id"])
+            if entry["op"] == "upsert":
+                if position is None:
+                    positions[entry["id"]] = len(rows)
+                    rows.append(entry["row"])
+                else:
+                    rows[position] = entry["row"]
+            elif position is not None:
+                rows[position] = None
+                del positions[entry["id"]]
+        write_json_atomic(filename, [row for row in rows if row is not None])
+
+JOURNAL_COMPACTOR = JournalCompactor(
+    DATA_JOURNAL,
+    fold_journal_entries,
+    interval_seconds=float(os.environ.get("DATA_JOURNAL_COMPACT_SECONDS", 30)),
+)
+if DATA_JOURNAL.writable:
+    JOURNAL_COMPACTOR.start()
+
+def apply_followed_entry(entry: Dict[str, Any]):
+    """Applies one of the writer's journal entries in a read-only worker, along with its derived state."""
+    table = MUTABLE_TABLES[entry["dataset"]]
+    with DATA_WRITE_LOCK:
+        found = table.get(entry["id"])
+        before = dict(found) if found is not None else None
+        old_position = table.position(entry["id"]) if found is not None else None
+        apply_journal_entry(entry)
+        found = table.get(entry["id"])
+        refresh_derived_state(entry["dataset"], entry["id"], before, dict(found) if found is not None else None,
+                              old_position)
+
+JOURNAL_FOLLOWER = JournalFollower(
+    DATA_JOURNAL,
+    apply_followed_entry,
+    applied_seq=_REPLAYED[-1]["seq"] if _REPLAYED else 0,
+    interval_seconds=float(os.environ.get("DATA_JOURNAL_FOLLOW_SECONDS", 1)),
+)
+if not DATA_JOURNAL.writable:
+    JOURNAL_FOLLOWER.start()
+
+@app.middleware("http")
+async def follow_journal(request: Request, call_next):
+    """
+    Read-only workers apply the writer's new journal entries before serving a request, so a
+    write is visible on every worker once it has been acknowledged.
+    """
+    if not DATA_JOURNAL.writable and JOURNAL_FOLLOWER.behind():
+        await run_blocking(JOURNAL_FOLLOWER.sync)
+    return await call_next(request)
+
+@app.get("/data/journal", tags=["Data"])
+async def get_journal_status():
+    """Reports journal size, group-commit counters, compaction progress and, in read-only workers, follow progress."""
+    return {
+        "journal": DATA_JOURNAL.stats(),
+        "compactor": JOURNAL_COMPACTOR.stats(),
+        "follower": None if DATA_JOURNAL.writable else JOURNAL_FOLLOWER.stats(),
+    }
+
+@app.post("/data/journal/compact", tags=["Data"])
+async def compact_journal():
+    """Folds the journal into the data files now instead of waiting for the next background run."""
+    require_journal_writer()
+    folded = await run_blocking(JOURNAL_COMPACTOR.run_once)
+    return {"entries_compacted": folded}
+
+@app.get("/data/{resource}/{record_id}", tags=["Data"])
+async def get_data_record(resource: str, record_id: int):
+    """Returns the current version of one hospital, doctor, ward, equipment or document record."""
+    dataset, _ = resolve_resource(resource)
+    row = MUTABLE_TABLES[dataset].get(record_id)
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"{resource} {record_id} not found")
+    return dict(row)
+
+@app.post("/data/{resource}", status_code=201, tags=["Data"])
+async def create_data_record(resource: str, record: Dict[str, Any]):
+    """Creates a record; an ID is assigned when none is given."""
+    return await run_blocking(write_record, resource, "create", None, record)
+
+@app.patch("/data/{resource}/{record_id}", tags=["Data"])
+async def update_data_record(resource: str, record_id: int, changes: Dict[str, Any]):
+    """Updates the given fields of a record."""
+    return await run_blocking(write_record, resource, "update", record_id, changes)
+
+@app.delete("/data/{resource}/{record_id}", tags=["Data"])
+async def delete_data_record(resource: str, record_id: int):
+    """Deletes a record. Hospitals can only be deleted once nothing references them."""
+    await run_blocking(write_record, resource, "delete", record_id)
+    return {"deleted": True, "resource": resource, "id": record_id}
+
+# ----------------- Document Storage ----------------- #
+# Uploaded files, stored once per distinct content (SHA-256) and shared by the documents pointing at them
+DOCUMENT_STORE_PATH = Path(os.environ.get("DOCUMENT_STORE_PATH", Path(__file__).parent / "document_store"))
+DOCUMENT_MAX_BYTES = int(os.environ.get("DOCUMENT_MAX_BYTES", 256 * 1024 * 1024))
+DOCUMENT_STORE = DocumentStore(DOCUMENT_STORE_PATH, max_bytes=DOCUMENT_MAX_BYTES, writer=DATA_JOURNAL.writable)
+DOCUMENT_STORE.load_references(DOCUMENT_UPLOADS.column("content_sha256"))
+
+def track_document_change(old: Optional[Dict[str, Any]], new: Optional[Dict[str, Any]]) -> Optional[str]:
+    """
+    Moves a written document between the status counters and takes a reference on its new
+    content. Returns the digest whose reference the caller must release once the write is durable.
+    """
+    count_document(old, -1)
+    count_document(new, 1)
+    old_digest = old.get("content_sha256") if old else None
+    new_digest = new.get("content_sha256") if new else None
+    if new_digest == old_digest:
+        return None
+    if new_digest:
+        DOCUMENT_STORE.acquire(new_digest)
+    return old_digest
+
+def store_document(upload, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Commits a finished upload and creates the document row pointing at its content."""
+    digest, size, deduplicated = upload.commit()
+    try:
+        row = write_record("documents", "create", None, {
+            **metadata,
+            "file_size": size,
+            "content_sha256": digest,
+            "upload_date": datetime.now(timezone.utc).isoformat(),
+            "is_verified": False,
+            "verification_date": None,
+            "verification_notes": None,
+        })
+    finally:
+        # The document row now holds its own reference (or the write failed)
+        DOCUMENT_STORE.release(digest)
+    return {**row, "deduplicated": deduplicated}
+
+@app.post("/documents", status_code=201, tags=["Documents"])
+async def upload_document(
+    request: Request,
+    entity_id: int,
+    document_type: str,
+    file_name: str,
+    entity_type: str = "hospital",
+    uploaded_by_user_id: Optional[int] = None,
+):
+    """
+    Uploads a document as the raw request body, streamed to disk chunk by chunk.
+    The Content-Type header is stored as the document's MIME type. Identical files are stored once.
+    `entity_type` is "hospital" or "doctor"; `file_name` is a bare file name without directories.
+    """
+    if entity_type not in DOCUMENT_ENTITY_TYPES:
+        raise HTTPException(status_code=400, detail=f"entity_type must be one of: {', '.join(DOCUMENT_ENTITY_TYPES)}")
+    if "/" in file_name or "\\" in file_name or file_name.strip() in ("", ".", ".."):
+        raise HTTPException(status_code=400, detail="file_name must be a plain file name without path components")
+    metadata = {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "document_type": document_type,
+        "file_name": file_name,
+        "file_path": f"/uploads/{entity_type}s/{entity_id}/{file_name}",
+        "mime_type": request.headers.get("content-type") or mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+        "uploaded_by_user_id": uploaded_by_user_id,
+    }
+    # Fail before reading the body when the document could not be saved anyway
+    require_journal_writer()
+    check_write_references("documents", metadata)
+
+    upload = await run_blocking(DOCUMENT_STORE.begin_upload)
+    try:
+        async for chunk in request.stream():
+            if chunk:
+                await run_blocking(upload.write, chunk)
+    except DocumentTooLargeError as e:
+        await run_blocking(upload.abort)
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        await run_blocking(upload.abort)
+        raise
+    return await run_blocking(store_document, upload, metadata)
 
-        # Initialize a dictionary to hold the combined data
-        surgical_capacity_results = {h_id: {
-            'hospital_id': h_id,
-            'surgical_equipment_count': 0,
-            'surgical_specialties_count': 0,
-            'surgeon_count': 0,
-        } for h_id in hospitals_map.keys()}
-
-        # Tally surgical equipment
-        for equip in equipment_data:
-            hospital_id = equip.get('hospital_id')
-            if equip.get('category') == 'Surgery' and hospital_id in surgical_capacity_results:
-                quantity = equip.get('quantity', 1)
-                surgical_capacity_results[hospital_id]['surgical_equipment_count'] += quantity
-
-        # Tally surgical specialties
-        for specialty in specialties_data:
-            hospital_id = specialty.get('hospital_id')
-            if specialty.get('specialty_category') == 'Surgery' and hospital_id in surgical_capacity_results:
-                surgical_capacity_results[hospital_id]['surgical_specialties_count'] += 1
-
-        # Tally surgeons based on surgical specialties
-        for doctor in doctors_data:
-            hospital_id = doctor.get('hospital_id')
-            specialty_id = doctor.get('specialty_id')
-            if hospital_id in surgical_capacity_results and specialty_id in surgical_specialty_ids:
-                surgical_capacity_results[hospital_id]['surgeon_count'] += 1
-
-        # Finalize results with hospital names, addresses, and total score
-        final_output = []
-        for hospital_id, data in surgical_capacity_results.items():
-            if hospital_id in hospitals_map and hospital_id in addresses_map:
-                hospital_info = hospitals_map[hospital_id]
-                address_info = addresses_map[hospital_id]
-                
-                data['hospital_name'] = hospital_info.get('name')
-                data['city_town'] = address_info.get('city_town')
-                data['state'] = address_info.get('state')
-                
-                # Calculate final score
-                data['surgical_capacity_score'] = (
-                    data['surgical_equipment_count'] +
-                    data['surgical_specialties_count'] +
-                    data['surgeon_count']
-                )
-                final_output.append(data)
-                
-        # Return the final JSON output
-        return final_output
-
-    except FileNotFoundError as e:
-        # Provide a more specific error message based on which file was not found
-        raise HTTPException(status_code=404, detail=f"Required file not found: {e.filename}. Please ensure all JSON files are in the 'data' directory.")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"An unexpected server error occurred: {str(e)}")
-
-@app.get('/api/hospitals/surgical-capacity')
-def surgical_capacity_endpoint():
-    return get_surgical_capacity()
+@app.get("/documents/store", tags=["Documents"])
+async def get_document_store_stats():
+    """Reports stored content, upload counts and the bytes saved by deduplication."""
+    return DOCUMENT_STORE.stats()
+
+@app.get("/documents/{document_id}/content", tags=["Documents"])
+async def download_document(document_id: int):
+    """
+    Streams a document's file from disk. Range requests are answered with 206 Partial Content,
+    so large scans can be fetched in parts or resumed.
+    """
+    document = DOCUMENT_UPLOADS.get(document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Document {document_id} not found")
+    digest = document.get("content_sha256")
+    if not digest or not DOCUMENT_STORE.exists(digest):
+        raise HTTPException(status_code=404, detail=f"No stored file for document {document_id}")
+    return FileResponse(
+        DOCUMENT_STORE.path_for(digest),
+        media_type=document.get("mime_type") or "application/octet-stream",
+        filename=document.get("file_name"),
+        content_disposition_type="inline",
+    )
+
+# ----------------- Bulk Export ----------------- #
+def table_columns(table) -> Dict[str, Any]:
+    """Every column of a snapshot or overlay table, without building row dicts."""
+    return {name: table.column(name) for name in table.column_names}
+
+def hospital_detail_columns(hospital_ids: List[int], fields: Dict[str, Tuple[str, str]]) -> Dict[str, List[Any]]:
+    """Looks up hospital or home-address fields ({column: ("hospital"|"address", field)}) per hospital ID."""
+    lookups = {}
+    for column, (source, field) in fields.items():
+        values = {}
+        for hospital_id in set(hospital_ids):
+            record = HOSPITALS_MAP.get(hospital_id) if source == "hospital" else HOME_ADDRESSES.get(hospital_id)
+            values[hospital_id] = record.get(field) if record else None
+        lookups[column] = [values[hospital_id] for hospital_id in hospital_ids]
+    return lookups
+
+def export_equipment_data() -> Dict[str, Any]:
+    """/equipment-data as one row per hospital and one quantity column per equipment type."""
+    quantities = defaultdict(int)
+    for hospital_id, equipment_name, quantity in zip(
+        EQUIPMENT.column("hospital_id"), EQUIPMENT.column("equipment_name"), EQUIPMENT.column("quantity")
+    ):
+        if hospital_id is not None and equipment_name is not None:
+            quantities[(hospital_id, equipment_name)] += quantity or 0
+    equipment_types = sorted({equipment_name for _, equipment_name in quantities})
+    hospital_ids = [hospital_id for hospital_id in HOSPITALS.column("id") if hospital_id is not None]
+    columns = {
+        "id": hospital_ids,
+        **hospital_detail_columns(hospital_ids, {
+            "name": ("hospital", "name"), "city": ("address", "city_town"), "state": ("address", "state"),
+        }),
+    }
+    for equipment_type in equipment_types:
+        columns[equipment_type] = [quantities.get((hospital_id, equipment_type), 0) for hospital_id in hospital_ids]
+    return columns
+
+def export_equipment_inventory() -> Dict[str, Any]:
+    """Every equipment record with its hospital's name, city and state."""
+    return {
+        **table_columns(EQUIPMENT),
+        **hospital_detail_columns(list(EQUIPMENT.column("hospital_id")), {
+            "hospital_name": ("hospital", "name"), "city": ("address", "city_town"), "state": ("address", "state"),
+        }),
+    }
+
+def export_wards_rooms() -> Dict[str, Any]:
+    """/api/wards-rooms with the hospital address flattened into columns."""
+    hospital_column = WARDS_ROOMS.column("hospital_id")
+    keep = [
+        i for i, hospital_id in enumerate(hospital_column)
+        if hospital_id in HOSPITALS_MAP and HOME_ADDRESSES.get(hospital_id, {}).get("address_type") == "Primary"
+    ]
+    columns = {name: [values[i] for i in keep] for name, values in table_columns(WARDS_ROOMS).items()}
+    columns.update(hospital_detail_columns([hospital_column[i] for i in keep], {
+        "hospital_name": ("hospital", "name"),
+        "street": ("address", "street"),
+        "city": ("address", "city_town"),
+        "state": ("address", "state"),
+        "pin_code": ("address", "pin_code"),
+    }))
+    return columns
+
+def export_doctor_bed_ratio() -> Dict[str, Any]:
+    """/doctor-to-bed-ratio read straight from the metrics columns, ranked by doctor to bed ratio."""
+    metric_hospitals, metric_ratios = METRICS.column("hospital_id"), METRICS.column("doctor_bed_ratio")
+    keep = [i for i, hospital_id in enumerate(metric_hospitals) if hospital_id is not None]
+    hospital_ids = [metric_hospitals[i] for i in keep]
+    ratios = [metric_ratios[i] for i in keep]
+    order = np.argsort(-np.array([-1 if ratio is None else ratio for ratio in ratios], dtype=np.float64), kind="stable")
+    hospital_ids = [hospital_ids[i] for i in order]
+    hospitals = [HOSPITALS_MAP.get(hospital_id, {}) for hospital_id in hospital_ids]
+    addresses = [ADDRESSES_MAP.get(hospital_id, {}) for hospital_id in hospital_ids]
+    total_doctors = METRICS.column("total_doctors")
+    return {
+        "hospital_id": hospital_ids,
+        "hospital_name": [hospital.get("name", "Unknown") for hospital in hospitals],
+        "total_doctors": [total_doctors[keep[i]] for i in order],
+        "total_beds": [hospital.get("beds_operational", 0) for hospital in hospitals],
+        "doctor_bed_ratio": [ratios[i] for i in order],
+        "city": [address.get("city_town") for address in addresses],
+        "district": [address.get("district") for address in addresses],
+        "state": [address.get("state") for address in addresses],
+        "rank": list(range(1, len(hospital_ids) + 1)),
+    }
+
+def export_quality_scores() -> Dict[str, Any]:
+    """/hospitals/quality-scores taken column-wise from the quality ranking and its feature matrix."""
+    ranking = quality_ranking()
+    order = ranking["order"]
+    raw = ranking["raw"][order]
+    hospital_ids = [ranking["hospital_ids"][i] for i in order]
+    return {
+        "hospital_id": hospital_ids,
+        "name": [HOSPITALS_MAP.get(hospital_id, {}).get("name") for hospital_id in hospital_ids],
+        "city": [ranking["cities"][i] for i in order],
+        "certifications": raw[:, 0].astype(int).tolist(),
+        "doctorRatio": raw[:, 1].tolist(),
+        "nurseRatio": raw[:, 2].tolist(),
+        "qualityScore": [ranking["scores"][i] for i in order],
+    }
+
+def export_dataset(name: str) -> Dict[str, Any]:
+    return table_columns(MUTABLE_TABLES.get(name) or SNAPSHOT.table(name))
+
+# Report name -> function returning its columns; every snapshot dataset is exportable by name too
+EXPORT_REPORTS = {
+    "equipment-data": export_equipment_data,
+    "equipment-inventory": export_equipment_inventory,
+    "wards-rooms": export_wards_rooms,
+    "doctor-to-bed-ratio": export_doctor_bed_ratio,
+    "quality-scores": export_quality_scores,
+    **{name: functools.partial(export_dataset, name) for name in COLUMNAR_DATASETS},
+}
+
+def build_export_columns(report: str, columns: Optional[str]) -> Dict[str, Any]:
+    data = EXPORT_REPORTS[report]()
+    if not columns:
+        return data
+    selected = [name.strip() for name in columns.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in data]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown column(s) for {report}: {', '.join(unknown)}")
+    return {name: data[name] for name in selected}
+
+@app.get("/export", tags=["Export"])
+async def list_exports():
+    """Lists the reports and datasets available for bulk export, and the supported formats."""
+    return {"reports": sorted(EXPORT_REPORTS), "formats": list(EXPORT_FORMATS)}
+
+@app.get("/export/{report}", tags=["Export"])
+async def export_report(report: str, export_format: str = Query(FORMAT_CSV, alias="format"),
+                        columns: Optional[str] = None):
+    """
+    Exports a report or dataset in bulk. CSV is streamed in blocks of rows; Parquet and
+    Arrow IPC (which need pyarrow) are written with typed, dictionary-encoded columns.
+    `columns` is an optional comma-separated selection.
+    """
+    if report not in EXPORT_REPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown report '{report}'")
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    media_type, extension = EXPORT_FORMATS[export_format]
+    headers = {"Content-Disposition": f'attachment; filename="{report}.{extension}"'}
+
+    data = await run_coalesced(build_export_columns, report, columns)
+    if export_format == FORMAT_CSV:
+        return StreamingResponse(iter_csv(data), media_type=media_type, headers=headers)
+    try:
+        content = await run_blocking(write_columnar, data, export_format)
+    except ExportUnavailableError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return Response(content=content, media_type=media_type, headers=headers)
 
 def load_json_data(file_name):
     """
@@ -1529,3 +3589,54 @@ def load_json_data(file_name):
         # In a real application, you might raise an error or log a warning here.
         return []
 
+# ----------------- Materialized Views ----------------- #
+# Whole-network reports kept built in memory; each rebuilds after a write to a dataset it depends on
+MATERIALIZED_VIEWS = ViewRegistry(dataset_version)
+MATERIALIZED_VIEWS.register("full-profile", get_all_hospital_details, depends_on=["hospitals"])
+MATERIALIZED_VIEWS.register("geographic-coverage", get_geographic_data, depends_on=["hospitals"])
+MATERIALIZED_VIEWS.register("positioning-all", get_all_positioning_data, depends_on=["hospitals"])
+MATERIALIZED_VIEWS.register("doctor-to-bed-ratio", get_merged_metrics_data, depends_on=["hospitals"])
+MATERIALIZED_VIEWS.register("doctor-bed-ratio", calculate_doctor_bed_ratio, depends_on=["hospitals", "doctors"])
+MATERIALIZED_VIEWS.register("equipment-data", get_equipment_data, depends_on=["hospitals", "hospital_equipment"])
+MATERIALIZED_VIEWS.register("critical-care-equipment", get_critical_care_equipment_analysis_data,
+                            depends_on=["hospitals", "hospital_equipment"])
+MATERIALIZED_VIEWS.register("hospital-locations", get_hospital_locations)
+MATERIALIZED_VIEWS.register("hospitals-dashboard", get_hospitals_for_dashboard, depends_on=["hospitals"])
+# Date-dependent views: valid until a certification status next flips, then rebuilt in the background
+MATERIALIZED_VIEWS.register("iso-certification", get_iso_certification_status, depends_on=["hospitals"],
+                            next_change=lambda as_of: certification_epoch(as_of, record_type="ISO 9001"))
+MATERIALIZED_VIEWS.register("hospitals-list", get_all_hospitals_data, depends_on=["hospitals", "document_uploads"],
+                            next_change=certification_epoch)
+# Due dates are fixed offsets from created_at, so this one only follows writes
+MATERIALIZED_VIEWS.register("maintenance-schedule", get_equipment_maintenance_data,
+                            depends_on=["hospitals", "hospital_equipment"])
+# Score matrices are served straight from SCORING; as views they are built up front (and
+# again after writes) like the reports above, and readiness waits for them
+for _index in SCORING.indices():
+    MATERIALIZED_VIEWS.register(f"scores:{_index.name}", functools.partial(SCORING.matrix, _index.name),
+                                depends_on=_index.depends_on)
+MATERIALIZED_VIEWS.register("quality-ranking", quality_ranking, depends_on=SCORING.index("quality").depends_on)
+MATERIALIZED_VIEWS.warm(max_workers=int(os.environ.get("VIEW_WARMUP_WORKERS", 4)))
+MATERIALIZED_VIEWS.schedule_boundaries(CLASS_EXECUTORS[COST_REPORT])
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    """
+    Readiness probe: 200 once every hot view is built, 503 while the worker is still warming up
+    (or, in a read-only worker, cannot apply the writer's journal). Reports each view's status and build time.
+    """
+    status = MATERIALIZED_VIEWS.status()
+    if not DATA_JOURNAL.writable and JOURNAL_FOLLOWER.last_error:
+        # A read-only worker that cannot apply the writer's entries would serve stale data
+        status = {**status, "ready": False, "journal_follower_error": JOURNAL_FOLLOWER.last_error}
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/health/single-flight", tags=["Health"])
+async def single_flight_stats():
+    """Reports how many report computations were shared between concurrent requests."""
+    return SINGLE_FLIGHT.stats()
+
+@app.get("/health/admission", tags=["Health"])
+async def admission_stats():
+    """Reports active requests, queue depth, waits and rejections per admission cost class."""
+    return ADMISSION.stats()
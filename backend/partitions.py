@@ -0,0 +1,91 @@
+# partitions.py
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LazyPartitionStore:
+    """
+    Loads partitions on first access and evicts them when they go cold.
+
+    A partition is evicted once it has not been used for `idle_seconds`, or when
+    more than `capacity` partitions are resident (least recently used first).
+    Concurrent requests for the same missing partition build it only once. A load that was
+    running when invalidate() was called returns its value to its callers but is not kept.
+    """
+
+    def __init__(self, loader: Callable[[Hashable], Any], capacity: int = 8, idle_seconds: float = 900.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self._loader = loader
+        self._capacity = max(1, capacity)
+        self._idle_seconds = idle_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, Dict[str, Any]]" = OrderedDict()
+        self._building: Dict[Hashable, threading.Event] = {}
+        self._generation = 0  # Bumped by invalidate(); a load only keeps its value if it did not change
+        self.loads = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Any:
+        """Returns the partition for `key`, loading it if it is not resident."""
+        while True:
+            with self._lock:
+                self._evict_cold()
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["last_used"] = self._clock()
+                    self._entries.move_to_end(key)
+                    return entry["value"]
+                pending = self._building.get(key)
+                if pending is None:
+                    pending = self._building[key] = threading.Event()
+                    generation = self._generation
+                    break
+            # Another thread is already loading this partition, wait for it and retry
+            pending.wait()
+
+        try:
+            value = self._loader(key)
+            with self._lock:
+                if generation != self._generation:
+                    return value  # Loaded from data that has since changed
+                self._entries[key] = {"value": value, "last_used": self._clock()}
+                self._entries.move_to_end(key)
+                self.loads += 1
+                while len(self._entries) > self._capacity:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            return value
+        finally:
+            with self._lock:
+                self._building.pop(key, None)
+            pending.set()
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """Drops one partition, or every partition when no key is given."""
+        with self._lock:
+            self._generation += 1
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _evict_cold(self):
+        now = self._clock()
+        for key in [k for k, e in self._entries.items() if now - e["last_used"] > self._idle_seconds]:
+            del self._entries[key]
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._evict_cold()
+            return {
+                "resident": list(self._entries.keys()),
+                "capacity": self._capacity,
+                "idle_seconds": self._idle_seconds,
+                "loads": self.loads,
+                "evictions": self.evictions,
+            }
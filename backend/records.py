@@ -0,0 +1,288 @@
+# records.py
+
+from bisect import bisect
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Type, TypeVar
+
+R = TypeVar("R", bound="Record")
+
+
+class RecordValidationError(ValueError):
+    """A dataset row has a missing required field or a value of the wrong type."""
+
+
+class ReferentialIntegrityError(ValueError):
+    """A dataset row points at a hospital, specialty or other record that does not exist."""
+
+
+class Record:
+    """
+    Compact, typed view of the fields a dataset's hot paths use.
+
+    Subclasses declare FIELDS (name -> type) and REQUIRED (fields that may not be null) and
+    set `__slots__ = tuple(FIELDS)`, so instances carry no per-object dict. `row` is the
+    record's position in its snapshot table, for when the full record is needed.
+    """
+
+    __slots__ = ("row",)
+    FIELDS: Dict[str, type] = {}
+    REQUIRED: Tuple[str, ...] = ("id",)
+
+    def __init__(self, row: int, *values: Any):
+        self.row = row
+        for name, value in zip(self.FIELDS, values):
+            setattr(self, name, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.FIELDS)
+        return f"{type(self).__name__}({fields})"
+
+    @staticmethod
+    def _type_ok(value: Any, expected: type) -> bool:
+        if expected is float:
+            return isinstance(value, (int, float)) and not isinstance(value, bool)
+        if expected is int:
+            return isinstance(value, int) and not isinstance(value, bool)
+        return isinstance(value, expected)
+
+    @classmethod
+    def _check(cls, row: int, values: Sequence[Any]) -> List[str]:
+        errors = []
+        for (name, expected), value in zip(cls.FIELDS.items(), values):
+            if value is None:
+                if name in cls.REQUIRED:
+                    errors.append(f"row {row}: {name} is required")
+            elif not cls._type_ok(value, expected):
+                errors.append(f"row {row}: {name}={value!r} is not {expected.__name__}")
+        return errors
+
+    @staticmethod
+    def _raise(dataset: str, errors: List[str]):
+        shown = "; ".join(errors[:5])
+        more = f" (and {len(errors) - 5} more)" if len(errors) > 5 else ""
+        raise RecordValidationError(f"{dataset}: {len(errors)} invalid value(s): {shown}{more}")
+
+    @classmethod
+    def load(cls: Type[R], table, dataset: str) -> List[R]:
+        """Builds records column by column from a snapshot table, validating types and required fields."""
+        columns = [table.column(name) for name in cls.FIELDS]
+        records, errors = [], []
+        for row, values in enumerate(zip(*columns)):
+            errors.extend(cls._check(row, values))
+            records.append(cls(row, *values))
+        if errors:
+            cls._raise(dataset, errors)
+        return records
+
+    @classmethod
+    def from_mapping(cls: Type[R], values: Mapping, row: int = -1) -> R:
+        """Builds one record from a row dict (e.g. a journaled write), without validation."""
+        return cls(row, *(values.get(name) for name in cls.FIELDS))
+
+    @classmethod
+    def validate(cls, values: Mapping, dataset: str):
+        """Checks a single incoming row (e.g. an API write) the same way load() checks a table."""
+        errors = cls._check(0, [values.get(name) for name in cls.FIELDS])
+        if errors:
+            cls._raise(dataset, [error.split(": ", 1)[1] for error in errors])
+
+
+def check_references(records: Sequence[Record], field: str, valid_ids: Iterable[Any], dataset: str,
+                     target: str, allow_null: bool = False):
+    """Raises ReferentialIntegrityError if any record's `field` is not one of `valid_ids`."""
+    valid = set(valid_ids)
+    dangling = defaultdict(list)
+    for record in records:
+        value = getattr(record, field)
+        if value is None and allow_null:
+            continue
+        if value not in valid:
+            dangling[value].append(record.row)
+    if dangling:
+        shown = ", ".join(f"{value!r} (rows {', '.join(map(str, rows[:3]))})" for value, rows in list(dangling.items())[:5])
+        count = sum(len(rows) for rows in dangling.values())
+        raise ReferentialIntegrityError(
+            f"{dataset}.{field}: {count} row(s) reference missing {target}: {shown}"
+        )
+
+
+def group_by(records: Iterable[R], field: str) -> Dict[Any, List[R]]:
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[getattr(record, field)].append(record)
+    return grouped
+
+
+def replace_record(records: List[R], grouped: Dict[Any, List[R]], field: str, record_id: Any,
+                   record: Optional[R], position: Callable[[Any], int],
+                   old_position: Optional[int]) -> Tuple[List[R], Dict[Any, List[R]]]:
+    """
+    Replaces the record `record_id` in `records` and in its group_by(`field`) map by `record`,
+    or removes it when `record` is None. `old_position` is its place in `records` before the
+    change (None for a new record) and `position` gives a record ID's place in its table
+    afterwards, which `records` and every group follow. An update that stays in place patches
+    `records` in place and copies only its group; a create or delete moves records, so it
+    returns copies and leaves the inputs as they are for readers still holding them.
+    """
+    old = records[old_position] if old_position is not None else None
+    index = position(record.id) if record is not None else None
+    if old is not None and record is not None and index == old_position:
+        records[index] = record
+    else:
+        records = list(records)
+        if old is not None:
+            del records[old_position]
+        if record is not None:
+            records.insert(index, record)
+
+    old_key = getattr(old, field) if old is not None else None
+    new_key = getattr(record, field) if record is not None else None
+    if old is not None and record is not None and old_key == new_key:
+        grouped[new_key] = [record if r.id == record_id else r for r in grouped[new_key]]
+        return records, grouped
+    grouped = grouped.copy()
+    if old is not None:
+        members = [r for r in grouped.get(old_key, ()) if r.id != record_id]
+        if members:
+            grouped[old_key] = members
+        else:
+            grouped.pop(old_key, None)
+    if record is not None:
+        members = list(grouped.get(new_key, ()))
+        members.insert(bisect([position(r.id) for r in members], index), record)
+        grouped[new_key] = members
+    return records, grouped
+
+
+class HospitalRecord(Record):
+    FIELDS = {
+        "id": int,
+        "name": str,
+        "hospital_type": str,
+        "ownership_type": str,
+        "beds_registered": int,
+        "beds_operational": int,
+        "latitude": float,
+        "longitude": float,
+        "status": str,
+        "is_active": bool,
+    }
+    REQUIRED = ("id", "name")
+    __slots__ = tuple(FIELDS)
+
+
+class DoctorRecord(Record):
+    FIELDS = {
+        "id": int,
+        "hospital_id": int,
+        "specialty_id": int,
+        "name": str,
+        "designation": str,
+        "qualification": str,
+        "experience_years": int,
+        "consultation_type": str,
+        "availability_days": str,
+        "is_active": bool,
+    }
+    REQUIRED = ("id", "hospital_id")
+    __slots__ = tuple(FIELDS)
+
+
+class WardRecord(Record):
+    FIELDS = {
+        "id": int,
+        "hospital_id": int,
+        "ward_type": str,
+        "room_category": str,
+        "total_beds": int,
+        "available_beds": int,
+        "daily_rate": float,
+    }
+    REQUIRED = ("id", "hospital_id", "total_beds", "available_beds")
+    __slots__ = tuple(FIELDS)
+
+    @classmethod
+    def _check(cls, row: int, values: Sequence[Any]) -> List[str]:
+        errors = super()._check(row, values)
+        if not errors:
+            ward = dict(zip(cls.FIELDS, values))
+            if ward["total_beds"] < 0 or ward["available_beds"] < 0:
+                errors.append(f"row {row}: bed counts may not be negative")
+            elif ward["available_beds"] > ward["total_beds"]:
+                errors.append(f"row {row}: available_beds={ward['available_beds']} exceeds total_beds={ward['total_beds']}")
+        return errors
+
+
+class IcuFacilityRecord(Record):
+    FIELDS = {
+        "id": int,
+        "hospital_id": int,
+        "icu_type": str,
+        "total_beds": int,
+        "ventilators": int,
+        "monitors": int,
+    }
+    REQUIRED = ("id", "hospital_id")
+    __slots__ = tuple(FIELDS)
+
+
+class SpecialtyRecord(Record):
+    FIELDS = {
+        "id": int,
+        "hospital_id": int,
+        "specialty_name": str,
+        "specialty_category": str,
+        "is_available": bool,
+    }
+    REQUIRED = ("id", "hospital_id")
+    __slots__ = tuple(FIELDS)
+
+
+class MetricsRecord(Record):
+    FIELDS = {
+        "id": int,
+        "hospital_id": int,
+        "total_doctors": int,
+        "qualified_nurses": int,
+        "doctor_bed_ratio": float,
+        "nurse_bed_ratio": float,
+        "icu_doctor_bed_ratio": float,
+        "icu_nurse_bed_ratio": float,
+    }
+    REQUIRED = ("id", "hospital_id")
+    __slots__ = tuple(FIELDS)
+
+
+class EquipmentRecord(Record):
+    FIELDS = {
+        "id": int,
+        "hospital_id": int,
+        "category": str,
+        "equipment_name": str,
+        "is_available": bool,
+        "quantity": int,
+        "installation_year": int,
+        "maintenance_schedule": str,
+    }
+    REQUIRED = ("id", "hospital_id")
+    __slots__ = tuple(FIELDS)
+
+
+class DocumentRecord(Record):
+    FIELDS = {
+        "id": int,
+        "entity_type": str,
+        "entity_id": int,
+        "document_type": str,
+        "file_name": str,
+        "file_path": str,
+        "file_size": int,
+        "mime_type": str,
+        "is_verified": bool,
+        "content_sha256": str,
+    }
+    REQUIRED = ("id", "entity_type", "entity_id")
+    __slots__ = tuple(FIELDS)
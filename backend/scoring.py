@@ -0,0 +1,265 @@
+# scoring.py
+
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from columnar import KIND_BOOL, KIND_FLOAT, KIND_INT, KIND_NULL, KIND_STR
+
+# Feature normalizations, applied to the raw per-hospital values of a whole column at once
+NORMALIZE_NONE = "none"            # Used as is
+NORMALIZE_MAX = "max"              # x / network max (0 when the max is not positive)
+NORMALIZE_MINMAX = "minmax"        # (x - min) / (max - min)
+NORMALIZE_COMPLEMENT = "complement"  # 1 - x, for ratios where a shortfall is the risk
+NORMALIZE_PRESENCE = "presence"    # 1 if x > 0 else 0
+NORMALIZATIONS = (NORMALIZE_NONE, NORMALIZE_MAX, NORMALIZE_MINMAX, NORMALIZE_COMPLEMENT, NORMALIZE_PRESENCE)
+
+AGGREGATIONS = ("sum", "count", "mean", "max", "first")
+
+ColumnGetter = Callable[[str], np.ndarray]
+
+
+def column_array(column: Sequence[Any]) -> np.ndarray:
+    """
+    A column as an array: float64 for numeric and bool columns (nulls are NaN), object for the rest.
+    Snapshot columns are read straight from their typed buffers; materialized lists are converted.
+    """
+    kind = getattr(column, "kind", None)
+    if kind in (KIND_INT, KIND_FLOAT):
+        values = np.frombuffer(column.data, dtype=np.int64 if kind == KIND_INT else np.float64).astype(np.float64)
+        if column.validity is not None:
+            values[np.frombuffer(column.validity, dtype=np.uint8) == 0] = np.nan
+        return values
+    if kind == KIND_BOOL:
+        values = np.frombuffer(column.data, dtype=np.int8).astype(np.float64)
+        values[values < 0] = np.nan
+        return values
+    if kind == KIND_STR:
+        strings = np.empty(len(column.dictionary) + 1, dtype=object)
+        strings[1:] = list(column.dictionary)  # Slot 0 is null (code -1)
+        return strings[np.frombuffer(column.codes, dtype=np.int32) + 1]
+    if kind == KIND_NULL:
+        return np.full(len(column), np.nan)
+    values = list(column)
+    if all(v is None or isinstance(v, (int, float)) for v in values):
+        return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def locator(hospital_ids: Sequence[Hashable]) -> Callable[[np.ndarray], np.ndarray]:
+    """Maps an array of hospital IDs to their positions in `hospital_ids`, -1 for unknown IDs."""
+    ids = np.asarray(hospital_ids, dtype=np.float64)
+    order = np.argsort(ids, kind="stable")
+    sorted_ids = ids[order]
+
+    def locate(keys: np.ndarray) -> np.ndarray:
+        keys = np.asarray(keys, dtype=np.float64)
+        if not len(sorted_ids):
+            return np.full(len(keys), -1, dtype=np.int64)
+        index = np.minimum(np.searchsorted(sorted_ids, keys), len(sorted_ids) - 1)
+        return np.where(sorted_ids[index] == keys, order[index], -1)
+    return locate
+
+
+def normalize(values: np.ndarray, method: str) -> np.ndarray:
+    if method == NORMALIZE_NONE:
+        return values
+    if method == NORMALIZE_MAX:
+        top = values.max() if len(values) else 0
+        return values / top if top > 0 else np.zeros_like(values)
+    if method == NORMALIZE_MINMAX:
+        low, high = (values.min(), values.max()) if len(values) else (0, 0)
+        return (values - low) / (high - low) if high > low else np.zeros_like(values)
+    if method == NORMALIZE_COMPLEMENT:
+        return 1 - values
+    if method == NORMALIZE_PRESENCE:
+        return (values > 0).astype(np.float64)
+    raise ValueError(f"Unknown normalization: {method}")
+
+
+class Aggregate:
+    """
+    A per-hospital value aggregated from one dataset: rows are grouped by `key` (hospital ID)
+    and `value` (a column name or a function of the column getter) is summed, counted, averaged,
+    maxed or taken from the first row. `where` filters rows; null values read as `fill`.
+    Hospitals without rows get `default`. The column getter returns column_array() arrays.
+    """
+
+    def __init__(self, dataset: str, value: Optional[Any] = None, agg: str = "sum",
+                 where: Optional[Callable[[ColumnGetter], np.ndarray]] = None, key: str = "hospital_id",
+                 fill: float = 0.0, default: float = 0.0):
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation: {agg}")
+        self.dataset = dataset
+        self.value = value
+        self.agg = agg
+        self.where = where
+        self.key = key
+        self.fill = fill
+        self.default = default
+
+    def evaluate(self, table, locate: Callable[[np.ndarray], np.ndarray], n: int) -> np.ndarray:
+        """Per-hospital values; `locate` maps key values to hospital positions (see locator())."""
+        cache: Dict[str, np.ndarray] = {}
+
+        def column(name: str) -> np.ndarray:
+            if name not in cache:
+                cache[name] = column_array(table.column(name))
+            return cache[name]
+
+        rows = locate(column(self.key))
+        mask = rows >= 0
+        if self.where is not None:
+            mask &= np.asarray(self.where(column), dtype=bool)
+        rows = rows[mask]
+        counts = np.bincount(rows, minlength=n)
+        if self.agg == "count":
+            return np.where(counts > 0, counts, self.default).astype(np.float64)
+
+        raw = self.value(column) if callable(self.value) else column(self.value)
+        values = np.asarray(raw, dtype=np.float64)[mask]
+        values[np.isnan(values)] = self.fill
+        if self.agg in ("sum", "mean"):
+            totals = np.bincount(rows, weights=values, minlength=n)
+            result = totals if self.agg == "sum" else np.divide(totals, counts, out=np.zeros(n), where=counts > 0)
+        elif self.agg == "max":
+            result = np.full(n, -np.inf)
+            np.maximum.at(result, rows, values)
+        else:  # first: later rows are written first so the earliest row wins
+            result = np.zeros(n)
+            result[rows[::-1]] = values[::-1]
+        return np.where(counts > 0, result, self.default)
+
+
+class Feature:
+    __slots__ = ("name", "source", "weight", "normalize", "description")
+
+    def __init__(self, name: str, source: Aggregate, weight: float, normalize: str = NORMALIZE_NONE, description: str = ""):
+        if normalize not in NORMALIZATIONS:
+            raise ValueError(f"Unknown normalization: {normalize}")
+        self.name = name
+        self.source = source
+        self.weight = weight
+        self.normalize = normalize
+        self.description = description
+
+
+class ScoreIndex:
+    """
+    A composite score: the weighted sum of normalized features. `bands` are (threshold, label)
+    pairs checked highest first; `require` limits the index to hospitals where that source is
+    positive; `epoch` adds a date-derived part to the cache key for date-dependent features.
+    """
+
+    def __init__(self, name: str, features: Sequence[Feature], depends_on: Sequence[str], description: str = "",
+                 bands: Sequence[Tuple[float, str]] = (), require: Optional[Aggregate] = None, digits: Optional[int] = 2,
+                 epoch: Optional[Callable[[], Hashable]] = None):
+        self.name = name
+        self.features = list(features)
+        self.depends_on = tuple(depends_on)
+        self.description = description
+        self.bands = sorted(bands, reverse=True)
+        self.require = require
+        self.digits = digits
+        self.epoch = epoch
+
+    @property
+    def weights(self) -> Dict[str, float]:
+        return {feature.name: feature.weight for feature in self.features}
+
+    def band(self, score: float) -> Optional[str]:
+        return next((label for threshold, label in self.bands if score >= threshold), None)
+
+
+class FeatureMatrix:
+    """Raw and normalized feature values of one index: one row per hospital, one column per feature."""
+
+    __slots__ = ("hospital_ids", "raw", "normalized")
+
+    def __init__(self, hospital_ids: List[Hashable], raw: np.ndarray, normalized: np.ndarray):
+        self.hospital_ids = hospital_ids
+        self.raw = raw
+        self.normalized = normalized
+
+
+class ScoringPipeline:
+    """
+    Evaluates declared score indices across all hospitals at once.
+
+    Each feature is one grouped aggregate over a dataset column (a bincount, not a loop per
+    hospital), normalized as a whole column. The feature matrix of an index is cached per data
+    version of the datasets it depends on (plus its epoch), so scoring with other weights is a
+    single matrix-vector product.
+    """
+
+    def __init__(self, hospital_ids: Callable[[], Sequence[Hashable]], table_of: Callable[[str], Any],
+                 version_of: Callable[[Sequence[str]], Hashable]):
+        self._hospital_ids = hospital_ids
+        self._table_of = table_of
+        self._version_of = version_of
+        self._indices: Dict[str, ScoreIndex] = {}
+        self._matrices: Dict[str, Tuple[Hashable, FeatureMatrix]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def register(self, index: ScoreIndex):
+        self._indices[index.name] = index
+        self._locks[index.name] = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._indices
+
+    def index(self, name: str) -> ScoreIndex:
+        return self._indices[name]
+
+    def indices(self) -> List[ScoreIndex]:
+        return list(self._indices.values())
+
+    def _evaluate_source(self, source: Aggregate, hospital_ids: List[Hashable]) -> np.ndarray:
+        return source.evaluate(self._table_of(source.dataset), locator(hospital_ids), len(hospital_ids))
+
+    def matrix(self, name: str) -> FeatureMatrix:
+        index = self._indices[name]
+        key = (self._version_of(index.depends_on), index.epoch() if index.epoch else None)
+        cached = self._matrices.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        with self._locks[name]:
+            cached = self._matrices.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            hospital_ids = list(self._hospital_ids())
+            if index.require is not None:
+                keep = self._evaluate_source(index.require, hospital_ids) > 0
+                hospital_ids = [h for h, k in zip(hospital_ids, keep) if k]
+            raw = np.zeros((len(hospital_ids), len(index.features)))
+            normalized = np.zeros_like(raw)
+            for f, feature in enumerate(index.features):
+                raw[:, f] = self._evaluate_source(feature.source, hospital_ids)
+                normalized[:, f] = normalize(raw[:, f], feature.normalize)
+            matrix = FeatureMatrix(hospital_ids, raw, normalized)
+            self._matrices[name] = (key, matrix)
+            return matrix
+
+    def score(self, name: str, weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Scores every hospital of an index. `weights` overrides the declared weight of any feature.
+        Returns hospital IDs, total scores and per-feature contributions, as arrays.
+        """
+        index = self._indices[name]
+        unknown = set(weights or {}) - set(index.weights)
+        if unknown:
+            raise ValueError(f"Unknown feature(s) for {name}: {', '.join(sorted(unknown))}")
+        weight_vector = np.array([(weights or {}).get(f.name, f.weight) for f in index.features], dtype=np.float64)
+        matrix = self.matrix(name)
+        contributions = matrix.normalized * weight_vector
+        return {
+            "hospital_ids": matrix.hospital_ids,
+            "weights": dict(zip((f.name for f in index.features), weight_vector.tolist())),
+            "raw": matrix.raw,
+            "normalized": matrix.normalized,
+            "contributions": contributions,
+            "scores": contributions.sum(axis=1),
+        }
@@ -0,0 +1,54 @@
+# singleflight.py
+
+import asyncio
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls into one computation on the event loop.
+
+    The first caller for a key starts the computation as its own task; callers arriving while
+    it is in flight await the same task and share its result (or exception). Nothing is kept
+    once it finishes, so the key must capture everything the result depends on. A caller that
+    is cancelled (e.g. the client went away) does not cancel the shared task.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[str, Hashable], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        )
+
+    async def do(self, name: str, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self._stats[name]
+        stats["calls"] += 1
+        flight_key = (name, key)
+        task = self._inflight.get(flight_key)
+        if task is None:
+            stats["executions"] += 1
+            task = asyncio.ensure_future(func())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._finish(flight_key, done, stats))
+        else:
+            stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: Tuple[str, Hashable], task: asyncio.Future, stats: Dict[str, int]):
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        # Retrieving the exception also keeps asyncio from warning when every caller was cancelled
+        if not task.cancelled() and task.exception() is not None:
+            stats["errors"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        calls = sum(s["calls"] for s in self._stats.values())
+        coalesced = sum(s["coalesced"] for s in self._stats.values())
+        return {
+            "in_flight": len(self._inflight),
+            "calls": calls,
+            "coalesced": coalesced,
+            "coalesced_pct": round(100 * coalesced / calls, 1) if calls else 0.0,
+            "by_name": {name: dict(s) for name, s in sorted(self._stats.items())},
+        }
@@ -0,0 +1,177 @@
+# spatial.py
+
+import heapq
+import itertools
+import math
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lon)
+    return (math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi))
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class _Node:
+    __slots__ = ("lo", "hi", "items", "left", "right", "parent", "max_beds", "max_ventilators")
+
+    def __init__(self, lo, hi, parent):
+        self.lo = lo
+        self.hi = hi
+        self.items: Optional[List[int]] = None
+        self.left: Optional["_Node"] = None
+        self.right: Optional["_Node"] = None
+        self.parent: Optional["_Node"] = parent
+        self.max_beds = 0
+        self.max_ventilators = 0
+
+
+class NearestFacilityIndex:
+    """
+    k-d tree over facility coordinates for nearest-first search with availability pruning.
+
+    Coordinates are stored as 3-D unit vectors, where straight-line (chord) distance orders
+    points exactly like great-circle distance, so there is no distortion near the poles or the
+    antimeridian. Every node keeps the maximum available beds and ventilators below it; a
+    best-first walk pops nodes in increasing distance and skips whole subtrees that cannot
+    satisfy the request. Availability can be updated in place without rebuilding the tree.
+    """
+
+    def __init__(self, facilities: Iterable[Tuple[Hashable, float, float]], leaf_size: int = 8):
+        self._lock = threading.Lock()
+        self._ids: List[Hashable] = []
+        self._points: List[Tuple[float, float, float]] = []
+        for facility_id, lat, lon in facilities:
+            if lat is None or lon is None:
+                continue
+            self._ids.append(facility_id)
+            self._points.append(_unit_vector(lat, lon))
+        self._position = {facility_id: i for i, facility_id in enumerate(self._ids)}
+        self._beds = [0] * len(self._ids)
+        self._ventilators = [0] * len(self._ids)
+        self._leaf_of: List[Optional[_Node]] = [None] * len(self._ids)
+        self._leaf_size = max(1, leaf_size)
+        self._root = self._build(list(range(len(self._ids))), None) if self._ids else None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, facility_id: Hashable) -> bool:
+        return facility_id in self._position
+
+    def _build(self, indexes: List[int], parent: Optional[_Node]) -> _Node:
+        coords = [self._points[i] for i in indexes]
+        lo = tuple(min(p[axis] for p in coords) for axis in range(3))
+        hi = tuple(max(p[axis] for p in coords) for axis in range(3))
+        node = _Node(lo, hi, parent)
+        if len(indexes) <= self._leaf_size:
+            node.items = indexes
+            for i in indexes:
+                self._leaf_of[i] = node
+            return node
+        axis = max(range(3), key=lambda a: hi[a] - lo[a])
+        indexes.sort(key=lambda i: self._points[i][axis])
+        middle = len(indexes) // 2
+        node.left = self._build(indexes[:middle], node)
+        node.right = self._build(indexes[middle:], node)
+        return node
+
+    # ----- Availability ----- #
+    def _refresh(self, node: Optional[_Node]):
+        while node is not None:
+            if node.items is not None:
+                node.max_beds = max((self._beds[i] for i in node.items), default=0)
+                node.max_ventilators = max((self._ventilators[i] for i in node.items), default=0)
+            else:
+                node.max_beds = max(node.left.max_beds, node.right.max_beds)
+                node.max_ventilators = max(node.left.max_ventilators, node.right.max_ventilators)
+            node = node.parent
+
+    def set_availability(self, facility_id: Hashable, beds: Optional[int] = None, ventilators: Optional[int] = None):
+        """Updates a facility's available beds and/or ventilators and the subtree maxima above it."""
+        with self._lock:
+            i = self._position.get(facility_id)
+            if i is None:
+                return
+            if beds is not None:
+                self._beds[i] = beds
+            if ventilators is not None:
+                self._ventilators[i] = ventilators
+            self._refresh(self._leaf_of[i])
+
+    def load_availability(self, availability: Dict[Hashable, Tuple[int, int]]):
+        """Sets (beds, ventilators) for many facilities and recomputes every subtree maximum once."""
+        with self._lock:
+            for facility_id, (beds, ventilators) in availability.items():
+                i = self._position.get(facility_id)
+                if i is not None:
+                    self._beds[i], self._ventilators[i] = beds or 0, ventilators or 0
+            self._refresh_all(self._root)
+
+    def _refresh_all(self, node: Optional[_Node]):
+        if node is None:
+            return
+        if node.items is not None:
+            node.max_beds = max((self._beds[i] for i in node.items), default=0)
+            node.max_ventilators = max((self._ventilators[i] for i in node.items), default=0)
+            return
+        self._refresh_all(node.left)
+        self._refresh_all(node.right)
+        node.max_beds = max(node.left.max_beds, node.right.max_beds)
+        node.max_ventilators = max(node.left.max_ventilators, node.right.max_ventilators)
+
+    # ----- Queries ----- #
+    @staticmethod
+    def _box_distance2(point: Tuple[float, float, float], node: _Node) -> float:
+        total = 0.0
+        for axis in range(3):
+            value = point[axis]
+            if value < node.lo[axis]:
+                total += (node.lo[axis] - value) ** 2
+            elif value > node.hi[axis]:
+                total += (value - node.hi[axis]) ** 2
+        return total
+
+    def nearest(self, lat: float, lon: float, k: int = 5, min_beds: int = 0, min_ventilators: int = 0,
+                max_distance_km: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Returns up to k facilities, closest first, with at least `min_beds` available beds and
+        `min_ventilators` ventilators, as {"id", "distance_km", "available_beds", "ventilators"}.
+        """
+        if self._root is None or k <= 0:
+            return []
+        point = _unit_vector(lat, lon)
+        counter = itertools.count()
+        results = []
+        with self._lock:
+            heap = [(self._box_distance2(point, self._root), next(counter), self._root, -1)]
+            while heap and len(results) < k:
+                distance2, _, node, i = heapq.heappop(heap)
+                if max_distance_km is not None and _chord_to_km(math.sqrt(distance2)) > max_distance_km:
+                    break
+                if node is None:
+                    results.append({
+                        "id": self._ids[i],
+                        "distance_km": round(_chord_to_km(math.sqrt(distance2)), 2),
+                        "available_beds": self._beds[i],
+                        "ventilators": self._ventilators[i],
+                    })
+                    continue
+                if node.max_beds < min_beds or node.max_ventilators < min_ventilators:
+                    continue
+                if node.items is not None:
+                    for i in node.items:
+                        if self._beds[i] >= min_beds and self._ventilators[i] >= min_ventilators:
+                            p = self._points[i]
+                            d2 = (p[0] - point[0]) ** 2 + (p[1] - point[1]) ** 2 + (p[2] - point[2]) ** 2
+                            heapq.heappush(heap, (d2, next(counter), None, i))
+                else:
+                    for child in (node.left, node.right):
+                        heapq.heappush(heap, (self._box_distance2(point, child), next(counter), child, -1))
+        return results
@@ -0,0 +1,238 @@
+# tariffs.py
+
+import math
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+# Peer groups every rate is counted in: geography x segment
+GEOGRAPHY_LEVELS = ("national", "state", "city")
+SEGMENT_LEVELS = ((), ("ward_type",), ("room_category",), ("ward_type", "room_category"))
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch-style log buckets).
+
+    A positive value x falls in bucket ceil(log_gamma(x)), gamma = (1 + a) / (1 - a), so any
+    quantile is returned within relative error `a` of a true sample value, and the size grows
+    with log(max / min) rather than with the number of values. Bucket counts can be decremented,
+    so a changed rate is removed and re-added; sketches with the same accuracy merge by adding
+    counts.
+    """
+
+    __slots__ = ("accuracy", "_log_gamma", "_buckets", "_keys", "_zeros", "count", "_min", "_max")
+
+    def __init__(self, accuracy: float = 0.01):
+        self.accuracy = accuracy
+        self._log_gamma = math.log((1 + accuracy) / (1 - accuracy))
+        self._buckets: Counter = Counter()
+        self._keys: List[int] = []  # Sorted bucket keys with a non-zero count
+        self._zeros = 0  # Values <= 0 (free or missing tariffs)
+        self.count = 0
+        self._min = math.inf
+        self._max = -math.inf
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        gamma = math.exp(self._log_gamma)
+        return 2 * gamma ** key / (gamma + 1)
+
+    def _adjust(self, key: int, delta: int):
+        count = self._buckets[key] + delta
+        if count > 0:
+            if key not in self._buckets or self._buckets[key] == 0:
+                insort(self._keys, key)
+            self._buckets[key] = count
+        else:
+            del self._buckets[key]
+            self._keys.pop(bisect_left(self._keys, key))
+
+    def add(self, value: float, count: int = 1):
+        if value <= 0:
+            self._zeros += count
+        else:
+            self._adjust(self._key(value), count)
+        self.count += count
+        self._min = min(self._min, value)
+        self._max = max(self._max, value)
+
+    def remove(self, value: float, count: int = 1):
+        """Removes previously added values and narrows min/max to the buckets still counted."""
+        if value <= 0:
+            self._zeros -= count
+        else:
+            self._adjust(self._key(value), -count)
+        self.count -= count
+        if self.count <= 0:
+            self._min, self._max = math.inf, -math.inf
+            return
+        # A bound that was removed, or whose bucket has emptied, moves to the nearest bucket still
+        # counted, whose value is within the sketch's relative accuracy of the true remaining bound.
+        if value == self._min or not self._counts(self._min, self._keys[:1]):
+            self._min = 0.0 if self._zeros > 0 else min(self._value(self._keys[0]), self._max)
+        if value == self._max or not self._counts(self._max, self._keys[-1:]):
+            self._max = max(self._value(self._keys[-1]), self._min) if self._keys else 0.0
+
+    def _counts(self, bound: float, keys: List[int]) -> bool:
+        """Whether the bucket `bound` falls in is the given end bucket (or the zero count) and still counted."""
+        if bound <= 0:
+            return self._zeros > 0
+        return bool(keys) and self._key(bound) == keys[0]
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.accuracy != self.accuracy:
+            raise ValueError("Only sketches with the same accuracy can be merged")
+        for key, count in other._buckets.items():
+            self._adjust(key, count)
+        self._zeros += other._zeros
+        self.count += other.count
+        self._min = min(self._min, other._min)
+        self._max = max(self._max, other._max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value at quantile q (0-1), within the sketch's relative accuracy."""
+        if self.count <= 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self._zeros
+        if rank < seen:
+            return 0.0
+        for key in self._keys:
+            seen += self._buckets[key]
+            if rank < seen:
+                return min(max(self._value(key), self._min), self._max)
+        return self._max
+
+    def percentile_of(self, value: float) -> Optional[float]:
+        """Mid-rank percentile (0-100) of a value among the sketched ones: values in its bucket count half."""
+        if self.count <= 0:
+            return None
+        if value <= 0:
+            below, equal = 0, self._zeros
+        else:
+            key = self._key(value)
+            index = bisect_left(self._keys, key)
+            below = self._zeros + sum(self._buckets[k] for k in self._keys[:index])
+            equal = self._buckets[key] if index < len(self._keys) and self._keys[index] == key else 0
+        return 100 * (below + equal / 2) / self.count
+
+    def summary(self, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "min": self._min if self.count else None,
+            "max": self._max if self.count else None,
+            "quantiles": {f"p{round(q * 100, 2):g}": self.quantile(q) for q in quantiles},
+        }
+
+
+class TariffBenchmark:
+    """
+    Quantile sketches of ward daily rates for every peer group: national, state and city, each
+    overall, per ward type, per room category and per (ward type, room category).
+
+    Each rate is counted in every peer group it belongs to, so a percentile or quantile query
+    reads one sketch, and replacing a hospital's wards updates only the sketches those rates
+    were in. Geography and segment names are matched case-insensitively.
+    """
+
+    def __init__(self, accuracy: float = 0.01):
+        self.accuracy = accuracy
+        self._lock = threading.Lock()
+        self._sketches: Dict[Tuple, QuantileSketch] = {}
+        # hospital ID -> ward ID -> (peer group keys, rate)
+        self._wards: Dict[Any, Dict[Any, Tuple[List[Tuple], float]]] = {}
+
+    @staticmethod
+    def _norm(value: Optional[str]) -> Optional[str]:
+        return value.strip().casefold() if value else None
+
+    @classmethod
+    def peer_key(cls, state: Optional[str] = None, city: Optional[str] = None, ward_type: Optional[str] = None,
+                 room_category: Optional[str] = None) -> Tuple:
+        """The sketch key of the narrowest peer group the filters describe (city wins over state)."""
+        if city:
+            geography = ("city", cls._norm(city))
+        elif state:
+            geography = ("state", cls._norm(state))
+        else:
+            geography = ("national",)
+        return geography + (cls._norm(ward_type), cls._norm(room_category))
+
+    def _peer_keys(self, state: Optional[str], city: Optional[str], ward_type: Optional[str],
+                   room_category: Optional[str]) -> List[Tuple]:
+        geographies = [("national",)]
+        if state:
+            geographies.append(("state", self._norm(state)))
+        if city:
+            geographies.append(("city", self._norm(city)))
+        segment = {"ward_type": self._norm(ward_type), "room_category": self._norm(room_category)}
+        return [
+            geography + (segment["ward_type"] if "ward_type" in level else None,
+                         segment["room_category"] if "room_category" in level else None)
+            for geography in geographies for level in SEGMENT_LEVELS
+        ]
+
+    def replace_hospital(self, hospital_id: Any, wards: Iterable[Dict[str, Any]], state: Optional[str],
+                         city: Optional[str]):
+        """
+        Replaces a hospital's rates with `wards` (dicts with id, daily_rate, ward_type, room_category).
+        Only sketches of removed, added or re-rated wards are touched.
+        """
+        fresh = {}
+        for ward in wards:
+            rate = ward.get("daily_rate")
+            if rate is None:
+                continue
+            fresh[ward.get("id")] = (self._peer_keys(state, city, ward.get("ward_type"), ward.get("room_category")), rate)
+        with self._lock:
+            previous = self._wards.get(hospital_id, {})
+            for ward_id, entry in previous.items():
+                if fresh.get(ward_id) != entry:
+                    self._apply(entry, -1)
+            for ward_id, entry in fresh.items():
+                if previous.get(ward_id) != entry:
+                    self._apply(entry, 1)
+            if fresh:
+                self._wards[hospital_id] = fresh
+            else:
+                self._wards.pop(hospital_id, None)
+
+    def _apply(self, entry: Tuple[List[Tuple], float], delta: int):
+        keys, rate = entry
+        for key in keys:
+            sketch = self._sketches.get(key)
+            if sketch is None:
+                sketch = self._sketches[key] = QuantileSketch(self.accuracy)
+            if delta > 0:
+                sketch.add(rate)
+            else:
+                sketch.remove(rate)
+                if sketch.count <= 0:
+                    del self._sketches[key]
+
+    def percentile_of(self, rate: float, key: Tuple) -> Optional[float]:
+        with self._lock:
+            sketch = self._sketches.get(key)
+            return round(sketch.percentile_of(rate), 1) if sketch else None
+
+    def summary(self, key: Tuple, quantiles: Sequence[float] = DEFAULT_QUANTILES) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            sketch = self._sketches.get(key)
+            return sketch.summary(quantiles) if sketch else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "accuracy": self.accuracy,
+                "hospitals": len(self._wards),
+                "rates": sum(len(wards) for wards in self._wards.values()),
+                "sketches": len(self._sketches),
+                "buckets": sum(len(sketch._keys) for sketch in self._sketches.values()),
+            }
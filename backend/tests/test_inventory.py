@@ -0,0 +1,36 @@
+import pytest
+
+from inventory import EquipmentInventory
+
+
+def item(hospital_id, name, category, quantity, year):
+    return {"hospital_id": hospital_id, "equipment_name": name, "category": category,
+            "quantity": quantity, "installation_year": year, "is_available": True}
+
+
+@pytest.fixture
+def inventory():
+    return EquipmentInventory([1, 2], [
+        item(1, "MRI", "Imaging", 1, 2010),
+        item(1, "Ventilator", "Critical Care", 4, 2021),
+        item(2, "CT Scanner", "Imaging", 2, 2018),
+        item(2, "Monitor", "Critical Care", 3, None),
+    ])
+
+
+def test_age_profile_buckets_ages(inventory):
+    profile = inventory.age_profile(2024, bucket_years=5)
+
+    assert profile["age_buckets"] == ["0-4", "5-9", "10-14"]
+    assert profile["total"] == {"0-4": 4, "5-9": 2, "10-14": 1}
+    assert profile["unknown_year_quantity"] == 3
+    assert profile["by_category"]["Imaging"] == {"5-9": 2, "10-14": 1}
+
+
+def test_age_profile_rejects_a_year_before_installation(inventory):
+    with pytest.raises(ValueError, match="2021"):
+        inventory.age_profile(2019)
+
+    # Only the selected items count: without the 2021 ventilator, 2019 is fine
+    profile = inventory.age_profile(2019, categories=["Imaging"])
+    assert profile["total"] == {"0-4": 2, "5-9": 1}
@@ -0,0 +1,163 @@
+import os
+
+import pytest
+
+from journal import JournalCompactor, JournalReadOnlyError, WriteJournal
+
+
+def upsert(record_id, name):
+    return {"dataset": "hospitals", "op": "upsert", "id": record_id, "row": {"id": record_id, "name": name}}
+
+
+def write(journal, *entries):
+    seq = journal.append(list(entries))
+    journal.wait_durable(seq)
+    return seq
+
+
+class DictStore:
+    """A fold target that applies entries the way fold_journal_entries does: full rows, so replays are harmless."""
+
+    def __init__(self):
+        self.rows = {}
+        self.folds = 0
+
+    def fold(self, entries):
+        self.folds += 1
+        for entry in entries:
+            if entry["op"] == "upsert":
+                self.rows[entry["id"]] = entry["row"]
+            else:
+                self.rows.pop(entry["id"], None)
+
+
+def reopen(journal):
+    """Simulates a restart: the old process's lock goes away with it."""
+    journal._file.close()
+    journal._lock_file.close()
+    return WriteJournal(journal.path)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return WriteJournal(tmp_path / "data.journal")
+
+
+def test_torn_final_line_is_dropped(journal):
+    write(journal, upsert(1, "a"), upsert(2, "b"))
+    with open(journal.path, "ab") as f:
+        f.write(b'{"dataset": "hospitals", "op": "ups')
+
+    assert [entry["id"] for entry in journal.read_entries()] == [1, 2]
+
+
+def test_entries_after_a_torn_line_survive_a_restart(journal):
+    write(journal, upsert(1, "a"))
+    with open(journal.path, "ab") as f:
+        f.write(b'{"dataset": "hosp')
+
+    journal = reopen(journal)
+    write(journal, upsert(2, "b"))
+
+    entries = journal.read_entries()
+    assert [entry["id"] for entry in entries] == [1, 2]
+    assert [entry["seq"] for entry in entries] == [1, 2]
+
+
+def test_leftover_compacting_file_is_replayed_first(journal):
+    write(journal, upsert(1, "old"))
+    os.replace(journal.path, journal.compacting_path)  # A compaction that never finished
+    journal = reopen(journal)
+    write(journal, upsert(1, "new"), upsert(2, "b"))
+
+    assert [(entry["id"], entry["row"]["name"]) for entry in journal.read_entries()] == [(1, "old"), (1, "new"), (2, "b")]
+
+    store = DictStore()
+    compactor = JournalCompactor(journal, store.fold)
+    assert compactor.run_once() == 1  # The leftover file alone
+    assert compactor.run_once() == 2
+    assert store.rows == {1: {"id": 1, "name": "new"}, 2: {"id": 2, "name": "b"}}
+    assert journal.read_entries() == []
+
+
+def test_crash_between_fold_and_finish_compaction_replays_idempotently(journal, monkeypatch):
+    store = DictStore()
+    write(journal, upsert(1, "a"), upsert(2, "b"), {"dataset": "hospitals", "op": "delete", "id": 2})
+
+    def crash():
+        raise SystemExit("killed after folding")
+
+    monkeypatch.setattr(journal, "finish_compaction", crash)
+    with pytest.raises(SystemExit):
+        JournalCompactor(journal, store.fold).run_once()
+    assert store.rows == {1: {"id": 1, "name": "a"}}
+    monkeypatch.undo()
+
+    journal = reopen(journal)
+    assert len(journal.read_entries()) == 3  # Still there, so they are applied again on startup
+    assert JournalCompactor(journal, store.fold).run_once() == 3
+    assert store.folds == 2
+    assert store.rows == {1: {"id": 1, "name": "a"}}
+    assert not journal.compacting_path.exists()
+    write(journal, upsert(3, "c"))
+    assert [entry["seq"] for entry in journal.read_entries()] == [4]
+
+
+def test_failed_fsync_keeps_the_batch_queued(journal, monkeypatch):
+    first = journal.append([upsert(1, "a")])
+    real_fsync = os.fsync
+
+    def failing_fsync(fd):
+        raise OSError("EIO")
+
+    monkeypatch.setattr(os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        journal.wait_durable(first)
+    assert journal.stats()["durable_seq"] == 0
+    assert journal.stats()["pending"] == 1
+
+    monkeypatch.setattr(os, "fsync", real_fsync)
+    second = journal.append([upsert(2, "b")])
+    journal.wait_durable(second)
+
+    stats = journal.stats()
+    assert stats["durable_seq"] == second and stats["pending"] == 0
+    assert [entry["seq"] for entry in journal.read_entries()] == [1, 2]
+    assert [entry["seq"] for entry in reopen(journal).read_entries()] == [1, 2]
+
+
+def test_second_process_is_read_only(journal):
+    write(journal, upsert(1, "a"))
+    reader = WriteJournal(journal.path)  # A second open file description, as in another worker
+
+    assert journal.writable and not reader.writable
+    assert [entry["id"] for entry in reader.read_entries()] == [1]
+    with pytest.raises(JournalReadOnlyError):
+        reader.append([upsert(2, "b")])
+    with pytest.raises(JournalReadOnlyError):
+        reader.rotate()
+
+
+def test_reader_follows_across_compaction(journal):
+    store = DictStore()
+    compactor = JournalCompactor(journal, store.fold)
+    reader = WriteJournal(journal.path)
+    reader.report_progress(0)
+    write(journal, upsert(1, "a"), upsert(2, "b"))
+    assert [entry["seq"] for entry in reader.read_since(0)] == [1, 2]
+    reader.report_progress(2)
+
+    write(journal, upsert(3, "c"))
+    compactor.run_once()  # Folds 1-3 while the reader has only applied 1-2
+    write(journal, upsert(4, "d"))
+    compactor.run_once()
+    assert reader.changed_since(2)
+    assert [entry["seq"] for entry in reader.read_since(2)] == [3, 4]
+    reader.report_progress(4)
+
+    write(journal, upsert(5, "e"))
+    compactor.run_once()
+    assert journal.stats()["segments"] == 1  # Only the newest, which keeps the numbering going
+    assert [entry["seq"] for entry in reader.read_since(4)] == [5]
+    assert not reader.changed_since(5)
+    assert reopen(journal).append([upsert(6, "f")]) == 6
@@ -0,0 +1,94 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND = Path(__file__).resolve().parent.parent
+
+# One uvicorn worker: imports the app and answers {"method", "path", "json"} lines from stdin
+WORKER = """
+import json, sys
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+print(json.dumps({"writer": main.DATA_JOURNAL.writable}), flush=True)
+for line in sys.stdin:
+    request = json.loads(line)
+    response = client.request(request["method"], request["path"], json=request.get("json"))
+    print(json.dumps({"status": response.status_code, "body": response.json()}), flush=True)
+"""
+
+
+class Worker:
+    def __init__(self, env):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", WORKER], cwd=BACKEND, env=env, text=True,
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self.writer = json.loads(self.process.stdout.readline())["writer"]
+
+    def request(self, method, path, body=None):
+        self.process.stdin.write(json.dumps({"method": method, "path": path, "json": body}) + "\n")
+        self.process.stdin.flush()
+        return json.loads(self.process.stdout.readline())
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait(timeout=30)
+
+
+@pytest.fixture
+def workers(tmp_path):
+    env = {
+        **os.environ,
+        "DATA_JOURNAL_PATH": str(tmp_path / "journal" / "data.journal"),
+        "DOCUMENT_STORE_PATH": str(tmp_path / "documents"),
+        # Compaction would rewrite the shared data files
+        "DATA_JOURNAL_COMPACT_SECONDS": "3600",
+        "DATA_JOURNAL_FOLLOW_SECONDS": "3600",
+    }
+    started = []
+
+    def start():
+        started.append(Worker(env))
+        return started[-1]
+
+    yield start
+    for worker in started:
+        worker.close()
+
+
+def first_hospital_id():
+    with open(BACKEND / "data" / "hospitals.json", encoding="utf-8") as f:
+        return json.load(f)[0]["id"]
+
+
+def test_write_on_the_writer_is_visible_on_a_reader(workers):
+    hospital_id = first_hospital_id()
+    writer = workers()
+    reader = workers()
+    assert writer.writer and not reader.writer
+    assert reader.request("GET", f"/hospitals/{hospital_id}/bundle")["status"] == 200
+
+    updated = writer.request("PATCH", f"/data/hospitals/{hospital_id}", {"name": "Followed Hospital"})
+    assert updated["status"] == 200
+
+    # The follow thread is effectively off, so the reader catches up on its next request
+    record = reader.request("GET", f"/data/hospitals/{hospital_id}")
+    assert record["status"] == 200 and record["body"]["name"] == "Followed Hospital"
+    bundle = reader.request("GET", f"/hospitals/{hospital_id}/bundle")
+    assert bundle["body"]["hospital"]["name"] == "Followed Hospital"
+    assert reader.request("GET", "/data/journal")["body"]["follower"]["entries_applied"] == 1
+
+
+def test_reader_rejects_writes(workers):
+    hospital_id = first_hospital_id()
+    workers()
+    reader = workers()
+
+    response = reader.request("PATCH", f"/data/hospitals/{hospital_id}", {"name": "Nope"})
+    assert response["status"] == 503
@@ -0,0 +1,188 @@
+# views.py
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+STATUS_PENDING = "pending"
+STATUS_BUILDING = "building"
+STATUS_READY = "ready"
+STATUS_STALE = "stale"
+STATUS_FAILED = "failed"
+
+
+class MaterializedView:
+    __slots__ = ("name", "build", "depends_on", "hot", "next_change", "lock", "current", "status", "build_ms",
+                 "built_at", "builds", "error")
+
+    def __init__(self, name: str, build: Callable[[], Any], depends_on: Sequence[str], hot: bool,
+                 next_change: Optional[Callable[[date], Optional[date]]]):
+        self.name = name
+        self.build = build
+        self.depends_on = tuple(depends_on)
+        self.hot = hot
+        self.next_change = next_change
+        self.lock = threading.Lock()
+        # (data version, valid until, value), swapped as one; valid until is None unless the view is date-dependent
+        self.current: Optional[Tuple[Hashable, Optional[date], Any]] = None
+        self.status = STATUS_PENDING
+        self.build_ms: Optional[float] = None
+        self.built_at: Optional[float] = None
+        self.builds = 0
+        self.error: Optional[str] = None
+
+
+class ViewRegistry:
+    """
+    Named results of expensive, parameterless report functions, kept built in memory.
+
+    A view stores the data version of the datasets it depends on when it was built; a read
+    after any of them changed rebuilds it (one build at a time per view). warm() builds every
+    view in parallel on a worker pool, and `ready` turns true once all hot views exist.
+
+    Views whose output depends on today's date (expiry statuses and the like) register a
+    `next_change(as_of)` function returning the first date their output can differ from the
+    one built on `as_of`. The view stays valid until that date instead of for one day, and
+    schedule_boundaries() rebuilds hot ones in the background as soon as it arrives.
+    """
+
+    def __init__(self, version_of: Callable[[Sequence[str]], Hashable], today: Callable[[], date] = date.today):
+        self._version_of = version_of
+        self._today = today
+        self._views: Dict[str, MaterializedView] = {}
+        self._warmup_started: Optional[float] = None
+        self._warmup_finished: Optional[float] = None
+        self._warmup_done = threading.Event()
+        self._boundary_changed = threading.Event()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._views
+
+    def register(self, name: str, build: Callable[[], Any], depends_on: Sequence[str] = (), hot: bool = True,
+                 next_change: Optional[Callable[[date], Optional[date]]] = None):
+        self._views[name] = MaterializedView(name, build, depends_on, hot, next_change)
+
+    def _is_current(self, view: MaterializedView, current) -> bool:
+        return (current is not None and current[0] == self._version_of(view.depends_on)
+                and (current[1] is None or self._today() < current[1]))
+
+    def get(self, name: str) -> Any:
+        """Returns the view's value, building it first if it is missing, its inputs changed or it expired."""
+        view = self._views[name]
+        current = view.current
+        if self._is_current(view, current):
+            return current[2]
+        return self._build(view)
+
+    def _build(self, view: MaterializedView) -> Any:
+        with view.lock:
+            current = view.current
+            if self._is_current(view, current):
+                return current[2]  # Built by another caller while this one waited
+            version = self._version_of(view.depends_on)
+            as_of = self._today()
+            view.status = STATUS_BUILDING
+            started = time.perf_counter()
+            try:
+                value = view.build()
+            except Exception as e:
+                view.status = STATUS_FAILED
+                view.error = repr(e)
+                raise
+            valid_until = view.next_change(as_of) if view.next_change else None
+            view.current = (version, valid_until, value)
+            view.build_ms = round((time.perf_counter() - started) * 1000, 2)
+            view.built_at = time.time()
+            view.builds += 1
+            view.status = STATUS_READY
+            view.error = None
+            if view.next_change is not None:
+                self._boundary_changed.set()
+            return value
+
+    def _build_quietly(self, view: MaterializedView):
+        try:
+            self._build(view)
+        except Exception:
+            pass  # Recorded on the view; a later read retries
+
+    def warm(self, max_workers: int = 4):
+        """Builds every view in parallel on a background pool and returns immediately."""
+        def run():
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="view-warmup") as pool:
+                list(pool.map(self._build_quietly, self._views.values()))
+            self._warmup_finished = time.time()
+            self._warmup_done.set()
+
+        self._warmup_started = time.time()
+        threading.Thread(target=run, name="view-warmup", daemon=True).start()
+
+    def refresh_stale(self, executor):
+        """Schedules a rebuild of every hot view whose inputs changed or that expired, so readers do not pay for it."""
+        scheduled = 0
+        for view in self._views.values():
+            current = view.current
+            if view.hot and current is not None and not self._is_current(view, current):
+                view.status = STATUS_STALE
+                executor.submit(self._build_quietly, view)
+                scheduled += 1
+        return scheduled
+
+    def schedule_boundaries(self, executor):
+        """
+        Starts a background thread that sleeps until the earliest date a hot view expires and then
+        schedules its rebuild on `executor`. Boundaries are re-read whenever a view is rebuilt.
+        """
+        def run():
+            while True:
+                self._boundary_changed.clear()
+                today = self._today()
+                upcoming = [
+                    view.current[1] for view in self._views.values()
+                    if view.hot and view.current is not None and view.current[1] is not None
+                    and view.current[1] > today
+                ]
+                timeout = None
+                if upcoming:
+                    boundary = datetime.combine(min(upcoming), datetime.min.time())
+                    timeout = max(1.0, (boundary - datetime.now()).total_seconds())
+                if not self._boundary_changed.wait(timeout) and self.refresh_stale(executor):
+                    self._boundary_changed.wait()  # Until an expired view has been rebuilt
+
+        threading.Thread(target=run, name="view-boundaries", daemon=True).start()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        self._warmup_done.wait(timeout)
+        return self.ready
+
+    @property
+    def ready(self) -> bool:
+        return self._warmup_done.is_set() and all(
+            view.current is not None for view in self._views.values() if view.hot
+        )
+
+    def status(self) -> Dict[str, Any]:
+        finished = self._warmup_finished
+        return {
+            "ready": self.ready,
+            "warmup": {
+                "started_at": self._warmup_started,
+                "finished_at": finished,
+                "duration_ms": round((finished - self._warmup_started) * 1000, 2) if finished else None,
+            },
+            "views": {
+                view.name: {
+                    "status": view.status,
+                    "hot": view.hot,
+                    "depends_on": list(view.depends_on),
+                    "valid_until": view.current[1].isoformat() if view.current and view.current[1] else None,
+                    "build_ms": view.build_ms,
+                    "built_at": view.built_at,
+                    "builds": view.builds,
+                    "error": view.error,
+                }
+                for view in self._views.values()
+            },
+        }
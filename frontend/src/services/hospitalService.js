@@ -33,26 +33,26 @@ export const getHospitalMetrics = (id) => api.get(`/hospitals/${id}/metrics`);
 export const getAllHospitalCertifications = () =>
   api.get("/hospitals/certifications");
 
+// -------------------------
+// Hospital Bundle (profile, address, contacts, specialties, metrics,
+// positioning, risk, certifications, ICU and equipment in one call)
+// -------------------------
+export const getHospitalBundle = (id) => api.get(`/hospitals/${id}/bundle`);
+
 // -------------------------
 // Hospital Certifications (Single Hospital by ID) → returns plain data
 // -------------------------
 export const getHospitalCertifications = async (hospitalId) => {
   try {
-    const response = await getAllHospitalCertifications();
-    const allHospitalsCerts = response.data;
-
-    const hospitalData = allHospitalsCerts.find(
-      (h) => String(h.hospital_id) === String(hospitalId)
-    );
+    const response = await getHospitalBundle(hospitalId);
+    const certifications = response.data?.certifications;
 
-    if (!hospitalData) {
+    if (!Array.isArray(certifications) || certifications.length === 0) {
       console.warn(`No certifications found for hospital ${hospitalId}`);
       return [];
     }
 
-    return Array.isArray(hospitalData.certifications)
-      ? hospitalData.certifications
-      : [];
+    return certifications;
   } catch (error) {
     console.error(
       `Error fetching certifications for hospital ${hospitalId}:`,